@@ -0,0 +1,553 @@
+"""Backtests the bot against archived tweets and historical prices.
+
+Run from the ``src`` directory::
+
+    python backtest.py ARCHIVE --markets FILE --candles DIR [--terms TERMS]
+                       [--multipliers M,...] [--windows W,...] [--delay S]
+                       [--fill {open,high}] [--user ID] [--csv FILE]
+                       [--orders FILE]
+
+Tweets are read from a tweet archive (see the ``archive`` option). Each tweet
+is filtered by search terms and searched for a currency with the bot's own
+:func:`~utils.image.parse_currency`, then its markets are found with
+:func:`~exchanges.exchanges.get_markets` like the bot would. Like the
+``sequential`` dispatch policy, the order is placed on the first market, in
+order of priority, which has candles at the time.
+
+Orders are calculated with the same order plans as the exchanges, so prices
+and quantities are quantised to each market's precision and step with
+:class:`~decimal.Decimal` arithmetic. The asking price retrieved by the bot is
+taken to be the open of the candle in which the tweet was received. The order
+is filled ``--delay`` seconds later, during the candle containing that time,
+at that candle's open or, more pessimistically, its high. Orders are filled
+like the exchange fills them: market orders (Binance) fill at that price,
+whatever the multiplier; limit orders (Bittrex) fill at that price if it's
+within the order's price, at the order's price if the candle's low reaches
+it, and aren't filled otherwise. The plan's quantity is bought, so the total
+spent is the quantity at the fill price.
+
+Returns are computed for every combination of search terms, multipliers and
+holding windows at once with NumPy. The exit price of a window is the close of
+the last candle which started before the window ended.
+
+Markets, their precisions and steps, and currencies are read from ``--markets``,
+a JSON file in the format of ``benchmarks/fixtures/markets.json``, so no network
+access is needed. Candles are CSV files named after the market in a folder
+named after the exchange, e.g. ``DIR/Binance/ZILBTC.csv``, with a header row
+and the columns ``time`` (the candle's start in Unix seconds), ``open``,
+``high``, ``low``, ``close`` and ``volume``. Other settings are read from
+``config.json``. Per-user settings and images aren't used.
+
+Requires NumPy.
+"""
+from decimal import Decimal
+from importlib import import_module
+from pathlib import Path
+from typing import Dict, List, Mapping, NamedTuple, Optional, Pattern, Tuple
+import argparse
+import csv
+import json
+import logging
+import re
+import time
+
+import numpy as np
+
+from exchanges import exchanges
+from exchanges.db import Database, Listings
+from exchanges.exchange import Exchange
+from exchanges.index import Markets
+from exchanges.plans import OrderPlan, get_plan
+from twitter.archive import ArchiveReader
+from twitter.rules import compile_terms
+from utils import image, utils
+from utils.config import DatabaseConfig, ExchangeConfig, Terms
+import utils.globals as g
+
+UNITS: Dict[str, int] = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# The columns of a candle file which are used.
+Candles = NamedTuple("Candles", [
+    ("time", np.ndarray),
+    ("open", np.ndarray),
+    ("high", np.ndarray),
+    ("low", np.ndarray),
+    ("close", np.ndarray)])
+
+# A tweet for which an order would have been placed. The candle is the one in
+# which the order is filled.
+Entry = NamedTuple("Entry", [
+    ("tweet", int),
+    ("exchange", str),
+    ("market", Exchange.Market),
+    ("ask", float),
+    ("candle", int)])
+
+# The simulated orders of all entries, each of shape (entries, multipliers).
+# They are NaN for orders which can't be placed or aren't filled.
+Fills = NamedTuple("Fills", [
+    ("price", np.ndarray),
+    ("quantity", np.ndarray),
+    ("total", np.ndarray)])
+
+class Listing:
+    """An exchange known only by its markets; orders are simulated.
+
+    Only what the backtest uses of an :class:`~exchanges.exchange.Exchange`
+    is provided.
+
+    Parameters
+    ----------
+    name: str
+        The name of the exchange.
+    markets: List[dict]
+        The exchange's markets as listed in the markets file.
+    """
+    def __init__(self, name: str, markets: List[dict]):
+        exchange: type = getattr(import_module("." + name.lower(), "exchanges"),
+                                 name.lower().capitalize())
+
+        self.name: str = name
+        self.limit_orders: bool = exchange.limit_orders
+        self._markets: List[dict] = markets
+
+    def get_markets(self) -> List[Exchange.Market]:
+        return [Exchange.Market(
+                    m["name"],
+                    Exchange.Currency(m["base"], None, m["base_precision"]),
+                    Exchange.Currency(m["quote"], None, m["quote_precision"]),
+                    Decimal(m["step"]) if m["step"] else None)
+                for m in self._markets]
+
+def parse_duration(text: str) -> int:
+    """Converts a duration such as ``"15m"`` to seconds.
+
+    Parameters
+    ----------
+    text: str
+        An integer followed by ``s``, ``m``, ``h`` or ``d``.
+
+    Returns
+    -------
+    int
+        The duration in seconds.
+    """
+    match = re.fullmatch(r"(\d+)([smhd])", text.strip())
+
+    if not match:
+        raise ValueError(f"Invalid duration '{text}'.")
+
+    return int(match.group(1)) * UNITS[match.group(2)]
+
+def load_markets(path: str) \
+        -> Tuple[List[Exchange.Currency], List[Listing]]:
+    """Reads the currencies and creates the enabled exchanges from a file.
+
+    Parameters
+    ----------
+    path: str
+        The path of the file.
+
+    Returns
+    -------
+    Tuple[List[Exchange.Currency], List[Listing]]
+        The currencies in order of rank and the exchanges in order of
+        priority.
+    """
+    with open(path, "r", encoding = "utf-8") as file:
+        data: dict = json.load(file)
+
+    config: Mapping[str, ExchangeConfig] = g.config.exchanges
+    names: List[str] = sorted(
+            (name for name in data["markets"]
+             if name.lower() in config and config[name.lower()].priority),
+            key = lambda name: config[name.lower()].priority)
+
+    return ([Exchange.Currency(c["symbol"], c["name"], None)
+             for c in data["currencies"]],
+            [Listing(name, data["markets"][name]) for name in names])
+
+def load_candles(folder: Path, exchange: str, market: str) \
+        -> Optional[Candles]:
+    """Reads the candles of a market.
+
+    Parameters
+    ----------
+    folder: Path
+        The folder of the candle files.
+    exchange: str
+        The name of the exchange.
+    market: str
+        The name of the market.
+
+    Returns
+    -------
+    Candles or None
+        The candles in order of time, or :any:`None` if there is no file.
+    """
+    path: Path = folder / exchange / f"{market}.csv"
+
+    if not path.exists():
+        return None
+
+    data: np.ndarray = np.loadtxt(path, delimiter = ",", skiprows = 1,
+                                  usecols = (0, 1, 2, 3, 4), ndmin = 2)
+    data = data[np.argsort(data[:, 0], kind = "stable")]
+
+    return Candles(*data.T)
+
+def read_tweets(path: str, users: List[int]) -> List[Tuple[float, str]]:
+    """Reads the times and texts of archived tweets.
+
+    Parameters
+    ----------
+    path: str
+        The path of the archive without the extensions.
+    users: List[int]
+        The IDs of the users whose tweets to read; all users if empty.
+
+    Returns
+    -------
+    List[Tuple[float, str]]
+        The times the tweets were received and their texts.
+    """
+    reader: ArchiveReader = ArchiveReader(path)
+    tweets: List[Tuple[float, str]] = []
+
+    for entry, raw in reader.read():
+        data: dict = json.loads(raw)
+
+        if users and data["user"]["id"] not in users:
+            continue
+
+        if g.config.twitter.ignore_retweets \
+                and "retweeted_status" in data:
+            continue
+
+        tweets.append((entry.time, data["text"]))
+
+    reader.close()
+
+    return tweets
+
+def find_entries(tweets: List[Tuple[float, str]], folder: Path,
+                 delay: float) -> Tuple[List[Entry], Dict[Tuple[str, str],
+                                                          Candles]]:
+    """Finds the tweets for which an order would have been placed.
+
+    Parameters
+    ----------
+    tweets: List[Tuple[float, str]]
+        The times the tweets were received and their texts.
+    folder: Path
+        The folder of the candle files.
+    delay: float
+        Seconds after a tweet at which its order is filled.
+
+    Returns
+    -------
+    Tuple[List[Entry], Dict[Tuple[str, str], Candles]]
+        The entries, and the candles of each exchange's market which were
+        loaded.
+    """
+    candles: Dict[Tuple[str, str], Optional[Candles]] = {}
+    entries: List[Entry] = []
+
+    for i, (received, text) in enumerate(tweets):
+        currency: Optional[Exchange.Currency] = image.parse_currency(text)
+
+        if not currency:
+            continue
+
+        markets: Markets = exchanges.get_markets(currency, g.db.snapshot)
+        entry: Optional[Entry] = None
+
+        for exchange in g.exchanges:
+            for market in markets.get(exchange.name, ()):
+                key: Tuple[str, str] = (exchange.name, market.name)
+
+                if key not in candles:
+                    candles[key] = load_candles(folder, *key)
+
+                c: Optional[Candles] = candles[key]
+
+                # Skips markets without candles from the tweet to the order.
+                if c is None or not len(c.time) or received < c.time[0] \
+                        or received + delay > c.time[-1]:
+                    continue
+
+                ask: int = int(np.searchsorted(c.time, received, "right")) - 1
+                fill: int = \
+                    int(np.searchsorted(c.time, received + delay, "right")) - 1
+
+                entry = Entry(i, exchange.name, market, float(c.open[ask]),
+                              fill)
+                break
+
+            if entry:
+                entries.append(entry)
+                break
+
+    return entries, {k: v for k, v in candles.items() if v is not None}
+
+def simulate(entries: List[Entry], candles: Dict[Tuple[str, str], Candles],
+             multipliers: List[Decimal], windows: np.ndarray,
+             fill_at: str) -> Tuple[Fills, np.ndarray]:
+    """Simulates the orders of every entry for every multiplier and window.
+
+    Parameters
+    ----------
+    entries: List[Entry]
+        The entries.
+    candles: Dict[Tuple[str, str], Candles]
+        The candles of each exchange's market.
+    multipliers: List[Decimal]
+        The multipliers.
+    windows: np.ndarray
+        The holding windows in seconds.
+    fill_at: str
+        ``"open"`` or ``"high"``; the price at which orders are filled.
+
+    Returns
+    -------
+    Tuple[Fills, np.ndarray]
+        The orders, and the exit prices of shape (entries, windows), which are
+        ``NaN`` without enough candles.
+    """
+    shape: Tuple[int, int] = (len(entries), len(multipliers))
+    fills: Fills = Fills(np.full(shape, np.nan), np.full(shape, np.nan),
+                         np.full(shape, np.nan))
+    exit_: np.ndarray = np.full((len(entries), len(windows)), np.nan)
+    limit_orders: Dict[str, bool] = \
+        {ex.name: ex.limit_orders for ex in g.exchanges}
+
+    # Orders are calculated one at a time with the order plans, as the bot
+    # does, so quantisation is identical.
+    for e, entry in enumerate(entries):
+        c: Candles = candles[(entry.exchange, entry.market.name)]
+        plan: OrderPlan = get_plan(g.db.plans, entry.exchange, entry.market,
+                                   g.config)
+        use_multiplier: bool = \
+            g.config.exchanges[entry.exchange.lower()].use_multiplier
+        market_price: float = float(getattr(c, fill_at)[entry.candle])
+        ask: Decimal = Decimal(repr(entry.ask))
+
+        for m, multiplier in enumerate(multipliers):
+            if use_multiplier:
+                plan = plan._replace(multiplier = 1 + multiplier)
+
+            order: Optional[Tuple[Decimal, Decimal, Decimal]] = plan.apply(ask)
+
+            if not order:
+                continue
+
+            limit: float = float(order[0])
+            price: float
+
+            if not limit_orders[entry.exchange] or market_price <= limit:
+                price = market_price
+            elif c.low[entry.candle] <= limit:
+                price = limit
+            else:
+                continue
+
+            fills.price[e, m] = price
+            fills.quantity[e, m] = float(order[1])
+            fills.total[e, m] = float(order[1]) * price
+
+    # Exit prices are found for all entries of a market and all windows with
+    # one search.
+    by_market: Dict[Tuple[str, str], List[int]] = {}
+
+    for e, entry in enumerate(entries):
+        by_market.setdefault((entry.exchange, entry.market.name), []).append(e)
+
+    for key, rows in by_market.items():
+        c: Candles = candles[key]
+        start: np.ndarray = c.time[[entries[e].candle for e in rows]]
+        ends: np.ndarray = start[:, None] + windows[None, :]
+        last: np.ndarray = np.searchsorted(c.time, ends, "right") - 1
+        prices: np.ndarray = c.close[last]
+        prices[ends > c.time[-1]] = np.nan
+        exit_[rows] = prices
+
+    return fills, exit_
+
+def summarise(mask: np.ndarray, fills: Fills, exit_: np.ndarray) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Summarises the returns of a subset of entries.
+
+    Parameters
+    ----------
+    mask: np.ndarray
+        Which entries to include, of shape (entries,).
+    fills: Fills
+        The orders from :func:`simulate`.
+    exit_: np.ndarray
+        The exit prices from :func:`simulate`.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        The amount of trades with an exit price, the mean return, and the
+        fraction of trades with a positive return, each of shape
+        (multipliers, windows).
+    """
+    # The return of selling the order's quantity at the exit price.
+    returns: np.ndarray = \
+        exit_[mask][:, None, :] * fills.quantity[mask][:, :, None] \
+        / fills.total[mask][:, :, None] - 1
+    valid: np.ndarray = ~np.isnan(returns)
+    trades: np.ndarray = valid.sum(axis = 0)
+
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        mean: np.ndarray = np.where(valid, returns, 0).sum(axis = 0) / trades
+        wins: np.ndarray = (valid & (returns > 0)).sum(axis = 0) / trades
+
+    return trades, mean, wins
+
+def write_orders(path: str, entries: List[Entry],
+                 tweets: List[Tuple[float, str]], multipliers: List[Decimal],
+                 fills: Fills) -> None:
+    """Writes every filled order to a CSV file.
+
+    Parameters
+    ----------
+    path: str
+        The path of the file.
+    entries: List[Entry]
+        The entries.
+    tweets: List[Tuple[float, str]]
+        The times the tweets were received and their texts.
+    multipliers: List[Decimal]
+        The multipliers.
+    fills: Fills
+        The orders from :func:`simulate`.
+
+    Returns
+    -------
+    None
+    """
+    with open(path, "w", newline = "", encoding = "utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["time", "exchange", "market", "multiplier", "price",
+                         "quantity", "total"])
+
+        for e, entry in enumerate(entries):
+            for m, multiplier in enumerate(multipliers):
+                if np.isnan(fills.price[e, m]):
+                    continue
+
+                writer.writerow([tweets[entry.tweet][0], entry.exchange,
+                                 entry.market.name, str(multiplier),
+                                 float(fills.price[e, m]),
+                                 float(fills.quantity[e, m]),
+                                 float(fills.total[e, m])])
+
+def _print(label: str, matched: int, multipliers: List[Decimal],
+           windows: List[str], filled: np.ndarray, mean: np.ndarray) -> None:
+    print(f"\nSearch terms: {label or '(any)'} | {matched} tweets matched")
+    print(f"{'multiplier':>10} {'filled':>7} "
+          + " ".join(f"{w:>8}" for w in windows))
+
+    for m, multiplier in enumerate(multipliers):
+        print(f"{multiplier:>10} {int(filled[m]):>7} "
+              + " ".join(f"{v * 100:>7.2f}%" if not np.isnan(v) else
+                         f"{'-':>8}" for v in mean[m]))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = __doc__.split("\n")[0])
+    parser.add_argument("archive",
+                        help = "path of the archive without the extensions")
+    parser.add_argument("--markets", required = True,
+                        help = "JSON file of the currencies and markets")
+    parser.add_argument("--candles", required = True,
+                        help = "folder of the candle files")
+    parser.add_argument("--terms", action = "append",
+                        help = "comma-separated search terms to compare; may "
+                               "be repeated; defaults to search_term")
+    parser.add_argument("--multipliers",
+                        help = "comma-separated multipliers to compare; "
+                               "defaults to the configured multiplier")
+    parser.add_argument("--windows", default = "1m,5m,15m,1h,4h,1d",
+                        help = "comma-separated holding windows")
+    parser.add_argument("--delay", type = float, default = 1,
+                        help = "seconds from a tweet to its order being filled")
+    parser.add_argument("--fill", choices = ("open", "high"), default = "high",
+                        help = "price of the candle at which orders fill")
+    parser.add_argument("--user", type = int, action = "append", default = [],
+                        help = "ID of a user whose tweets to test")
+    parser.add_argument("--csv", help = "file to which to write every result")
+    parser.add_argument("--orders",
+                        help = "file to which to write every simulated order")
+    args = parser.parse_args()
+
+    logging.basicConfig(level = logging.WARNING)
+    g.log = logging.getLogger("bot")
+
+    if not utils.load_config():
+        return
+
+    # The database is only needed for the duration of the backtest.
+    database: DatabaseConfig = g.config.database._replace(
+            file = ":memory:", warm_start = False, refresh_interval = 0)
+    g.config = g.config._replace(database = database)
+
+    start: float = time.perf_counter()
+    currencies, g.exchanges = load_markets(args.markets)
+    listings: Listings = {ex.name: ex.get_markets() for ex in g.exchanges}
+    g.db = Database(lambda: (currencies, listings))
+
+    term: Terms = g.config.twitter.search_term
+    term_sets: List[str] = args.terms if args.terms is not None else \
+        [",".join(term)]
+    multipliers: List[Decimal] = \
+        [Decimal(m) for m in args.multipliers.split(",")] if args.multipliers \
+        else [g.config.order.multiplier]
+    window_labels: List[str] = args.windows.split(",")
+    windows: np.ndarray = \
+        np.array([parse_duration(w) for w in window_labels], dtype = float)
+
+    tweets: List[Tuple[float, str]] = read_tweets(args.archive, args.user)
+    entries, candles = find_entries(tweets, Path(args.candles), args.delay)
+    fills, exit_ = simulate(entries, candles, multipliers, windows, args.fill)
+    tweeted: np.ndarray = np.array([entry.tweet for entry in entries],
+                                   dtype = int)
+
+    print(f"{len(tweets)} tweets, {len(entries)} with a currency and candles, "
+          f"{len(term_sets) * len(multipliers) * len(windows)} combinations; "
+          f"mean return per trade")
+
+    rows: List[list] = []
+
+    for label in term_sets:
+        terms: Optional[Pattern] = compile_terms(label.split(","))
+        matched: np.ndarray = np.array(
+                [terms is None or terms.search(text) is not None
+                 for _, text in tweets], dtype = bool)
+        mask: np.ndarray = matched[tweeted] if len(entries) else \
+            np.zeros(0, dtype = bool)
+        trades, mean, wins = summarise(mask, fills, exit_)
+        _print(label, int(matched.sum()), multipliers, window_labels,
+               (~np.isnan(fills.price[mask])).sum(axis = 0), mean)
+
+        for m, multiplier in enumerate(multipliers):
+            for w, window in enumerate(window_labels):
+                rows.append([label, str(multiplier), window, int(trades[m, w]),
+                             float(mean[m, w]), float(wins[m, w])])
+
+    if args.csv:
+        with open(args.csv, "w", newline = "", encoding = "utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["terms", "multiplier", "window", "trades",
+                             "mean_return", "win_rate"])
+            writer.writerows(rows)
+
+    if args.orders:
+        write_orders(args.orders, entries, tweets, multipliers, fills)
+
+    g.db.close()
+    print(f"\nFinished in {time.perf_counter() - start:.2f} seconds.")
+
+if __name__ == "__main__":
+    main()
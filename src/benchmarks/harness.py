@@ -0,0 +1,251 @@
+"""Shared pieces of the offline benchmarks.
+
+Provides a base configuration, a local HTTP server standing in for remote
+hosts, an exchange with simulated latency, and latency percentiles.
+"""
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn
+from threading import Thread
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+import json
+import ssl
+import time
+
+from exchanges.exchange import Exchange
+from exchanges.plans import OrderPlan
+
+FIXTURES: Path = Path(__file__).parent / "fixtures"
+
+# Creates a response's status, headers and body from the request's path.
+Responder = Callable[[str], Tuple[int, Dict[str, str], bytes]]
+
+def base_config() -> dict:
+    """Creates a configuration with every setting at its documented default.
+
+    Credentials are empty and Binance and Bittrex are enabled. The document
+    can be changed before it's parsed with :func:`utils.config.parse`.
+
+    Returns
+    -------
+    dict
+        The configuration's document.
+    """
+    return {
+        "twitter": {
+            "api": {"key": "", "secret": "", "access_token": "",
+                    "access_secret": ""},
+            "user": "exchange",
+            "search_term": "",
+            "users": [],
+            "search_text": True,
+            "search_image": True,
+            "concurrent": False,
+            "ignore_retweets": True,
+            "disconnect_on_first": False,
+            "log_tweets": False,
+            "workers": 0,
+            "queue_size": 16,
+            "drop_policy": "oldest",
+            "archive": {"file": "", "compress": True}
+        },
+        "exchanges": {
+            "binance": {"priority": 1, "key": "", "secret": "",
+                        "use_multiplier": False, "recvWindow": 5000,
+                        "rate_limit": {"weight": 1200, "window": 60,
+                                       "reserve": 0.25}},
+            "bittrex": {"priority": 2, "key": "", "secret": "",
+                        "use_multiplier": True,
+                        "rate_limit": {"weight": 60, "window": 60,
+                                       "reserve": 0.25}},
+            "paper": {"priority": 0, "use_multiplier": False,
+                      "file": "benchmarks/fixtures/markets.json",
+                      "source": "Binance", "seed": 0,
+                      "latency": {"median": 50, "sigma": 0.5},
+                      "volatility": 0.001, "partial_rate": 0.1,
+                      "reject_rate": 0.02, "orders_file": ""}
+        },
+        "order": {
+            "quote_currencies": {"btc": 0.01, "eth": 0.1},
+            "multiplier": 0.05,
+            "dispatch": "sequential"
+        },
+        "ocr": {"workers": 2, "max_width": 1600, "threshold": 128, "tiles": 4,
+                "overlap": 0.1, "cache_size": 0, "cache_distance": 0,
+                "cache_file": "", "cpu_budget": 3},
+        "media": {"host": "", "connections": 4, "min_width": 1200,
+                  "max_bytes": 5000000, "timeout": 5},
+        "search_currency_name": False,
+        "tessdata_dir": "",
+        "tesseract_cmd": "",
+        "startup": {"timeouts": {"exchanges": 20, "currencies": 20,
+                                 "markets": 20, "twitter": 20, "ocr": 20}},
+        "database": {"file": "exchanges.db", "warm_start": False,
+                     "refresh_interval": 0, "refresh_jitter": 0},
+        "transport": {"connections": 4, "keep_alive": 30, "timeout": 10},
+        "prices": {"enabled": False, "interval": 1, "max_age": 2,
+                   "stream": True},
+        "trace": {"enabled": False, "file": ""},
+        "reload": {"signal": False, "interval": 0},
+        "verbose": False,
+        "queue_logs": False
+    }
+
+def load_fixture(name: str):
+    """Deserialises a JSON file from the fixtures folder."""
+    with open(FIXTURES / name, "r", encoding = "utf-8") as file:
+        return json.load(file)
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # The headers and body are written separately, which Nagle's algorithm
+    # would delay until the client's delayed acknowledgement.
+    disable_nagle_algorithm = True
+
+    @property
+    def timeout(self) -> Optional[float]:
+        # Idle connections are closed after this long.
+        return self.server.idle_timeout
+
+    def _send(self, body: bool) -> None:
+        route = self.server.routes.get(self.path.split("?")[0].split(":")[0])
+
+        if route is None:
+            self.send_error(404)
+            return
+
+        status, headers, content = \
+            route(self.path) if callable(route) else (200, {}, route)
+
+        self.send_response(status)
+
+        for name, value in headers.items():
+            self.send_header(name, value)
+
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+
+        if body:
+            self.wfile.write(content)
+
+    def do_GET(self):
+        self._send(True)
+
+    def do_HEAD(self):
+        self._send(False)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send(True)
+
+    def log_message(self, *args):
+        pass
+
+class StandInServer:
+    """Serves content from memory over HTTP on a free local port.
+
+    Parameters
+    ----------
+    routes: Dict[str, Union[bytes, Responder]]
+        The content to serve for each path, or a function which creates the
+        response. The query string and a Twitter size suffix such as
+        ``:large`` are ignored when matching paths.
+    idle_timeout: float, optional
+        Seconds after which idle connections are closed, like remote hosts do.
+        Connections are kept open indefinitely if :any:`None`.
+    context: ssl.SSLContext, optional
+        The context with which to serve HTTPS instead of HTTP.
+    """
+    def __init__(self, routes: Dict[str, Union[bytes, Responder]],
+                 idle_timeout: Optional[float] = None,
+                 context: Optional[ssl.SSLContext] = None):
+        self._server: _Server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.routes = routes
+        self._server.idle_timeout = idle_timeout
+
+        if context:
+            self._server.socket = context.wrap_socket(self._server.socket,
+                                                      server_side = True)
+
+        self._thread: Thread = Thread(target = self._server.serve_forever,
+                                      daemon = True)
+        self._thread.start()
+
+        scheme: str = "https" if context else "http"
+        self.url: str = f"{scheme}://127.0.0.1:{self._server.server_port}"
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+class FakeExchange(Exchange):
+    """An exchange which loads markets from a fixture and sleeps for requests.
+
+    Parameters
+    ----------
+    name: str
+        The name of the exchange in the markets fixture.
+    latency: float
+        Seconds each simulated request takes. Placing an order takes two
+        requests: one for the price and one for the order.
+    reject: bool, optional
+        :keyword:`True` to fail every order after its request.
+    """
+    def __init__(self, name: str, latency: float, reject: bool = False):
+        super().__init__(name)
+        self._latency: float = latency
+        self._reject: bool = reject
+        self._markets: List[dict] = \
+            load_fixture("markets.json")["markets"][name]
+
+        self.orders: List[Exchange.Market] = []
+
+    def get_markets(self) -> List[Exchange.Market]:
+        return [Exchange.Market(
+                    m["name"],
+                    Exchange.Currency(m["base"], None, m["base_precision"]),
+                    Exchange.Currency(m["quote"], None, m["quote_precision"]),
+                    Decimal(m["step"]) if m["step"] else None)
+                for m in self._markets]
+
+    def prepare_order(self, market: Exchange.Market, plan: OrderPlan,
+                      budget: Optional[Decimal] = None) -> Exchange.Order:
+        time.sleep(self._latency)
+
+        return Exchange.Order(market, Decimal(1), Decimal(1))
+
+    def submit_order(self, order: Exchange.Order) -> bool:
+        time.sleep(self._latency)
+
+        if self._reject:
+            return False
+
+        self.orders.append(order.market)
+
+        return True
+
+def percentiles(samples: Sequence[float],
+                points: Sequence[int] = (50, 95, 99)) -> Dict[int, float]:
+    """Computes nearest-rank percentiles.
+
+    Parameters
+    ----------
+    samples: Sequence[float]
+        The samples; must not be empty.
+    points: Sequence[int], optional
+        The percentiles to compute.
+
+    Returns
+    -------
+    Dict[int, float]
+        The value of each percentile.
+    """
+    ordered: List[float] = sorted(samples)
+
+    return {p: ordered[min(len(ordered) - 1,
+                           max(0, -(-p * len(ordered) // 100) - 1))]
+            for p in points}
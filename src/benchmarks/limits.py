@@ -0,0 +1,169 @@
+"""Measures orders sent while background requests saturate the rate limit.
+
+Run from the ``src`` directory::
+
+    python -m benchmarks.limits [--seconds S] [--weight W] [--window S]
+                                [--threads N] [--interval S]
+
+A local server stands in for Binance. It counts the weight of requests in
+fixed windows, reports it in ``X-MBX-USED-WEIGHT`` headers like Binance does,
+and rejects requests over the limit with 429. Background threads request all
+prices as fast as they can while orders are sent on an interval. This is run
+with the rate limiter configured like the exchange, then with it effectively
+disabled, and the order latency and rejections of each are reported.
+
+Requires python-binance.
+"""
+from threading import Event, Lock, Thread
+from typing import Dict, List, Tuple
+import argparse
+import json
+import logging
+import math
+import time
+
+from binance.client import Client
+
+from benchmarks.harness import StandInServer, base_config, percentiles
+from benchmarks.transport import ORDER
+from exchanges import limits
+from exchanges.binance import Binance
+from exchanges.transport import Transport
+from utils import config
+import utils.globals as g
+
+PRICES: bytes = json.dumps(
+        [{"symbol": f"C{i}BTC", "price": "0.00100000"}
+         for i in range(200)]).encode()
+
+class _Limit:
+    # Tracks the weight used in fixed windows like Binance does.
+    def __init__(self, weight: int, window: float):
+        self._weight: int = weight
+        self._window: float = window
+        self._lock: Lock = Lock()
+        self._start: float = time.monotonic()
+        self._used: int = 0
+
+        self.requests: int = 0
+        self.rejected: int = 0
+
+    def respond(self, weight: int, body: bytes):
+        def responder(path: str) -> Tuple[int, Dict[str, str], bytes]:
+            with self._lock:
+                now: float = time.monotonic()
+
+                if now - self._start >= self._window:
+                    self._start = now
+                    self._used = 0
+
+                self.requests += 1
+                self._used += weight
+                headers: Dict[str, str] = \
+                    {"X-MBX-USED-WEIGHT": str(self._used)}
+
+                if self._used > self._weight:
+                    self.rejected += 1
+                    retry: float = self._window - (now - self._start)
+                    headers["Retry-After"] = str(math.ceil(retry))
+
+                    return 429, headers, b'{"code": -1003, "msg": "Limited"}'
+
+            return 200, headers, body
+
+        return responder
+
+def _run(args, server: StandInServer, limit: _Limit, document: dict,
+         limited: bool) -> Dict[str, object]:
+    document["exchanges"]["binance"]["rate_limit"] = {
+        "weight": args.weight if limited else 10 ** 9,
+        "window": args.window,
+        "reserve": 0.25
+    }
+    g.config = config.parse(document)
+    g.transport = Transport(args.threads + 1, 0, 10)
+    exchange: Binance = Binance()
+    stop: Event = Event()
+
+    def background() -> None:
+        with limits.priority(limits.REFRESH):
+            while not stop.is_set():
+                exchange.get_prices()
+
+    # Starts on a fresh window.
+    time.sleep(args.window)
+    limit.requests = limit.rejected = 0
+
+    threads: List[Thread] = [Thread(target = background, daemon = True)
+                             for _ in range(args.threads)]
+
+    for thread in threads:
+        thread.start()
+
+    latencies: List[float] = []
+    placed: int = 0
+    end: float = time.monotonic() + args.seconds
+
+    while time.monotonic() < end:
+        time.sleep(args.interval)
+
+        start: float = time.perf_counter()
+        placed += exchange.submit_order(ORDER)
+        latencies.append(time.perf_counter() - start)
+
+    stop.set()
+
+    for thread in threads:
+        thread.join()
+
+    g.transport.close()
+    p: Dict[int, float] = percentiles(latencies)
+
+    return {"orders": f"{placed}/{len(latencies)}",
+            "p50": f"{p[50] * 1e3:.1f} ms",
+            "p99": f"{p[99] * 1e3:.1f} ms",
+            "requests": limit.requests,
+            "rejected": limit.rejected}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = __doc__.split("\n")[0])
+    parser.add_argument("--seconds", type = float, default = 6,
+                        help = "seconds to run each scenario for")
+    parser.add_argument("--weight", type = int, default = 120,
+                        help = "weight the server allows per window")
+    parser.add_argument("--window", type = float, default = 2,
+                        help = "length of the server's window in seconds")
+    parser.add_argument("--threads", type = int, default = 4,
+                        help = "threads sending background requests")
+    parser.add_argument("--interval", type = float, default = 0.2,
+                        help = "seconds between orders")
+    args = parser.parse_args()
+
+    limit: _Limit = _Limit(args.weight, args.window)
+    server: StandInServer = StandInServer({
+        "/api/v1/ping": limit.respond(1, b"{}"),
+        "/api/v1/ticker/allPrices": limit.respond(2, PRICES),
+        "/api/v3/order": limit.respond(1, b'{"clientOrderId": "benchmark"}')
+    })
+    Client.API_URL = server.url + "/api"
+
+    logging.basicConfig(level = logging.CRITICAL)
+    g.log = logging.getLogger("bot")
+    document: dict = base_config()
+    document["exchanges"]["binance"].update(key = "benchmark",
+                                            secret = "benchmark")
+
+    print(f"Server allows {args.weight} weight per {args.window:g} s; "
+          f"{args.threads} background threads; an order every "
+          f"{args.interval:g} s for {args.seconds:g} s")
+
+    for limited in (True, False):
+        result: Dict[str, object] = _run(args, server, limit, document,
+                                         limited)
+        print(f"{'limited' if limited else 'unlimited':>10} | "
+              + ", ".join(f"{key}: {value}" for key, value in result.items()))
+
+    server.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Measures the time logging adds to handling a status.
+
+Run from the ``src`` directory::
+
+    python -m benchmarks.logs [--runs N] [--interval MS] [--latency MS]
+                              [--verbose]
+
+Recorded statuses from ``fixtures/statuses.json`` are handled by the real
+:class:`~twitter.stream_listener.StreamListener` and :func:`bot.callback`, with
+the bot's Logger and the tweet Logger writing to files in a temporary
+directory. Orders go to exchanges which sleep instead of making requests.
+Statuses are handled ``--interval`` milliseconds apart, like statuses arriving
+from a stream. Only the text of statuses is searched.
+
+Statuses are handled with logging disabled, with the usual synchronous
+handlers, and with queued handlers. For each, the CPU time spent on the
+status's thread and the wall time taken to handle it are reported. The CPU
+time is the work logging puts on the hot path; unlike the wall time, it isn't
+affected by how long the simulated requests sleep.
+"""
+from typing import Dict, List, Tuple
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from tweepy.models import Status
+
+from benchmarks.harness import FakeExchange, base_config, load_fixture, \
+    percentiles
+from exchanges import exchanges
+from exchanges.db import Database
+from exchanges.exchange import Exchange
+from twitter.rules import compile_rules
+from twitter.stream_listener import StreamListener
+from utils import config, utils
+import bot
+import utils.globals as g
+
+MODES = ("disabled", "synchronous", "queued")
+
+def _reset() -> None:
+    # Removes the handlers left by the previous mode.
+    utils.stop_queues()
+
+    for name in ("bot", "StreamLogger"):
+        logger: logging.Logger = logging.getLogger(name)
+
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+
+def _run(mode: str, document: dict, statuses: List[dict], runs: int,
+         interval: float, verbose: bool) -> Tuple[List[float], List[float]]:
+    _reset()
+    document["twitter"]["log_tweets"] = mode != "disabled"
+    document["queue_logs"] = mode == "queued"
+    g.config = config.parse(document)
+
+    utils.get_logger("bot")
+    g.log.handlers[0].stream = open(os.devnull, "w")
+
+    if mode == "disabled":
+        g.log.setLevel(logging.CRITICAL)
+    elif verbose:
+        g.log.setLevel(logging.DEBUG)
+        g.log.handlers[0].setLevel(logging.DEBUG)
+
+    if g.config.queue_logs:
+        utils.queue_handlers(g.log)
+
+    author: dict = statuses[0]["user"]
+    listener: StreamListener = StreamListener(
+            compile_rules({author["screen_name"]: author["id"]}),
+            bot.callback)
+    cpu: List[float] = []
+    wall: List[float] = []
+
+    for _ in range(runs):
+        for data in statuses:
+            status: Status = Status.parse(None, data)
+            start: Tuple[float, float] = (utils.thread_time(),
+                                          time.perf_counter())
+            listener.on_status(status)
+            cpu.append(utils.thread_time() - start[0])
+            wall.append(time.perf_counter() - start[1])
+            time.sleep(interval)
+
+    listener.close()
+    utils.stop_queues()
+
+    return cpu, wall
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = __doc__.split("\n")[0])
+    parser.add_argument("--runs", type = int, default = 100,
+                        help = "times to replay the corpus")
+    parser.add_argument("--interval", type = float, default = 5,
+                        help = "milliseconds between statuses")
+    parser.add_argument("--latency", type = float, default = 1,
+                        help = "milliseconds each exchange request takes")
+    parser.add_argument("--verbose", action = "store_true",
+                        help = "log debug messages like the verbose option")
+    args = parser.parse_args()
+
+    document: dict = base_config()
+    document["twitter"]["search_image"] = False
+    g.config = config.parse(document)
+
+    # The database and logs are written to the working directory.
+    os.chdir(tempfile.mkdtemp())
+    utils.get_logger("bot")
+
+    currencies: List[Exchange.Currency] = \
+        [Exchange.Currency(c["symbol"], c["name"], None)
+         for c in load_fixture("markets.json")["currencies"]]
+    exchanges.get_currencies = lambda: currencies
+    g.exchanges = [FakeExchange(name, args.latency / 1000)
+                   for name in ("Binance", "Bittrex")]
+    g.db = Database()
+
+    statuses: List[dict] = load_fixture("statuses.json")["statuses"]
+
+    print(f"{args.runs} runs of {len(statuses)} statuses, "
+          f"{args.interval:g} ms apart, "
+          f"{args.latency:g} ms exchange latency, "
+          f"{'debug' if args.verbose else 'info'} level")
+    print(f"{'logging':>12} {'cpu p50':>9} {'cpu p99':>9} {'cpu mean':>9} "
+          f"{'wall p50':>9} {'wall p99':>9}")
+
+    for mode in MODES:
+        cpu, wall = _run(mode, document, statuses, args.runs,
+                         args.interval / 1000, args.verbose)
+        c: Dict[int, float] = percentiles(cpu)
+        w: Dict[int, float] = percentiles(wall)
+        print(f"{mode:>12} "
+              + " ".join(f"{v * 1e6:>6.0f} us" for v in
+                         (c[50], c[99], sum(cpu) / len(cpu), w[50], w[99])))
+
+    g.db.close()
+    _reset()
+
+if __name__ == "__main__":
+    main()
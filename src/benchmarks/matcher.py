@@ -0,0 +1,101 @@
+"""Compares the currency matcher with the previous per-currency search.
+
+Run from the ``src`` directory::
+
+    python -m benchmarks.matcher [currencies] [iterations]
+
+No network access is required; the currencies are generated.
+"""
+from typing import List, Optional
+import random
+import re
+import string
+import sys
+import timeit
+
+from exchanges.exchange import Exchange
+from utils.matcher import CurrencyMatcher
+
+# Typical Tesseract output for an exchange listing announcement screenshot.
+OCR_TEXT: str = """\
+Binance Lists Zilliqa (ZIL)
+Fellow Binancians,
+
+Binance will list Zilliqa (ZlL) and open trading for ZIL/BTC, ZIL/ETH and
+ZIL/BNB trading pairs at 2018/01/24 9:00 AM (UTC). Users can now start
+depositing ZIL in preparation for trading.
+
+Risk warning: Cryptocurrency investment is subject to high market risk. Please
+make your investments cautiously. Binance will make best efforts to choose high
+quality coins, but will not be responsible for your investment losses.
+Thanks for your support!
+Binance Team
+2018/01/24 | ' ll
+"""
+
+def _currencies(count: int) -> List[Exchange.Currency]:
+    rng: random.Random = random.Random(0)
+    currencies: List[Exchange.Currency] = [
+        Exchange.Currency("BTC", "Bitcoin", None),
+        Exchange.Currency("ETH", "Ethereum", None),
+        Exchange.Currency("XRP", "Ripple", None)]
+    symbols = {c.symbol for c in currencies}
+
+    while len(currencies) < count - 1:
+        symbol: str = "".join(rng.choices(string.ascii_uppercase,
+                                          k = rng.randint(2, 5)))
+
+        if symbol in symbols or symbol == "ZIL":
+            continue
+
+        symbols.add(symbol)
+        name: str = symbol.capitalize() + rng.choice(("coin", " Token", ""))
+        currencies.append(Exchange.Currency(symbol, name, None))
+
+    # The listed currency has a low rank, as new listings usually do.
+    currencies.append(Exchange.Currency("ZIL", "Zilliqa", None))
+
+    return currencies
+
+def _legacy(currencies: List[Exchange.Currency], search_name: bool,
+            text: str) -> Optional[Exchange.Currency]:
+    return next((Exchange.Currency(symbol, name, precision)
+                 for symbol, name, precision in currencies
+                 if re.search((name if search_name else "")
+                              + r"\s*?[(\[{]+?\s*?" + symbol + r"\s*?[)\]}]",
+                              text,
+                              re.IGNORECASE)),
+                None)
+
+def main() -> None:
+    count: int = int(sys.argv[1]) if len(sys.argv) > 1 else 1600
+    iterations: int = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    currencies: List[Exchange.Currency] = _currencies(count)
+
+    print(f"{len(currencies)} currencies, {iterations} iterations")
+
+    for search_name in (False, True):
+        build: float = timeit.timeit(
+                lambda: CurrencyMatcher(currencies, search_name), number = 1)
+        matcher: CurrencyMatcher = CurrencyMatcher(currencies, search_name)
+
+        expected = _legacy(currencies, search_name, OCR_TEXT)
+        actual = matcher.search(OCR_TEXT)
+        assert expected == actual, f"{expected} != {actual}"
+
+        legacy: float = timeit.timeit(
+                lambda: _legacy(currencies, search_name, OCR_TEXT),
+                number = iterations) / iterations
+        new: float = timeit.timeit(
+                lambda: matcher.search(OCR_TEXT),
+                number = iterations) / iterations
+
+        print(f"search_currency_name={search_name}: "
+              f"legacy {legacy * 1e3:.3f} ms, "
+              f"matcher {new * 1e3:.3f} ms "
+              f"({legacy / new:.0f}x), "
+              f"build {build * 1e3:.1f} ms, "
+              f"match {actual.symbol if actual else None}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Measures image currency detection for several OCR settings.
+
+Run from the ``src`` directory::
+
+    python -m benchmarks.ocr <folder> [workers]
+
+Each image in the folder must be named after the symbol of the currency it
+announces followed by an underscore or a period e.g. ``ZIL_binance.png``. The
+symbols of all images, plus those in the optional ``currencies.txt`` in the
+folder (one per line), are the currencies searched for.
+
+Requires Pillow and either tesserocr or pytesseract.
+"""
+from pathlib import Path
+from statistics import median
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+import logging
+import re
+import sys
+import time
+
+try:
+    import Image
+except ImportError:
+    from PIL import Image
+
+from benchmarks.harness import base_config
+from exchanges.exchange import Exchange
+from utils import config, image
+from utils.matcher import CurrencyMatcher
+import utils.globals as g
+
+SETTINGS: List[Tuple[str, Dict]] = [
+    ("original", {"max_width": 0, "threshold": 0, "tiles": 1, "overlap": 0}),
+    ("preprocessed", {"max_width": 1600, "threshold": 128, "tiles": 1,
+                      "overlap": 0}),
+    ("2 tiles", {"max_width": 1600, "threshold": 128, "tiles": 2,
+                 "overlap": 0.1}),
+    ("4 tiles", {"max_width": 1600, "threshold": 128, "tiles": 4,
+                 "overlap": 0.1}),
+    ("6 tiles", {"max_width": 1600, "threshold": 128, "tiles": 6,
+                 "overlap": 0.15})]
+
+def _load(folder: Path) -> List[Tuple[str, Image.Image]]:
+    images: List[Tuple[str, Image.Image]] = []
+
+    for path in sorted(folder.iterdir()):
+        if path.suffix.lower() not in (".png", ".jpg", ".jpeg", ".gif"):
+            continue
+
+        img: Image.Image = Image.open(path)
+        img.load()
+        images.append((re.split(r"[_.]", path.name)[0].upper(), img))
+
+    return images
+
+def main() -> None:
+    folder: Path = Path(sys.argv[1])
+    workers: int = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    images: List[Tuple[str, Image.Image]] = _load(folder)
+
+    symbols = {symbol for symbol, _ in images}
+    extra: Path = folder / "currencies.txt"
+    if extra.exists():
+        symbols.update(s.strip().upper() for s in extra.read_text().split())
+
+    logging.basicConfig(level = logging.WARNING)
+    document: dict = base_config()
+    document["ocr"]["workers"] = workers
+    g.config = config.parse(document)
+    g.db = SimpleNamespace(matcher = CurrencyMatcher(
+            (Exchange.Currency(s, None, None) for s in sorted(symbols)),
+            False))
+    image.init()
+
+    print(f"{len(images)} images, "
+          f"{image.pool.workers if image.pool else 0} OCR workers")
+
+    for name, settings in SETTINGS:
+        document["ocr"].update(settings)
+        g.config = config.parse(document)
+        latencies: List[float] = []
+        correct: int = 0
+
+        for symbol, img in images:
+            start: float = time.perf_counter()
+            currency = image.find_currency(img)
+            latencies.append(time.perf_counter() - start)
+
+            if currency and currency.symbol == symbol:
+                correct += 1
+
+        print(f"{name:>12}: median {median(latencies) * 1e3:7.1f} ms, "
+              f"max {max(latencies) * 1e3:7.1f} ms, "
+              f"accuracy {correct}/{len(images)}")
+
+    if image.pool:
+        image.pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Measures the latency from a status arriving to an order being placed.
+
+Run from the ``src`` directory::
+
+    python -m benchmarks.pipeline [--runs N] [--latency MS] [--concurrent]
+                                  [--dispatch POLICY] [--reject EXCHANGE]
+                                  [--paper]
+
+Recorded statuses from ``fixtures/statuses.json`` are replayed through the real
+:class:`~twitter.stream_listener.StreamListener` and :func:`bot.callback`.
+Images are rendered from the fixture's text and served from a local HTTP
+server, and orders go to exchanges which sleep instead of making requests, so
+no network access is needed. With ``--paper``, orders go to the paper-trading
+exchange instead, with its simulated latency, fills and rejections. Latency
+percentiles are reported for each stage and overall.
+
+Requires tweepy, Pillow and either tesserocr or pytesseract.
+"""
+from collections import defaultdict
+from io import BytesIO
+from typing import Callable, DefaultDict, Dict, List
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+try:
+    import Image
+    import ImageDraw
+    import ImageFont
+except ImportError:
+    from PIL import Image, ImageDraw, ImageFont
+from tweepy.models import Status
+
+from benchmarks.harness import FIXTURES, FakeExchange, StandInServer, \
+    base_config, load_fixture, percentiles
+from exchanges import exchanges
+from exchanges.db import Database
+from exchanges.exchange import Exchange
+from exchanges.paper import Paper
+from twitter.rules import compile_rules
+from twitter.stream_listener import StreamListener
+from utils import config, image
+import bot
+import utils.globals as g
+
+samples: DefaultDict[str, List[float]] = defaultdict(list)
+
+def _timed(stage: str, function: Callable) -> Callable:
+    def wrapper(*args, **kwargs):
+        start: float = time.perf_counter()
+
+        try:
+            return function(*args, **kwargs)
+        finally:
+            samples[stage].append(time.perf_counter() - start)
+
+    return wrapper
+
+def _render(text: str) -> bytes:
+    try:
+        font = ImageFont.load_default(size = 36)
+    except TypeError:
+        font = ImageFont.load_default()
+
+    img: Image.Image = Image.new("RGB", (1200, 675), "white")
+    ImageDraw.Draw(img).multiline_text((40, 40), text, fill = "black",
+                                       font = font, spacing = 20)
+
+    buffer: BytesIO = BytesIO()
+    img.save(buffer, "PNG")
+
+    return buffer.getvalue()
+
+def _instrument() -> None:
+    image.parse_currency = _timed("parse_currency", image.parse_currency)
+    image.get_image = _timed("download", image.get_image)
+    image.recognise = _timed("ocr", image.recognise)
+    exchanges.get_markets = _timed("get_markets", exchanges.get_markets)
+    exchanges.place_order = _timed("place_order", exchanges.place_order)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = __doc__.split("\n")[0])
+    parser.add_argument("--runs", type = int, default = 5,
+                        help = "times to replay the corpus")
+    parser.add_argument("--latency", type = float, default = 20,
+                        help = "milliseconds each exchange request takes")
+    parser.add_argument("--concurrent", action = "store_true",
+                        help = "search text and images concurrently")
+    parser.add_argument("--dispatch", choices = list(exchanges.DISPATCHERS),
+                        default = "sequential",
+                        help = "how orders are dispatched to exchanges")
+    parser.add_argument("--reject", action = "append", default = [],
+                        help = "exchange which rejects every order")
+    parser.add_argument("--paper", action = "store_true",
+                        help = "place orders on the paper-trading exchange")
+    args = parser.parse_args()
+
+    fixture: dict = load_fixture("statuses.json")
+    server: StandInServer = StandInServer(
+            {"/" + name: _render(text)
+             for name, text in fixture["images"].items()})
+
+    logging.basicConfig(level = logging.WARNING)
+    g.log = logging.getLogger("bot")
+    document: dict = base_config()
+    document["twitter"]["concurrent"] = args.concurrent
+    document["order"]["dispatch"] = args.dispatch
+    document["media"]["host"] = server.url + "/"
+    document["exchanges"]["paper"]["file"] = str(FIXTURES / "markets.json")
+    g.config = config.parse(document)
+
+    # The database is written to the working directory.
+    os.chdir(tempfile.mkdtemp())
+
+    currencies: List[Exchange.Currency] = \
+        [Exchange.Currency(c["symbol"], c["name"], None)
+         for c in load_fixture("markets.json")["currencies"]]
+    exchanges.get_currencies = lambda: currencies
+
+    if args.paper:
+        g.exchanges = [Paper()]
+    else:
+        g.exchanges = [FakeExchange(name, args.latency / 1000,
+                                    name in args.reject)
+                       for name in ("Binance", "Bittrex")]
+
+    g.db = Database()
+    image.init()
+    _instrument()
+
+    statuses: List[dict] = fixture["statuses"]
+    author: dict = statuses[0]["user"]
+    listener: StreamListener = StreamListener(
+            compile_rules({author["screen_name"]: author["id"]}),
+            bot.callback)
+    listener._validate_status = _timed("validate", listener._validate_status)
+    totals: Dict[str, List[float]] = {"text": [], "image": []}
+
+    for _ in range(args.runs):
+        for raw in statuses:
+            data: dict = dict(raw)
+
+            for media in data.get("extended_entities", {}).get("media", []):
+                for key in ("media_url", "media_url_https"):
+                    media[key] = media[key].replace("{media}", server.url)
+
+            status: Status = Status.parse(None, data)
+            start: float = time.perf_counter()
+            listener.on_status(status)
+            elapsed: float = time.perf_counter() - start
+
+            totals["image" if "extended_entities" in data else "text"] \
+                .append(elapsed)
+
+    listener.close()
+    server.close()
+
+    print(f"{args.runs} runs of {len(statuses)} statuses, "
+          + ("paper trading, " if args.paper else
+             f"{args.latency:g} ms exchange latency, ") +
+          f"{'concurrent' if args.concurrent else 'sequential'} search, "
+          f"{args.dispatch} dispatch, "
+          f"{sum(len(e.orders) for e in g.exchanges)} orders")
+
+    if args.paper:
+        fills: DefaultDict[str, int] = defaultdict(int)
+
+        for order in g.exchanges[0].orders:
+            fills[order.status] += 1
+
+        print(", ".join(f"{count} {status}"
+                        for status, count in fills.items()))
+
+    print(f"{'stage':>16} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+
+    rows = list(samples.items()) + \
+        [(f"total ({kind})", values) for kind, values in totals.items()]
+
+    for stage, values in rows:
+        if not values:
+            continue
+
+        p: Dict[int, float] = percentiles(values)
+        print(f"{stage:>16} {len(values):>6} "
+              + " ".join(f"{p[i] * 1e3:>6.1f} ms" for i in (50, 95, 99)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Compares order plans with the previous per-order calculation.
+
+Run from the ``src`` directory::
+
+    python -m benchmarks.plans [iterations]
+
+The markets and prices come from ``fixtures/markets.json``; no network access
+is required.
+"""
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, List, Tuple, Union
+import sys
+import timeit
+
+from benchmarks.harness import base_config, load_fixture
+from exchanges.exchange import Exchange
+from exchanges.plans import OrderPlan, build_plans
+from utils import config
+import utils.globals as g
+
+# The legacy code read the configuration's document on every order.
+DOCUMENT: dict = base_config()
+DOCUMENT["exchanges"]["binance"]["use_multiplier"] = True
+
+def _legacy(market: Exchange.Market, price: str) -> Tuple[Decimal, Decimal]:
+    # Binance's _get_price and _get_quantity before plans were introduced.
+    price = price.rstrip("0")
+
+    p: Union[int, None] = market.quote.precision
+    precision: Decimal = Decimal(10) ** -p if p else -8
+
+    use_mult: bool = DOCUMENT["exchanges"]["binance"]["use_multiplier"]
+    mult_str: str = str(DOCUMENT["order"]["multiplier"]).rstrip("0")
+    mult: Decimal = Decimal(mult_str) if use_mult else Decimal(0)
+
+    price_d: Decimal = (Decimal(price) * (1 + mult)).quantize(precision)
+
+    quote_symbol: str = market.quote.symbol.lower()
+    total_f: float = DOCUMENT["order"]["quote_currencies"][quote_symbol]
+    total: Decimal = Decimal(str(total_f))
+
+    step: Decimal = market.step
+    quantity: Decimal = \
+        (total / price_d).quantize(step, rounding = ROUND_DOWN) if step \
+        else (total / price_d)
+
+    return price_d, quantity
+
+def _planned(plans: Dict[str, OrderPlan], market: Exchange.Market,
+             price: str) -> Tuple[Decimal, Decimal]:
+    return plans[market.name].apply(Decimal(price))[:2]
+
+def main() -> None:
+    iterations: int = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    g.config = config.parse(DOCUMENT)
+
+    cases: List[Tuple[Exchange.Market, str]] = [
+        (Exchange.Market(m["name"],
+                         Exchange.Currency(m["base"], None,
+                                           m["base_precision"]),
+                         Exchange.Currency(m["quote"], None,
+                                           m["quote_precision"]),
+                         Decimal(m["step"])),
+         m["price"])
+        for m in load_fixture("markets.json")["markets"]["Binance"]
+        if m["quote"].lower() in g.config.order.quote_currencies]
+    markets: List[Exchange.Market] = [m for m, _ in cases]
+
+    build: float = timeit.timeit(
+            lambda: build_plans((("Binance", m) for m in markets), g.config),
+            number = 1)
+    plans: Dict[str, OrderPlan] = \
+        build_plans((("Binance", m) for m in markets), g.config)["Binance"]
+
+    for market, price in cases:
+        expected = _legacy(market, price)
+        actual = _planned(plans, market, price)
+        assert expected == actual, f"{expected} != {actual}"
+
+    per_case: int = max(1, iterations // len(cases))
+
+    legacy: float = timeit.timeit(
+            lambda: [_legacy(m, p) for m, p in cases],
+            number = per_case) / (per_case * len(cases))
+    planned: float = timeit.timeit(
+            lambda: [_planned(plans, m, p) for m, p in cases],
+            number = per_case) / (per_case * len(cases))
+
+    print(f"{len(markets)} markets, {per_case * len(cases)} orders: "
+          f"legacy {legacy * 1e6:.2f} us, plans {planned * 1e6:.2f} us "
+          f"({legacy / planned:.1f}x), build {build * 1e3:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Replays archived statuses through the stream listener.
+
+Run from the ``src`` directory::
+
+    python -m benchmarks.replay ARCHIVE [--record N] [--start I] [--limit N]
+                                        [--speed X] [--user ID] [--paper]
+                                        [--latency MS]
+
+Statuses are read from a tweet archive (see the ``archive`` option) and passed
+to :meth:`~twitter.stream_listener.StreamListener.on_status` with the real
+:func:`bot.callback`. Orders go to exchanges which sleep instead of making
+requests, or to the paper-trading exchange. Statuses are replayed as fast as
+possible unless ``--speed`` is given, in which case they are spaced out like
+they were received, sped up by that factor. Only the text of statuses is
+searched, since archived images are on Twitter's servers.
+
+Statuses by any author are handled unless ``--user`` is given. ``--record``
+first appends copies of the recorded statuses in ``fixtures/statuses.json`` to
+the archive, which makes archives of any size for benchmarking.
+
+Requires tweepy.
+"""
+from itertools import cycle, islice
+from typing import Dict, List, Optional
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+from tweepy.models import Status
+
+from benchmarks.harness import FIXTURES, FakeExchange, base_config, \
+    load_fixture
+from exchanges import exchanges
+from exchanges.db import Database
+from exchanges.exchange import Exchange
+from exchanges.paper import Paper
+from twitter.archive import ArchiveReader, ArchiveWriter, Entry
+from twitter.rules import Rule, compile_terms
+from twitter.stream_listener import StreamListener
+from utils import config
+from utils.config import TwitterConfig
+import bot
+import utils.globals as g
+
+def _record(path: str, count: int) -> None:
+    statuses: List[dict] = load_fixture("statuses.json")["statuses"]
+    writer: ArchiveWriter = ArchiveWriter(path, True)
+    start: float = time.time()
+
+    # Like the stream, every status has in_reply_to_status_id, which is how
+    # statuses are told apart from other messages.
+    for i, status in enumerate(islice(cycle(statuses), count)):
+        writer.append(json.dumps(dict(status, id = status["id"] + i,
+                                      in_reply_to_status_id = None)),
+                      start + i / 1000)
+
+    writer.close()
+
+def _rule(user: int) -> Rule:
+    twitter: TwitterConfig = g.config.twitter
+
+    return Rule(user, str(user), compile_terms(twitter.search_term),
+                twitter.search_text, False, None)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = __doc__.split("\n")[0])
+    parser.add_argument("archive",
+                        help = "path of the archive without the extensions")
+    parser.add_argument("--record", type = int, default = 0,
+                        help = "fixture statuses to append to the archive")
+    parser.add_argument("--start", type = int, default = 0,
+                        help = "position of the first status to replay")
+    parser.add_argument("--limit", type = int,
+                        help = "most statuses to replay")
+    parser.add_argument("--speed", type = float, default = 0,
+                        help = "factor by which to speed up the original "
+                               "timing; 0 replays as fast as possible")
+    parser.add_argument("--user", type = int, action = "append", default = [],
+                        help = "ID of a user whose statuses to handle")
+    parser.add_argument("--paper", action = "store_true",
+                        help = "place orders on the paper-trading exchange")
+    parser.add_argument("--latency", type = float, default = 0,
+                        help = "milliseconds each exchange request takes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level = logging.WARNING)
+    g.log = logging.getLogger("bot")
+    document: dict = base_config()
+    document["twitter"]["search_image"] = False
+    document["exchanges"]["paper"]["file"] = str(FIXTURES / "markets.json")
+    g.config = config.parse(document)
+
+    path: str = os.path.abspath(args.archive)
+
+    if args.record:
+        _record(path, args.record)
+
+    # The database is written to the working directory.
+    os.chdir(tempfile.mkdtemp())
+
+    currencies: List[Exchange.Currency] = \
+        [Exchange.Currency(c["symbol"], c["name"], None)
+         for c in load_fixture("markets.json")["currencies"]]
+    exchanges.get_currencies = lambda: currencies
+    g.exchanges = [Paper()] if args.paper else \
+        [FakeExchange(name, args.latency / 1000)
+         for name in ("Binance", "Bittrex")]
+    g.db = Database()
+
+    rules: Dict[int, Rule] = {user: _rule(user) for user in args.user}
+    listener: StreamListener = StreamListener(rules, bot.callback)
+    reader: ArchiveReader = ArchiveReader(path)
+    stop: Optional[int] = \
+        args.start + args.limit if args.limit is not None else None
+    first: Optional[Entry] = None
+    replayed: int = 0
+    start: float = time.perf_counter()
+
+    for entry, raw in reader.read(args.start, stop):
+        status: Status = Status.parse(None, json.loads(raw))
+
+        if not args.user and status.author.id not in rules:
+            rules[status.author.id] = _rule(status.author.id)
+
+        if args.speed:
+            first = first or entry
+            delay: float = (entry.time - first.time) / args.speed \
+                - (time.perf_counter() - start)
+
+            if delay > 0:
+                time.sleep(delay)
+
+        listener.on_status(status)
+        replayed += 1
+
+    elapsed: float = time.perf_counter() - start
+    listener.close()
+    reader.close()
+    g.db.close()
+
+    print(f"Replayed {replayed} of {len(reader)} statuses in {elapsed:.2f} s "
+          f"({replayed / elapsed if elapsed else 0:,.0f} statuses/s), "
+          f"{sum(len(e.orders) for e in g.exchanges)} orders")
+
+if __name__ == "__main__":
+    main()
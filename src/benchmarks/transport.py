@@ -0,0 +1,141 @@
+"""Measures the latency of the first order after the connection sat idle.
+
+Run from the ``src`` directory::
+
+    python -m benchmarks.transport [--runs N] [--idle S] [--server-timeout S]
+                                   [--interval S] [--cert CERT --key KEY]
+
+Orders are sent by the real Binance client to a local server which, like
+remote hosts, closes connections left idle for ``--server-timeout`` seconds.
+Each order is sent after waiting ``--idle`` seconds, with and without
+keep-alive requests, and compared to orders sent back to back. The time taken
+to sign a request is also compared with and without the precomputed HMAC key.
+
+Passing a certificate and key serves HTTPS, which makes the cost of a new
+connection realistic. A certificate for the local server can be created with::
+
+    openssl req -x509 -newkey rsa:2048 -nodes -days 1 -subj /CN=127.0.0.1 \\
+        -addext subjectAltName=IP:127.0.0.1 -keyout key.pem -out cert.pem
+
+Requires python-binance.
+"""
+from decimal import Decimal
+from typing import Dict, List, Optional
+import argparse
+import logging
+import os
+import ssl
+import time
+import timeit
+
+from binance.client import Client
+
+from benchmarks.harness import StandInServer, base_config, percentiles
+from exchanges.binance import Binance
+from exchanges.exchange import Exchange
+from exchanges.transport import Transport
+from utils import config
+import utils.globals as g
+
+ORDER: Exchange.Order = Exchange.Order(
+        Exchange.Market("ABCBTC",
+                        Exchange.Currency("ABC", None, 8),
+                        Exchange.Currency("BTC", None, 8),
+                        Decimal("1")),
+        Decimal("0.0001"),
+        Decimal("100"))
+
+def _measure(runs: int, interval: float, wait: float) -> List[float]:
+    g.transport = Transport(4, interval, 10)
+    exchange: Binance = Binance()
+    samples: List[float] = []
+
+    for _ in range(runs):
+        time.sleep(wait)
+
+        start: float = time.perf_counter()
+        exchange.submit_order(ORDER)
+        samples.append(time.perf_counter() - start)
+
+    g.transport.close()
+
+    return samples
+
+def _measure_signing(number: int) -> Dict[str, float]:
+    api: Client = Binance()._api
+    data: dict = {"symbol": "ABCBTC", "side": "BUY", "type": "MARKET",
+                  "quantity": "100", "recvWindow": 5000,
+                  "timestamp": int(time.time() * 1000)}
+
+    return {
+        "library": timeit.timeit(
+                lambda: Client._generate_signature(api, data),
+                number = number) / number,
+        "precomputed": timeit.timeit(
+                lambda: api._generate_signature(data),
+                number = number) / number
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = __doc__.split("\n")[0])
+    parser.add_argument("--runs", type = int, default = 5,
+                        help = "orders to send in each scenario")
+    parser.add_argument("--idle", type = float, default = 2,
+                        help = "seconds to wait before each idle order")
+    parser.add_argument("--server-timeout", type = float, default = 1,
+                        help = "seconds after which the server closes idle "
+                               "connections")
+    parser.add_argument("--interval", type = float, default = 0.5,
+                        help = "seconds between keep-alive requests")
+    parser.add_argument("--cert", help = "certificate with which to serve "
+                                         "HTTPS")
+    parser.add_argument("--key", help = "private key of the certificate")
+    args = parser.parse_args()
+
+    context: Optional[ssl.SSLContext] = None
+
+    if args.cert:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(args.cert, args.key)
+        os.environ["REQUESTS_CA_BUNDLE"] = args.cert
+
+    server: StandInServer = StandInServer(
+            {"/api/v1/ping": b"{}",
+             "/api/v3/order": b'{"clientOrderId": "benchmark"}'},
+            args.server_timeout, context)
+    Client.API_URL = server.url + "/api"
+
+    logging.basicConfig(level = logging.WARNING)
+    g.log = logging.getLogger("bot")
+    document: dict = base_config()
+    document["exchanges"]["binance"].update(key = "benchmark",
+                                            secret = "benchmark")
+    g.config = config.parse(document)
+
+    scenarios: Dict[str, List[float]] = {
+        "hot": _measure(args.runs, 0, 0),
+        "idle": _measure(args.runs, 0, args.idle),
+        "idle, keep-alive": _measure(args.runs, args.interval, args.idle)
+    }
+
+    print(f"{args.runs} orders per scenario over "
+          f"{'HTTPS' if context else 'HTTP'}, {args.idle:g} s idle, "
+          f"server closes idle connections after {args.server_timeout:g} s, "
+          f"keep-alive every {args.interval:g} s")
+    print(f"{'scenario':>16} {'p50':>9} {'p95':>9} {'p99':>9}")
+
+    for scenario, values in scenarios.items():
+        p: Dict[int, float] = percentiles(values)
+        print(f"{scenario:>16} "
+              + " ".join(f"{p[i] * 1e3:>6.2f} ms" for i in (50, 95, 99)))
+
+    g.transport = Transport(4, 0, 10)
+
+    for kind, seconds in _measure_signing(100000).items():
+        print(f"{kind + ' signing':>20} {seconds * 1e6:>6.2f} us")
+
+    g.transport.close()
+    server.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,137 @@
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Event
+from typing import Dict, List, Optional, Set
 import logging
+import time
 import traceback
 
 from exchanges import exchanges
 from exchanges.db import Database
 from exchanges.exchanges import Exchange
+from exchanges.prices import PriceFeed
+from exchanges.snapshot import Snapshot
+from exchanges.transport import Transport
+from twitter.rules import Rule
 from twitter.twitter import Twitter
-from utils import globals as g, utils, image
+from utils import config, globals as g, utils, image, startup, trace
+from utils.config import Config, ConfigWatcher, PricesConfig, \
+    TimeoutsConfig, TransportConfig
+from utils.startup import Task
 
-def handle_text(text: str) -> bool:
-    currency: Exchange.Currency = image.parse_currency(text)
+# Sections and keys which are only read when the bot starts.
+RESTART_KEYS: Set[str] = {"startup", "database", "transport", "prices",
+                          "trace", "reload", "tessdata_dir", "tesseract_cmd",
+                          "verbose", "queue_logs"}
 
+_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+        thread_name_prefix = "callback")
+
+def handle_currency(currency: Optional[Exchange.Currency],
+                    budgets: exchanges.Budgets = None) -> bool:
     if not currency:
         g.log.info(f"No valid currency was found.")
 
         return False
 
     g.log.info(f"Currency | {currency.name} ({currency.symbol})")
-    exchanges.place_order(exchanges.get_markets(currency))
+
+    # The snapshot is read once so a refresh or reload while the order is
+    # placed can't mix its markets, plans and settings with the previous ones.
+    snapshot: Snapshot = g.db.snapshot
+    exchanges.place_order(exchanges.get_markets(currency, snapshot), snapshot,
+                          budgets)
 
     return True
 
-def handle_image(image_url: str) -> bool:
-    g.log.debug(f"Image URL | {image_url}")
+def handle_text(text: str, budgets: exchanges.Budgets = None) -> bool:
+    return handle_currency(image.parse_currency(text), budgets)
+
+def find_in_images(image_urls: List[str], cancel: Optional[Event] = None) \
+        -> Optional[Exchange.Currency]:
+    g.log.debug("Image URLs | %s", image_urls)
+
+    return image.search_images(image_urls, cancel)
+
+def handle_image(image_urls: List[str],
+                 budgets: exchanges.Budgets = None) -> bool:
+    return handle_currency(find_in_images(image_urls), budgets)
+
+def handle_both(text: str, image_urls: List[str],
+                budgets: exchanges.Budgets = None) -> bool:
+    # The images are downloaded and searched in the background while the text
+    # is searched. Only one order is placed, from whichever finds a currency
+    # first; the image search is cancelled if the text has a currency.
+    cancel: Event = Event()
+    future: Future = _executor.submit(trace.bind(find_in_images), image_urls,
+                                      cancel)
+    currency: Optional[Exchange.Currency] = image.parse_currency(text)
+
+    if currency:
+        g.log.debug("Found a currency in the text; cancelling the images.")
+        cancel.set()
+        future.cancel()
+    else:
+        currency = future.result()
+
+    return handle_currency(currency, budgets)
+
+def callback(text: Optional[str] = None,
+             image_urls: Optional[List[str]] = None,
+             budgets: exchanges.Budgets = None) -> bool:
+    if text and image_urls:
+        g.log.debug("Handling the tweet's text and images concurrently.")
+        return handle_both(text, image_urls, budgets)
 
-    img = image.get_image(image_url)
-    text: str = image.to_text(img)
-    g.log.debug(f"OCR Results | {text}")
+    if text:
+        g.log.debug("Handling the tweet's text.")
+        return handle_text(text, budgets)
 
-    return handle_text(text)
+    if image_urls:
+        g.log.debug("Handling the tweet's %d images.", len(image_urls))
+        return handle_image(image_urls, budgets)
 
-def callback(text: Optional[str] = None, image_url: Optional[str] = None) -> bool:
-    if text:
-        g.log.debug(f"Handling the tweet's text.")
-        return handle_text(text)
+def start_prices() -> None:
+    prices: PricesConfig = g.config.prices
+
+    if not prices.enabled:
+        return
+
+    g.prices = PriceFeed(g.exchanges,
+                         lambda: g.db.markets.names,
+                         prices.interval,
+                         prices.max_age,
+                         prices.stream)
+    g.prices.start()
+
+def load_markets() -> None:
+    g.exchanges = exchanges.get_exchanges()
+    g.db = Database()
+
+def reload_config(new: Config, twitter: Twitter) -> None:
+    old: Config = g.config
+    changed: List[str] = config.changes(old, new)
+
+    if not changed:
+        g.log.info("The configuration was reloaded; nothing changed.")
+        return
+
+    # Everything is built from the new configuration before it's applied.
+    # Orders use the configuration pinned in the database's snapshot, so one
+    # order never combines the new settings with the old plans. A status
+    # which was matched before the swap keeps its old rule's budgets.
+    rules: Dict[int, Rule] = twitter.compile_rules(new.twitter)
+
+    def apply() -> None:
+        g.config = new
+        twitter.set_rules(rules)
 
-    if image_url:
-        g.log.debug(f"Handling the tweet's image.")
-        return handle_image(image_url)
+    g.db.reconfigure(old, new, apply)
+    g.log.info("The configuration was reloaded; changed "
+               f"{', '.join(changed)}.")
+
+    restart: List[str] = [key for key in changed if key in RESTART_KEYS]
+    if restart:
+        g.log.warning(f"Restart the bot to apply {', '.join(restart)}.")
 
 def main() -> None:
     utils.get_logger("bot")
@@ -47,18 +141,63 @@ def main() -> None:
         return
 
     # Set logging level to debug if verbose is true.
-    if g.config["verbose"]:
+    if g.config.verbose:
         g.log.setLevel(logging.DEBUG)
         g.log.handlers[0].setLevel(logging.DEBUG)
 
+    if g.config.queue_logs:
+        utils.queue_handlers(g.log)
+
+    trace.init()
+    watcher: Optional[ConfigWatcher] = None
+
     try:
-        g.exchanges = exchanges.get_exchanges()
-        g.db = Database()
-        image.init()
-        Twitter(callback)
+        transport: TransportConfig = g.config.transport
+        g.transport = Transport(transport.connections,
+                                transport.keep_alive,
+                                transport.timeout)
+        start: float = time.perf_counter()
+        timeouts: TimeoutsConfig = g.config.startup.timeouts
+
+        # Loading markets times out on its own; each exchange and source has
+        # its own timeout.
+        results: dict = startup.run("Startup", [
+            Task("markets", load_markets, None, True),
+            Task("Twitter", lambda: Twitter(callback), timeouts.twitter,
+                 True),
+            Task("OCR", image.init, timeouts.ocr, True)])
+
+        start_prices()
+
+        if g.config.reload.signal or g.config.reload.interval:
+            twitter: Twitter = results["Twitter"]
+            watcher = ConfigWatcher(
+                    utils.CONFIG_FILE,
+                    g.config.reload.interval,
+                    g.config.reload.signal,
+                    lambda new: reload_config(new, twitter))
+
+        g.log.info(f"Listening {time.perf_counter() - start:.2f} seconds "
+                   "after starting.")
+        results["Twitter"].start()
     except Exception as e:
         g.log.critical(f"{type(e).__name__}: {e}")
         g.log.critical(traceback.format_exc())
+    finally:
+        if watcher:
+            watcher.close()
+
+        if g.prices:
+            g.prices.close()
+
+        if g.db:
+            g.db.close()
+
+        if g.transport:
+            g.transport.close()
+
+        trace.close()
+        utils.stop_queues()
 
 if __name__ == "__main__":
     main()
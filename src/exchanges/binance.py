@@ -1,22 +1,87 @@
-from decimal import Decimal, ROUND_DOWN
-from typing import List, Union
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, \
+    Union
+from urllib.parse import urlencode
+import hashlib
+import hmac
 import logging
 
 from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceRequestException
+import requests
 
 from exchanges.exchange import Exchange
+from exchanges.limits import RateLimiter
+from exchanges.plans import OrderPlan
+from exchanges.transport import Transport
+from utils import trace
+from utils.config import RateLimitConfig, Reader
 import utils.globals as g
 
+# Weights of the endpoints used which weigh more than 1.
+WEIGHTS: Dict[str, int] = {
+    "v1/exchangeInfo": 10,
+    "v1/ticker/allPrices": 2
+}
+
+class BinanceConfig(NamedTuple):
+    """Settings of Binance."""
+    priority: int
+    key: str
+    secret: str
+    use_multiplier: bool
+    recvWindow: int
+    rate_limit: RateLimitConfig
+
+def parse_config(r: Reader) -> BinanceConfig:
+    """Parses the Binance section of the configuration."""
+    return BinanceConfig(r.integer("priority"), r.text("key"),
+                         r.text("secret"), r.flag("use_multiplier"),
+                         r.integer("recvWindow"), r.rate_limit("rate_limit"))
+
+class _Client(Client):
+    # Uses the shared connection pool, sends requests through the rate
+    # limiter, and keys the signature's HMAC once instead of on every signed
+    # request.
+    def __init__(self, api_key: str, api_secret: str, transport: Transport,
+                 limiter: RateLimiter):
+        self._transport: Transport = transport
+        self._limiter: RateLimiter = limiter
+        self._hmac = hmac.new(api_secret.encode("utf-8"),
+                              digestmod = hashlib.sha256)
+
+        super().__init__(api_key, api_secret)
+
+    def _init_session(self) -> requests.Session:
+        session: requests.Session = super()._init_session()
+        session.hooks["response"].append(
+                lambda response, *args, **kwargs:
+                    self._limiter.observe(response))
+        self._transport.mount(session)
+
+        return session
+
+    def _request(self, method, uri, signed, force_params = False, **kwargs):
+        self._limiter.acquire(WEIGHTS.get(uri[len(self.API_URL) + 1:], 1))
+
+        return super()._request(method, uri, signed, force_params, **kwargs)
+
+    def _generate_signature(self, data: dict) -> str:
+        signature = self._hmac.copy()
+        signature.update(urlencode(data).encode("utf-8"))
+
+        return signature.hexdigest()
+
 class Binance(Exchange):
     def __init__(self):
         super().__init__(type(self).__name__)
         self._log: logging.Logger = logging.getLogger("bot.exchanges.Binance")
+        self._limiter: RateLimiter = self._get_limiter()
         self._api = self._get_api()
 
     def _get_api(self):
-        key: str = g.config["exchanges"]["binance"]["key"]
-        secret: str = g.config["exchanges"]["binance"]["secret"]
+        key: str = g.config.exchanges["binance"].key
+        secret: str = g.config.exchanges["binance"].secret
 
         if not key:
             self._log.warning("Key is missing from the config.")
@@ -24,29 +89,28 @@ class Binance(Exchange):
         if not secret:
             self._log.warning("Secret is missing from the config.")
 
-        return Client(key, secret)
+        api: _Client = _Client(key, secret, g.transport, self._limiter)
+        g.transport.keep_alive(api._create_api_uri("ping", False),
+                               self._limiter)
+
+        return api
+
+    def _get_limiter(self) -> RateLimiter:
+        config: RateLimitConfig = g.config.exchanges["binance"].rate_limit
+
+        return RateLimiter(self.name, config.weight, config.window,
+                           config.reserve,
+                           ["X-MBX-USED-WEIGHT", "X-MBX-USED-WEIGHT-1M"])
 
     @staticmethod
     def _get_step_size(filters: dict) -> Union[Decimal, None]:
         return next((Decimal(f["stepSize"].rstrip("0")) for f in filters
                      if f["filterType"] == "LOT_SIZE"), None)
 
-    @staticmethod
-    def _get_quantity(market: Exchange.Market, price: Decimal) -> Decimal:
-        quote_symbol: str = market.quote.symbol.lower()
-        total_f: float = g.config["order"]["quote_currencies"][quote_symbol]
-        total: Decimal = Decimal(str(total_f))
-
-        step: Decimal = market.step
-        quantity: Decimal = \
-            (total / price).quantize(step, rounding = ROUND_DOWN) if step \
-            else (total / price)
-
-        return quantity
-
-    def _get_price(self, market: Exchange.Market) -> Union[Decimal, None]:
+    def _get_ticker_price(self, market: Exchange.Market) -> Union[str, None]:
         try:
-            ticker: dict = self._api.get_symbol_ticker(symbol = market.name)
+            with trace.span("price"):
+                ticker: dict = self._api.get_symbol_ticker(symbol = market.name)
         except (BinanceAPIException, BinanceRequestException) as e:
             if e.status_code == 429:
                 self._log.error("Being rate limited.")
@@ -57,21 +121,25 @@ class Binance(Exchange):
                             f"{market.name}.")
             return None
 
-        price: str = ticker["price"].rstrip("0")
-        self._log.debug(f"Retrieved asking price of {price} for {market.name}.")
+        return ticker["price"]
+
+    def _get_price(self, market: Exchange.Market) -> Union[Decimal, None]:
+        # Uses the price feed's price unless it's stale.
+        price: Union[str, None] = \
+            g.prices.get(self.name, market.name) if g.prices else None
 
-        p: Union[int, None] = market.quote.precision
-        precision: Decimal = Decimal(10) ** -p if p else -8
+        if price:
+            self._log.debug("Using the cached price for %s.", market.name)
+        else:
+            price = self._get_ticker_price(market)
 
-        use_mult: bool = g.config["exchanges"]["binance"]["use_multiplier"]
-        mult_str: str = str(g.config["order"]["multiplier"]).rstrip("0")
-        mult: Decimal = Decimal(mult_str) if use_mult else Decimal(0)
+            if not price:
+                return None
 
-        price_d: Decimal = (Decimal(price) * (1 + mult)).quantize(precision)
-        self._log.debug(f"Adjusted price to {price_d} with a precision of "
-                        f"{precision}.")
+        self._log.debug("Retrieved asking price of %s for %s.", price,
+                        market.name)
 
-        return price_d
+        return Decimal(price)
 
     def get_markets(self) -> List[Exchange.Market]:
         try:
@@ -106,20 +174,72 @@ class Binance(Exchange):
                             self._get_step_size(m["filters"])),
                         markets))
 
-    def buy_order(self, market: Exchange.Market) -> bool:
+    def get_prices(self) -> Dict[str, str]:
+        try:
+            tickers: List[dict] = self._api.get_all_tickers()
+        except (BinanceAPIException, BinanceRequestException) as e:
+            self._log.error(f"Prices could not be retrieved: {e}")
+            return {}
+
+        return {t["symbol"]: t["price"] for t in tickers}
+
+    def stream_prices(self, callback: Callable[[Dict[str, Any]], None]) \
+            -> bool:
+        try:
+            # Requires Twisted, which is only needed for streaming.
+            from binance.websockets import BinanceSocketManager
+        except ImportError as e:
+            self._log.warning(f"Prices can't be streamed: {e}")
+            return False
+
+        def on_message(message):
+            # Errors are sent as a dictionary instead of a list of tickers.
+            if isinstance(message, list):
+                callback({t["s"]: t["c"] for t in message})
+            else:
+                self._log.error(f"Price stream error: {message}")
+
+        manager: BinanceSocketManager = BinanceSocketManager(self._api)
+
+        if not manager.start_ticker_socket(on_message):
+            return False
+
+        manager.daemon = True
+        manager.start()
+
+        return True
+
+    def prepare_order(self, market: Exchange.Market, plan: OrderPlan,
+                      budget: Optional[Decimal] = None) \
+            -> Optional[Exchange.Order]:
         price: Union[Decimal, None] = self._get_price(market)
 
         if not price:
-            return False
+            return None
+
+        order: Optional[Tuple[Decimal, Decimal, Decimal]] = plan.apply(price, budget)
+
+        if not order:
+            self._log.error(f"The price {price} of {market.name} is too low or "
+                            "high to place an order.")
+            return None
+
+        self._log.debug("Adjusted price to %s with a precision of %s.",
+                        order[0], plan.precision)
+
+        return Exchange.Order(market, order[0], order[1])
 
-        quantity: Decimal = self._get_quantity(market, price)
+    def submit_order(self, order: Exchange.Order) -> bool:
+        market, price, quantity = order
         total: Decimal = quantity * price
+        recv_window: int = g.config.exchanges["binance"].recvWindow
 
         try:
-            response: dict = self._api.order_market_buy(
-                    symbol = market.name,
-                    quantity = quantity,
-                    recvWindow = g.config["exchanges"]["binance"]["recvWindow"])
+            with trace.span("order"):
+                response: dict = self._api.order_market_buy(
+                        symbol = market.name,
+                        quantity = quantity,
+                        recvWindow = recv_window)
         except Exception as e:
             self._log.error(f"Order failed | {quantity} {market.base.symbol} @ "
                             f"{price} {market.quote.symbol} for a total of "
@@ -129,6 +249,6 @@ class Binance(Exchange):
         self._log.info(f"Order placed | {quantity} {market.base.symbol} @ "
                        f"{price} {market.quote.symbol} for a total of {total} "
                        f"{market.quote.symbol}.")
-        self._log.debug(f"Order ID | {response['clientOrderId']}")
+        self._log.debug("Order ID | %s", response["clientOrderId"])
 
         return True
@@ -1,20 +1,57 @@
-from typing import List
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Tuple
 import logging
 
-from bittrex import Bittrex as bx
+from bittrex import BASE_URL_V1_1, Bittrex as bx
 
 from exchanges.exchange import Exchange
+from exchanges.limits import RateLimiter
+from exchanges.plans import OrderPlan
+from utils import trace
+from utils.config import RateLimitConfig, Reader
 import utils.globals as g
 
+class BittrexConfig(NamedTuple):
+    """Settings of Bittrex."""
+    priority: int
+    key: str
+    secret: str
+    use_multiplier: bool
+    rate_limit: RateLimitConfig
+
+def parse_config(r: Reader) -> BittrexConfig:
+    """Parses the Bittrex section of the configuration."""
+    return BittrexConfig(r.integer("priority"), r.text("key"),
+                         r.text("secret"), r.flag("use_multiplier"),
+                         r.rate_limit("rate_limit"))
+
 class Bittrex(Exchange):
+    limit_orders: bool = True
+
     def __init__(self):
         super().__init__(type(self).__name__)
         self._log: logging.Logger = logging.getLogger("bot.exchanges.Bittrex")
+        self._limiter: RateLimiter = self._get_limiter()
         self._api: bx = self._get_api()
+        self._feed_api: bx = bx(None, None, calls_per_second = float("inf"),
+                                dispatch = self._dispatch)
+
+        g.transport.keep_alive(
+            BASE_URL_V1_1.format(path = "/public/getmarkets").rstrip("?"),
+            self._limiter)
+
+    def _dispatch(self, url: str, apisign: str) -> dict:
+        return g.transport.dispatch(url, apisign, self._limiter)
+
+    def _get_limiter(self) -> RateLimiter:
+        config: RateLimitConfig = g.config.exchanges["bittrex"].rate_limit
+
+        return RateLimiter(self.name, config.weight, config.window,
+                           config.reserve, [])
 
     def _get_api(self) -> bx:
-        key: str = g.config["exchanges"]["bittrex"]["key"]
-        secret: str = g.config["exchanges"]["bittrex"]["secret"]
+        key: str = g.config.exchanges["bittrex"].key
+        secret: str = g.config.exchanges["bittrex"].secret
 
         if not key:
             self._log.warning("Key is missing from the config.")
@@ -22,22 +59,36 @@ class Bittrex(Exchange):
         if not secret:
             self._log.warning("Secret is missing from the config.")
 
-        return bx(key, secret)
+        # The rate limiter replaces the library's throttling, which delayed
+        # an order by up to a second after retrieving its price.
+        return bx(key, secret, calls_per_second = float("inf"),
+                  dispatch = self._dispatch)
 
-    def _get_rate(self, market: str):
-        ticker: dict = self._api.get_ticker(market)
+    def _get_ask(self, market: str):
+        with trace.span("price"):
+            ticker: dict = self._api.get_ticker(market)
 
         if not ticker["success"]:
             self._log.error(f"Tick values could not be retrieved for {market}.")
             return None
 
-        ask: float = ticker["result"]["Ask"]
-        self._log.debug(f"Retrieved asking price of {ask} for {market}.")
+        return ticker["result"]["Ask"]
+
+    def _get_rate(self, market: str) -> Optional[Decimal]:
+        # Uses the price feed's price unless it's stale.
+        ask: float = g.prices.get(self.name, market) if g.prices else None
 
-        if g.config["exchanges"]["bittrex"]["use_multiplier"]:
-            return ask * (1 + g.config["order"]["multiplier"])
+        if ask:
+            self._log.debug("Using the cached price for %s.", market)
         else:
-            return ask
+            ask = self._get_ask(market)
+
+            if not ask:
+                return None
+
+        self._log.debug("Retrieved asking price of %s for %s.", ask, market)
+
+        return Decimal(str(ask))
 
     def get_markets(self) -> List[Exchange.Market]:
         markets: dict = self._api.get_markets()
@@ -64,16 +115,43 @@ class Bittrex(Exchange):
                             None),
                         markets))
 
-    def buy_order(self, market: Exchange.Market) -> bool:
-        rate: float = self._get_rate(market.name)
+    def get_prices(self) -> Dict[str, float]:
+        summaries: dict = self._feed_api.get_market_summaries()
 
-        if not rate:
-            return False
+        if not summaries["success"]:
+            self._log.error("Prices could not be retrieved: "
+                            f"{summaries['message']}")
+            return {}
+
+        return {s["MarketName"]: s["Ask"] for s in summaries["result"]}
+
+    def prepare_order(self, market: Exchange.Market, plan: OrderPlan,
+                      budget: Optional[Decimal] = None) \
+            -> Optional[Exchange.Order]:
+        ask: Optional[Decimal] = self._get_rate(market.name)
+
+        if not ask:
+            return None
+
+        order: Optional[Tuple[Decimal, Decimal, Decimal]] = \
+            plan.apply(ask, budget)
+
+        if not order:
+            self._log.error(f"The price {ask} of {market.name} is too low or "
+                            "high to place an order.")
+            return None
+
+        return Exchange.Order(market, order[0], order[1])
+
+    def submit_order(self, order: Exchange.Order) -> bool:
+        market, rate, quantity = order
+        total: Decimal = quantity * rate
 
-        quote_symbol: str = market.quote.symbol.lower()
-        total: float = g.config["order"]["quote_currencies"][quote_symbol]
-        quantity: float = total / rate
-        response: dict = self._api.buy_limit(market.name, quantity, rate)
+        # Formatted as fixed-point because small decimals are otherwise
+        # formatted in scientific notation.
+        with trace.span("order"):
+            response: dict = self._api.buy_limit(market.name, f"{quantity:f}",
+                                                 f"{rate:f}")
 
         if not response["success"]:
             self._log.error(f"Order failed | {quantity} {market.base.symbol} @ "
@@ -85,6 +163,6 @@ class Bittrex(Exchange):
         self._log.info(f"Order placed | {quantity} {market.base.symbol} @ "
                        f"{rate} {market.quote.symbol} for a total of {total} "
                        f"{market.quote.symbol}.")
-        self._log.debug(f"Order UUID | {response['result']['uuid']}")
+        self._log.debug("Order UUID | %s", response["result"]["uuid"])
 
         return True
@@ -1,53 +1,246 @@
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
 import logging
+import random
 import sqlite3
+import time
 
-from exchanges import exchanges
+from exchanges import exchanges, limits
+from exchanges.exchange import Exchange
+from exchanges.index import MarketIndex
+from exchanges.plans import OrderPlan, build_plans
+from exchanges.snapshot import Snapshot
+from utils import startup
+from utils.config import Config, DatabaseConfig, TimeoutsConfig
+from utils.matcher import CurrencyMatcher
+from utils.startup import Task
 import utils.globals as g
 
+# Increment whenever the schema changes. Databases with another version are
+# dropped and rebuilt.
+SCHEMA_VERSION: int = 2
+
+Listings = Dict[str, List[Exchange.Market]]
+
+# Retrieves the currencies, in order of rank, and the markets of each exchange.
+Source = Callable[[], Tuple[List[Exchange.Currency], Listings]]
+
+Refresh = NamedTuple("Refresh", [
+    ("finished", float),
+    ("duration", float),
+    ("changes", int)])
+
 class Database:
-    def __init__(self):
+    # The source defaults to CoinMarketCap and the exchanges.
+    def __init__(self, source: Optional[Source] = None):
         self._log: logging.Logger = logging.getLogger("bot.exchanges.Database")
-        self._db: sqlite3.Connection = sqlite3.connect("exchanges.db")
+        # The background refresh writes from another thread; the lock
+        # serialises access.
+        self._db: sqlite3.Connection = sqlite3.connect(
+                g.config.database.file,
+                check_same_thread = False)
+        self._lock: Lock = Lock()
+        self._stop: Event = Event()
+        self._source: Source = source or self._fetch
 
         self.cursor: sqlite3.Cursor = self._db.cursor()
+        self.snapshot: Optional[Snapshot] = None
+        self.refreshes: int = 0
+        self.failures: int = 0
+        self.last_refresh: Optional[Refresh] = None
 
-        self._drop()
-        self._initialise()
-        self._populate()
-        self.commit()
+        start: float = time.perf_counter()
+
+        with self._lock:
+            migrated: bool = self._migrate()
+            warm: bool = g.config.database.warm_start \
+                and not migrated and not self._is_empty()
+
+            if not warm:
+                self._update(*self._source())
+
+            self._build_caches()
+
+        if warm:
+            self._log.info("Loaded the database's snapshot in "
+                           f"{time.perf_counter() - start:.2f} seconds; "
+                           "refreshing it in the background.")
+        else:
+            self._log.info("Built the database in "
+                           f"{time.perf_counter() - start:.2f} seconds.")
+
+        if warm or g.config.database.refresh_interval:
+            Thread(target = self._run, args = (warm,), name = "database",
+                   daemon = True).start()
 
     def __del__(self):
         self._db.close()
 
+    @property
+    def matcher(self) -> CurrencyMatcher:
+        return self.snapshot.matcher
+
+    @property
+    def markets(self) -> MarketIndex:
+        return self.snapshot.markets
+
+    @property
+    def plans(self) -> Dict[str, Dict[str, OrderPlan]]:
+        return self.snapshot.plans
+
+    def close(self):
+        # Stops refreshing. A refresh in progress still finishes.
+        self._stop.set()
+
     def commit(self):
         self._db.commit()
 
+    def get_currencies(self) -> List[Exchange.Currency]:
+        self.cursor.execute(
+                "select symbol, name, precision from currencies order by rank")
+
+        return [Exchange.Currency(*row) for row in self.cursor.fetchall()]
+
+    def reconfigure(self, old: Config, new: Config,
+                    apply: Callable[[], None]) -> None:
+        """Applies a configuration and rebuilds the caches which depend on
+        settings which changed.
+
+        The caches are built from the new configuration first. Then, while
+        refreshes are held off, ``apply`` is called to make the configuration
+        the global one and a snapshot of the configuration and the caches
+        replaces the old one. Orders are placed with the configuration of
+        their snapshot rather than the global one, so they never combine
+        settings and caches of different configurations. The tables aren't
+        touched.
+
+        Parameters
+        ----------
+        old: Config
+            The current configuration.
+        new: Config
+            The new configuration.
+        apply: Callable[[], None]
+            Makes the new configuration the global one.
+
+        Returns
+        -------
+        None
+        """
+        matcher: bool = old.search_currency_name != new.search_currency_name
+        markets: bool = old.order.quote_currencies.keys() != \
+            new.order.quote_currencies.keys()
+        plans: bool = markets or old.order != new.order or \
+            self._multipliers(old) != self._multipliers(new)
+
+        with self._lock:
+            snapshot: Snapshot = self.snapshot._replace(config = new)
+
+            if matcher:
+                snapshot = snapshot._replace(
+                        matcher = self._build_matcher(new))
+
+            if markets:
+                snapshot = snapshot._replace(
+                        markets = self._build_markets(new))
+
+            if plans:
+                snapshot = snapshot._replace(
+                        plans = self._build_plans(snapshot.markets, new))
+
+            apply()
+            self.snapshot = snapshot
+
+    @staticmethod
+    def _multipliers(config: Config) -> Dict[str, bool]:
+        return {name: exchange.use_multiplier
+                for name, exchange in config.exchanges.items()}
+
+    def _build_matcher(self, config: Config) -> CurrencyMatcher:
+        matcher: CurrencyMatcher = CurrencyMatcher(
+                self.get_currencies(),
+                config.search_currency_name)
+        self._log.debug(f"Built a matcher for {matcher.size} currencies.")
+
+        return matcher
+
+    def _build_markets(self, config: Config) -> MarketIndex:
+        markets: MarketIndex = MarketIndex(
+                self.cursor,
+                (ex.name for ex in g.exchanges),
+                config.order.quote_currencies.keys())
+        self._log.debug(f"Built an index of {markets.size} markets.")
+
+        return markets
+
+    def _build_plans(self, markets: MarketIndex, config: Config) \
+            -> Dict[str, Dict[str, OrderPlan]]:
+        plans: Dict[str, Dict[str, OrderPlan]] = \
+            build_plans(markets.markets(), config)
+        self._log.debug("Built order plans.")
+
+        return plans
+
+    def _build_caches(self):
+        # Must be called whenever any of the tables change.
+        config: Config = g.config
+        markets: MarketIndex = self._build_markets(config)
+        self.snapshot = Snapshot(config, self._build_matcher(config), markets,
+                                 self._build_plans(markets, config))
+
+    def _migrate(self) -> bool:
+        # Rebuilds the schema if it's out of date. Returns True if it was.
+        self.cursor.execute("pragma user_version")
+
+        if self.cursor.fetchone()[0] == SCHEMA_VERSION:
+            return False
+
+        self._log.debug(f"Migrating the database to version {SCHEMA_VERSION}.")
+        self._drop()
+        self._initialise()
+        self.cursor.execute(f"pragma user_version = {SCHEMA_VERSION}")
+
+        return True
+
+    def _is_empty(self) -> bool:
+        self.cursor.execute("select exists (select 1 from exchange_markets)")
+
+        return not self.cursor.fetchone()[0]
+
     def _initialise(self):
         self.cursor.executescript("""
             create table if not exists currencies (
                 symbol text,
                 name text,
                 precision integer default null,
+                rank integer,
                 primary key (symbol, name)
-            );       
+            );
+
+            create index if not exists currencies_rank on currencies(rank);
 
             create table if not exists markets (
                 id integer primary key autoincrement,
                 base text references currencies(symbol) on delete cascade,
                 quote text references currencies(symbol) on delete cascade,
-                step text default null
-            );      
+                unique (base, quote)
+            );
 
             create table if not exists exchanges (
                 id integer primary key autoincrement,
-                name text
-            );       
+                name text unique
+            );
 
             create table if not exists exchange_markets (
                 exchange_id integer references exchanges(id) on delete cascade,
                 market_id integer references markets(id) on delete cascade,
-                name text
-            );        
+                name text,
+                step text default null,
+                primary key (exchange_id, market_id)
+            );
+
+            create index if not exists exchange_markets_market
+                on exchange_markets(market_id);
         """)
 
     def _drop(self):
@@ -58,50 +251,151 @@ class Database:
             drop table if exists currencies;
         """)
 
-    def _populate(self):
-        self.cursor.executemany("insert into currencies values (?, ?, ?)",
-                                exchanges.get_currencies())
-
-        for ex in g.exchanges:
-            self.cursor.execute("insert into exchanges(name) values (?)",
-                                (ex.name,))
-            ex_id = self.cursor.lastrowid
-
-            for name, base, quote, step in ex.get_markets():
-                # Try to get the id of the market from the db.
-                self.cursor.execute(
-                        "select id from markets where base = ? and quote = ?",
-                        (base.symbol, quote.symbol))
-                market_id = self.cursor.fetchone()
-
-                # If it doesn't exist, add it.
-                if not market_id:
-                    self.cursor.execute("""
-                            insert into markets(base, quote, step) 
-                            values (?, ?, ?)
-                            """, (base.symbol,
-                                  quote.symbol,
-                                  str(step) if step else None))
-                    market_id = self.cursor.lastrowid
+    @staticmethod
+    def _fetch() -> Tuple[List[Exchange.Currency], Listings]:
+        # Sources are fetched concurrently. A source which fails or times out
+        # is empty, which keeps its stored rows.
+        timeouts: TimeoutsConfig = g.config.startup.timeouts
+        results: dict = startup.run(
+                "Fetching currencies and markets",
+                [Task("CoinMarketCap", exchanges.get_currencies,
+                      timeouts.currencies, False)]
+                + [Task(ex.name,
+                        limits.with_priority(limits.REFRESH, ex.get_markets),
+                        timeouts.markets,
+                        False)
+                   for ex in g.exchanges])
+
+        return (results["CoinMarketCap"] or [],
+                {ex.name: results[ex.name] or [] for ex in g.exchanges})
+
+    def _run(self, refresh_now: bool):
+        config: DatabaseConfig = g.config.database
+        interval: float = config.refresh_interval
+        jitter: float = config.refresh_jitter
+
+        if refresh_now:
+            self._refresh()
+
+        # Jitter keeps refreshes from lining up with the exchanges' own
+        # periodic load.
+        while interval and \
+                not self._stop.wait(interval + random.uniform(0, jitter)):
+            self._refresh()
+
+    def _refresh(self):
+        start: float = time.perf_counter()
+
+        try:
+            data: Tuple[List[Exchange.Currency], Listings] = self._source()
+
+            with self._lock:
+                changes: int = self._update(*data)
+
+                if changes:
+                    self._build_caches()
+        except Exception as e:
+            self.failures += 1
+            self._log.error(f"The database could not be refreshed: {e}")
+            return
+
+        self.refreshes += 1
+        self.last_refresh = Refresh(time.time(),
+                                    time.perf_counter() - start,
+                                    changes)
+        self._log.info(f"Refreshed the database in "
+                       f"{self.last_refresh.duration:.2f} seconds; {changes} "
+                       "rows changed.")
+
+    def _update(self, currencies: List[Exchange.Currency],
+                listings: Listings) -> int:
+        # Writes only the differences in a single transaction. Returns the
+        # amount of rows changed.
+        precisions: Dict[str, int] = {}
+        pairs: Set[Tuple[str, str]] = set()
+
+        for markets in listings.values():
+            for _, base, quote, _ in markets:
+                pairs.add((base.symbol, quote.symbol))
+
+                for currency in (base, quote):
+                    if currency.precision:
+                        precisions[currency.symbol] = currency.precision
+
+        currency_rows: List[Tuple[str, str, Optional[int], int]] = \
+            [(c.symbol, c.name, precisions.get(c.symbol, c.precision), rank)
+             for rank, c in enumerate(currencies)]
+        changes: int = self._db.total_changes
+
+        with self._db:
+            # An empty list means retrieval failed; the stored one is kept.
+            if currency_rows:
+                self._update_currencies(currency_rows)
+
+            self.cursor.executemany(
+                    "insert or ignore into markets(base, quote) values (?, ?)",
+                    pairs)
+
+            for name, markets in listings.items():
+                if markets:
+                    self._update_listings(name, markets)
                 else:
-                    market_id = market_id[0]
-
-                    if step: # Updates the step if it isn't None.
-                        self.cursor.execute("""
-                        update markets set step = ? where id = ?
-                        """, (str(step), market_id))
-
-                self.cursor.execute(
-                        "insert into exchange_markets values (?, ?, ?)",
-                        (ex_id, market_id, name))
-
-                # Updates precisions if not None
-                if base.precision:
-                    self.cursor.execute("""
-                        update currencies set precision = ? where symbol = ?
-                        """, (base.precision, base.symbol))
-
-                if quote.precision:
-                    self.cursor.execute("""
-                        update currencies set precision = ? where symbol = ?
-                        """, (quote.precision, quote.symbol))
+                    self._log.warning(f"No markets were retrieved for {name};"
+                                      " keeping the stored ones.")
+
+            self.cursor.execute("""
+                delete from markets
+                where id not in (select market_id from exchange_markets)
+            """)
+
+        return self._db.total_changes - changes
+
+    def _update_currencies(
+            self, rows: List[Tuple[str, str, Optional[int], int]]) -> None:
+        self.cursor.execute("select symbol, name, precision, rank "
+                            "from currencies")
+        old: Set[Tuple[str, str, Optional[int], int]] = \
+            set(self.cursor.fetchall())
+        new: Set[Tuple[str, str, Optional[int], int]] = set(rows)
+        keys: Set[Tuple[str, str]] = {row[:2] for row in new}
+
+        self.cursor.executemany(
+                "delete from currencies where symbol = ? and name = ?",
+                [row[:2] for row in old - new if row[:2] not in keys])
+        self.cursor.executemany(
+                "insert or replace into currencies values (?, ?, ?, ?)",
+                new - old)
+
+    def _update_listings(self, exchange: str,
+                         markets: List[Exchange.Market]) -> None:
+        self.cursor.execute("insert or ignore into exchanges(name) values (?)",
+                            (exchange,))
+        self.cursor.execute("select id from exchanges where name = ?",
+                            (exchange,))
+        ex_id: int = self.cursor.fetchone()[0]
+
+        # Steps are stored per exchange; exchanges round quantities
+        # differently.
+        self.cursor.execute("""
+            select em.name, m.base, m.quote, em.step
+            from exchange_markets em
+            join markets m
+                    on em.market_id = m.id
+            where em.exchange_id = ?
+        """, (ex_id,))
+        old: Set[Tuple[str, str, str, Optional[str]]] = \
+            set(self.cursor.fetchall())
+        new: Set[Tuple[str, str, str, Optional[str]]] = \
+            {(m.name, m.base.symbol, m.quote.symbol,
+              str(m.step) if m.step else None) for m in markets}
+
+        self.cursor.executemany("""
+            delete from exchange_markets
+            where exchange_id = ? and market_id = (
+                select id from markets where base = ? and quote = ?)
+        """, [(ex_id, base, quote) for _, base, quote, _ in old - new])
+        self.cursor.executemany("""
+            insert into exchange_markets
+            select ?, id, ?, ? from markets where base = ? and quote = ?
+        """, [(ex_id, name, step, base, quote)
+              for name, base, quote, step in new - old])
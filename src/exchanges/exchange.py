@@ -1,7 +1,13 @@
 from decimal import Decimal
-from typing import List, NamedTuple, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, \
+    Optional
 import abc
 
+# exchanges.plans imports this module, so OrderPlan is only imported when
+# type checking.
+if TYPE_CHECKING:
+    from exchanges.plans import OrderPlan
+
 class Exchange(abc.ABC):
     Currency = NamedTuple("Currency", [
         ("symbol", str),
@@ -14,6 +20,16 @@ class Exchange(abc.ABC):
         ("quote", Currency),
         ("step", Optional[Decimal])])
 
+    # The price and quantity are in the types the exchange's API expects.
+    Order = NamedTuple("Order", [
+        ("market", Market),
+        ("price", Any),
+        ("quantity", Any)])
+
+    # True if orders are limit orders at the order's price, which only fill if
+    # the market reaches it; False if they are market orders.
+    limit_orders: bool = False
+
     def __init__(self, name: str):
         self.name = name
 
@@ -22,5 +38,31 @@ class Exchange(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def buy_order(self, market: Market) -> bool:
+    def prepare_order(self, market: Market, plan: "OrderPlan",
+                      budget: Optional[Decimal] = None) -> Optional[Order]:
+        # Retrieves the price and calculates the order with the market's plan
+        # without placing it. The budget overrides the plan's amount of the
+        # quote currency to spend. Returns None if the order can't be placed.
+        pass
+
+    @abc.abstractmethod
+    def submit_order(self, order: Order) -> bool:
         pass
+
+    def buy_order(self, market: Market, plan: "OrderPlan",
+                  budget: Optional[Decimal] = None) -> bool:
+        order: Optional[Exchange.Order] = \
+            self.prepare_order(market, plan, budget)
+
+        return order is not None and self.submit_order(order)
+
+    def get_prices(self) -> Dict[str, Any]:
+        # Retrieves the prices of all markets at once, keyed by market name.
+        # Exchanges which can't do so return nothing and aren't cached.
+        return {}
+
+    def stream_prices(self, callback: Callable[[Dict[str, Any]], None]) \
+            -> bool:
+        # Starts calling back with prices as they are received. Returns False
+        # if the exchange can't stream prices, in which case they are polled.
+        return False
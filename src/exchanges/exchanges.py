@@ -1,98 +1,193 @@
-from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from decimal import Decimal
 from importlib import import_module
-from itertools import filterfalse
-from typing import DefaultDict, List, Tuple, Union
+from itertools import filterfalse, groupby
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+import logging
 
 from coinmarketcap import Market
 
 from exchanges.exchange import Exchange
+from exchanges.index import Markets
+from exchanges.plans import OrderPlan, get_plan
+from exchanges.snapshot import Snapshot
+from utils import startup, trace
+from utils.startup import Task
 import utils.globals as g
 
+Candidate = Tuple[Exchange, Exchange.Market, OrderPlan]
+
+# Amounts of quote currencies to spend keyed by lower case symbol.
+Budgets = Optional[Mapping[str, Decimal]]
+
+_executor: ThreadPoolExecutor = ThreadPoolExecutor(thread_name_prefix = "order")
+
 def get_exchanges() -> List[Exchange]:
     g.log.debug("Getting exchange instances.")
+
+    if g.config.order.dispatch not in DISPATCHERS:
+        raise ValueError("Unknown dispatch policy "
+                         f"{g.config.order.dispatch!r}.")
+
     # Filters out exchanges with a priority of 0.
-    exs = filterfalse(lambda item: not item[1]["priority"],
-                      g.config["exchanges"].items())
+    exs = filterfalse(lambda item: not item[1].priority,
+                      g.config.exchanges.items())
 
     # Sorts exchanges by priority in ascending order.
-    # Imports the modules, gets the classes from the modules,
-    # and instantiates them.
-    return [getattr(import_module("." + ex[0], "exchanges"),
-                    ex[0].capitalize())()
-            for ex in sorted(exs, key = lambda ex: ex[1]["priority"])]
+    # Imports the modules and gets the classes from the modules.
+    classes: List[type] = \
+        [getattr(import_module("." + ex[0], "exchanges"), ex[0].capitalize())
+         for ex in sorted(exs, key = lambda ex: ex[1].priority)]
+
+    # Instantiates them concurrently because they connect to the exchanges.
+    # An exchange which fails is left out.
+    timeout: float = g.config.startup.timeouts.exchanges
+    results: dict = startup.run(
+            "Creating the exchanges",
+            [Task(cls.__name__, cls, timeout, False) for cls in classes])
+    instances: List[Exchange] = [results[cls.__name__] for cls in classes
+                                 if results[cls.__name__] is not None]
+
+    if not instances:
+        raise RuntimeError("None of the exchanges could be created.")
+
+    return instances
 
 def get_currencies() -> List[Exchange.Currency]:
     g.log.debug("Getting currencies from CoinMarketCap.")
     return list(map(lambda c: Exchange.Currency(c["symbol"], c["name"], None),
                     Market().ticker(limit = 0)))
 
-def get_markets(currency: Exchange.Currency) -> \
-        DefaultDict[str, List[Exchange.Market]]:
-    g.log.debug(f"Getting markets for base currency {currency.symbol}.")
-    quotes: Tuple[str] = tuple(g.config["order"]["quote_currencies"].keys())
-    cases: str = "\n".join(f"when '{ex}' then {i}"
-                           for i, ex in enumerate(quotes))
-
-    g.db.cursor.execute(f"""
-        select 
-            e.name,
-            em.name,
-            m.base,
-            (select precision 
-             from currencies 
-             where symbol = m.base 
-             limit 1) base_prec,
-            m.quote,
-            (select precision 
-             from currencies 
-             where symbol = m.base 
-             limit 1) quote_prec,
-            m.step
-        from markets m
-        join exchange_markets em
-                on m.id = em.market_id
-        join exchanges e
-                on em.exchange_id = e.id
-        where
-            base = upper(?) and
-            lower(quote) in ({", ".join(["?"] * len(quotes))})
-        order by
-            e.name,
-            case lower(m.quote)
-                {cases}
-            end
-    """, (currency.symbol,) + quotes)
-
-    results: List[Tuple[str, str, str, int, str, int, Union[str, None]]] = g.db.cursor.fetchall()
-    markets: DefaultDict[str, List[Exchange.Market]] = defaultdict(list)
-    g.log.debug(f"Retrieved {len(results)} markets.")
-
-    for ex, market, base, base_prec, quote, quote_prec, step in results:
-        markets[ex].append(Exchange.Market(
-                market,
-                Exchange.Currency(base, None, base_prec),
-                Exchange.Currency(quote, None, quote_prec),
-                Decimal(step) if step else None))
+def get_markets(currency: Exchange.Currency, snapshot: Snapshot) -> Markets:
+    g.log.debug("Getting markets for base currency %s.", currency.symbol)
+    with trace.span("get_markets"):
+        markets: Markets = snapshot.markets.get(currency.symbol.upper())
+
+    if g.log.isEnabledFor(logging.DEBUG):
+        g.log.debug("Retrieved %d markets.", sum(map(len, markets.values())))
 
     return markets
 
-def place_order(data: DefaultDict[str, List[Exchange.Market]]) -> bool:
-    g.log.debug("Attempting to place an order.")
+def _get_candidates(data: Markets, snapshot: Snapshot) -> List[Candidate]:
+    candidates: List[Candidate] = []
 
     for exchange in g.exchanges:
         if exchange.name not in data:
-            g.log.debug(f"No markets were found for {exchange.name}; skipping.")
+            g.log.debug("No markets were found for %s; skipping.",
+                        exchange.name)
             continue
 
-        for market in data[exchange.name]:
-            result: bool = exchange.buy_order(market)
+        candidates.extend(
+                (exchange, market,
+                 get_plan(snapshot.plans, exchange.name, market,
+                          snapshot.config))
+                for market in data[exchange.name])
+
+    return candidates
+
+def _get_budget(budgets: Budgets,
+                market: Exchange.Market) -> Optional[Decimal]:
+    return budgets.get(market.quote.symbol.lower()) if budgets else None
 
-            if result:
+def _prepare(candidates: List[Candidate], budgets: Budgets) -> List[Future]:
+    return [_executor.submit(trace.bind(exchange.prepare_order), market, plan,
+                             _get_budget(budgets, market))
+            for exchange, market, plan in candidates]
+
+def _place_sequential(candidates: List[Candidate], budgets: Budgets) -> bool:
+    for exchange, group in groupby(candidates, key = lambda c: c[0]):
+        for _, market, plan in group:
+            if exchange.buy_order(market, plan, _get_budget(budgets, market)):
                 return True
 
         g.log.warning(f"Orders failed to be placed for all of {exchange.name}'s"
                       " markets.")
 
+    return False
+
+def _get_order(exchange: Exchange, future: Future) -> Optional[Exchange.Order]:
+    # An exchange which fails to prepare its order is skipped so the order can
+    # still be placed on another.
+    try:
+        return future.result()
+    except Exception:
+        g.log.error(f"An order could not be prepared for {exchange.name}.",
+                    exc_info = True)
+        return None
+
+def _place_priority(candidates: List[Candidate], budgets: Budgets) -> bool:
+    # Prices for all markets are retrieved at once, but orders are still
+    # submitted in order of priority.
+    futures: List[Future] = _prepare(candidates, budgets)
+
+    try:
+        for (exchange, _, _), future in zip(candidates, futures):
+            order: Optional[Exchange.Order] = _get_order(exchange, future)
+
+            if order and exchange.submit_order(order):
+                return True
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return False
+
+def _place_first(candidates: List[Candidate], budgets: Budgets) -> bool:
+    # Orders are submitted in the order their prices are retrieved.
+    futures: Dict[Future, Exchange] = \
+        dict(zip(_prepare(candidates, budgets), (c[0] for c in candidates)))
+
+    try:
+        for future in as_completed(futures):
+            order: Optional[Exchange.Order] = \
+                _get_order(futures[future], future)
+
+            if order and futures[future].submit_order(order):
+                return True
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return False
+
+DISPATCHERS: Dict[str, Callable[[List[Candidate], Budgets], bool]] = {
+    "sequential": _place_sequential,
+    "priority": _place_priority,
+    "first": _place_first
+}
+
+def place_order(data: Markets, snapshot: Snapshot,
+                budgets: Budgets = None) -> bool:
+    """Places an order on one of the markets.
+
+    Orders are submitted one at a time and no more are submitted once one
+    succeeds, so at most one order is placed regardless of the dispatch
+    policy. Only retrieving prices is done concurrently.
+
+    Parameters
+    ----------
+    data: Markets
+        The markets on which to attempt to place the order.
+    snapshot: Snapshot
+        The database's snapshot from which the markets were retrieved. Their
+        plans and the dispatch policy are taken from it too.
+    budgets: Mapping[str, Decimal], optional
+        The amounts of quote currencies to spend, keyed by lower case symbol,
+        instead of the configured amounts. Quote currencies which aren't keys
+        use the configured amounts.
+
+    Returns
+    -------
+    bool
+        :keyword:`True` if an order was placed.
+    """
+    g.log.debug("Attempting to place an order.")
+    candidates: List[Candidate] = _get_candidates(data, snapshot)
+
+    dispatch: Callable = DISPATCHERS[snapshot.config.order.dispatch]
+
+    if candidates and dispatch(candidates, budgets):
+        return True
+
     g.log.warning(f"Orders failed to be placed for all exchanges.")
     return False
@@ -0,0 +1,100 @@
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Mapping, \
+    Optional, Tuple
+import sqlite3
+
+from exchanges.exchange import Exchange
+
+Markets = Mapping[str, Tuple[Exchange.Market, ...]]
+
+_EMPTY: Markets = MappingProxyType({})
+
+class MarketIndex:
+    """A read-only index of markets by base currency symbol.
+
+    Markets for each base currency are grouped by exchange. Exchanges are
+    ordered by priority and each exchange's markets are ordered by the
+    preference of their quote currency. Markets whose quote currency is not
+    one of the given quote currencies are excluded. Steps are parsed into
+    :class:`~decimal.Decimal` objects when the index is built.
+
+    Parameters
+    ----------
+    cursor: sqlite3.Cursor
+        The cursor of the database from which to read the markets.
+    exchanges: Iterable[str]
+        The names of the exchanges in order of priority.
+    quotes: Iterable[str]
+        The symbols of the quote currencies in order of preference.
+    """
+    def __init__(self, cursor: sqlite3.Cursor, exchanges: Iterable[str],
+                 quotes: Iterable[str]):
+        priorities: Dict[str, int] = {e: i for i, e in enumerate(exchanges)}
+        preferences: Dict[str, int] = \
+            {q.upper(): i for i, q in enumerate(quotes)}
+
+        cursor.execute("select symbol, precision from currencies")
+        precisions: Dict[str, Optional[int]] = dict(cursor.fetchall())
+
+        cursor.execute("""
+            select e.name, em.name, m.base, m.quote, em.step
+            from markets m
+            join exchange_markets em
+                    on m.id = em.market_id
+            join exchanges e
+                    on em.exchange_id = e.id
+        """)
+
+        rows: List[Tuple[str, str, str, str, Optional[str]]] = \
+            [r for r in cursor.fetchall()
+             if r[0] in priorities and r[3].upper() in preferences]
+        rows.sort(key = lambda r: (priorities[r[0]], preferences[r[3].upper()]))
+
+        index: Dict[str, Dict[str, List[Exchange.Market]]] = {}
+
+        for ex, market, base, quote, step in rows:
+            index.setdefault(base.upper(), {}).setdefault(ex, []).append(
+                Exchange.Market(
+                    market,
+                    Exchange.Currency(base, None, precisions.get(base)),
+                    Exchange.Currency(quote, None, precisions.get(quote)),
+                    Decimal(step) if step else None))
+
+        self._index: Dict[str, Markets] = {
+            base: MappingProxyType({ex: tuple(m) for ex, m in exs.items()})
+            for base, exs in index.items()}
+
+        self.names: Dict[str, FrozenSet[str]] = {
+            ex: frozenset(r[1] for r in rows if r[0] == ex)
+            for ex in priorities}
+        self.size: int = len(rows)
+
+    def get(self, symbol: str) -> Markets:
+        """Retrieves the markets of a base currency.
+
+        Parameters
+        ----------
+        symbol: str
+            The upper case symbol of the base currency.
+
+        Returns
+        -------
+        Mapping[str, Tuple[Exchange.Market, ...]]
+            The markets of the base currency grouped by exchange name. The
+            mapping is empty if there are no markets.
+        """
+        return self._index.get(symbol, _EMPTY)
+
+    def markets(self) -> Iterator[Tuple[str, Exchange.Market]]:
+        """Iterates over every indexed market.
+
+        Returns
+        -------
+        Iterator[Tuple[str, Exchange.Market]]
+            The markets and the names of their exchanges.
+        """
+        for exchanges in self._index.values():
+            for exchange, markets in exchanges.items():
+                for market in markets:
+                    yield exchange, market
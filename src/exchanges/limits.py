@@ -0,0 +1,195 @@
+from collections import Counter
+from contextlib import contextmanager
+from threading import Condition, local
+from typing import Callable, Dict, Iterator, List
+import functools
+import logging
+import time
+
+import requests
+
+# Priorities of requests; lower values go first. Requests made without
+# setting a priority are assumed to be placing an order.
+ORDER: int = 0
+PRICES: int = 1
+REFRESH: int = 2
+
+_local = local()
+
+def current() -> int:
+    """Retrieves the priority of requests made on this thread."""
+    return getattr(_local, "priority", ORDER)
+
+@contextmanager
+def priority(level: int) -> Iterator[None]:
+    """Sets the priority of requests made on this thread within a
+    :keyword:`with` statement.
+
+    Parameters
+    ----------
+    level: int
+        The priority.
+
+    Returns
+    -------
+    Iterator[None]
+        A context manager which restores the previous priority when it exits.
+    """
+    previous: int = current()
+    _local.priority = level
+
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+def with_priority(level: int, function: Callable) -> Callable:
+    """Wraps a function so requests it makes have a priority.
+
+    Parameters
+    ----------
+    level: int
+        The priority.
+    function: Callable
+        The function.
+
+    Returns
+    -------
+    Callable
+        The wrapped function.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with priority(level):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+class RateLimiter:
+    """A token bucket of request weight for one exchange.
+
+    The bucket holds up to ``capacity`` weight and refills at
+    ``capacity / window`` per second. Each request takes its weight from the
+    bucket, waiting for it to refill if needed. Orders may empty the bucket,
+    but other requests leave a ``reserve`` in it and wait while any request of
+    a higher priority is waiting, so orders never queue behind them.
+
+    The bucket is corrected from the weight the exchange reports as used in
+    response headers. A 418 or 429 response stops all requests until the
+    exchange's ``Retry-After``.
+
+    Parameters
+    ----------
+    name: str
+        The name of the exchange; used in logs.
+    capacity: int
+        The weight allowed per window.
+    window: float
+        The length of the window in seconds.
+    reserve: float
+        The fraction of the capacity kept for orders.
+    headers: List[str]
+        The response headers which report the weight used in the window.
+    """
+    def __init__(self, name: str, capacity: int, window: float,
+                 reserve: float, headers: List[str]):
+        self._log: logging.Logger = \
+            logging.getLogger(f"bot.exchanges.RateLimiter.{name}")
+        self._capacity: float = capacity
+        self._rate: float = capacity / window
+        self._reserve: float = capacity * reserve
+        self._window: float = window
+        self._headers: List[str] = headers
+        self._condition: Condition = Condition()
+        self._waiting: Counter = Counter()
+        self._tokens: float = capacity
+        self._updated: float = time.monotonic()
+        self._paused_until: float = 0.0
+
+        self.waits: Dict[int, int] = Counter()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self._capacity,
+                           self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self, weight: int = 1, level: int = None) -> None:
+        """Waits until a request may be sent and takes its weight.
+
+        Parameters
+        ----------
+        weight: int, optional
+            The weight of the request.
+        level: int, optional
+            The priority of the request; defaults to this thread's.
+
+        Returns
+        -------
+        None
+        """
+        level = current() if level is None else level
+        floor: float = 0.0 if level == ORDER else self._reserve
+        weight = min(weight, self._capacity - floor)
+
+        with self._condition:
+            self._waiting[level] += 1
+            waited: bool = False
+
+            try:
+                while True:
+                    now: float = time.monotonic()
+                    self._refill(now)
+
+                    if any(self._waiting[p] for p in range(level)):
+                        # Woken when the higher priority request is done.
+                        delay = None
+                    elif now < self._paused_until:
+                        delay = self._paused_until - now
+                    elif self._tokens - weight >= floor:
+                        self._tokens -= weight
+                        return
+                    else:
+                        delay = (weight + floor - self._tokens) / self._rate
+
+                    if not waited:
+                        waited = True
+                        self.waits[level] += 1
+                        self._log.debug("Waiting to send a request of "
+                                        "priority %d.", level)
+
+                    self._condition.wait(delay)
+            finally:
+                self._waiting[level] -= 1
+                self._condition.notify_all()
+
+    def observe(self, response: requests.Response) -> None:
+        """Updates the bucket from a response's status and headers.
+
+        Parameters
+        ----------
+        response: requests.Response
+            The response.
+
+        Returns
+        -------
+        None
+        """
+        with self._condition:
+            if response.status_code in (418, 429):
+                retry: float = float(response.headers.get("Retry-After",
+                                                          self._window))
+                self._paused_until = max(self._paused_until,
+                                         time.monotonic() + retry)
+                self._tokens = 0
+                self._log.error(f"Rate limited with status "
+                                f"{response.status_code}; pausing requests "
+                                f"for {retry:g} seconds.")
+                return
+
+            used: List[int] = [int(response.headers[h]) for h in self._headers
+                               if h in response.headers]
+
+            if used:
+                self._refill(time.monotonic())
+                self._tokens = min(self._tokens,
+                                   self._capacity - max(used))
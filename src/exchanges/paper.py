@@ -0,0 +1,172 @@
+from decimal import Decimal
+from threading import Lock
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import json
+import logging
+import math
+import random
+import time
+
+from exchanges.exchange import Exchange
+from exchanges.plans import OrderPlan
+from utils import trace
+from utils.config import Reader
+import utils.globals as g
+
+PaperOrder = NamedTuple("PaperOrder", [
+    ("time", float),
+    ("market", str),
+    ("price", str),
+    ("quantity", str),
+    ("filled", str),
+    ("status", str)])
+
+class LatencyConfig(NamedTuple):
+    """The simulated latency of the paper-trading exchange."""
+    median: float
+    sigma: float
+
+class PaperConfig(NamedTuple):
+    """Settings of the paper-trading exchange."""
+    priority: int
+    use_multiplier: bool
+    file: str
+    source: str
+    seed: Optional[int]
+    latency: LatencyConfig
+    volatility: float
+    partial_rate: float
+    reject_rate: float
+    orders_file: str
+
+def parse_config(r: Reader) -> PaperConfig:
+    """Parses the paper-trading section of the configuration."""
+    latency: Reader = r.object("latency")
+
+    return PaperConfig(r.integer("priority"), r.flag("use_multiplier"),
+                       r.text("file"), r.text("source"), r.seed("seed"),
+                       LatencyConfig(latency.number("median"),
+                                     latency.number("sigma")),
+                       r.number("volatility"), r.number("partial_rate"),
+                       r.number("reject_rate"), r.text("orders_file"))
+
+class Paper(Exchange):
+    """An exchange which simulates orders instead of placing them.
+
+    Markets and their starting prices are loaded from a JSON file. Prices
+    follow a random walk, every request takes a random amount of time, and
+    orders are randomly rejected or partially filled. Every order is recorded
+    in :attr:`orders` and optionally appended to a file as JSON lines.
+    """
+    def __init__(self):
+        super().__init__(type(self).__name__)
+        self._log: logging.Logger = logging.getLogger("bot.exchanges.Paper")
+        self._config: PaperConfig = g.config.exchanges["paper"]
+        self._rng: random.Random = random.Random(self._config.seed)
+        self._lock: Lock = Lock()
+        self._markets: List[dict] = self._load_markets()
+        self._prices: Dict[str, float] = \
+            {m["name"]: float(m["price"]) for m in self._markets}
+
+        self.orders: List[PaperOrder] = []
+
+    def _load_markets(self) -> List[dict]:
+        with open(self._config.file, "r", encoding = "utf-8") as file:
+            markets = json.load(file)["markets"]
+
+        # Fixtures may hold the markets of several exchanges.
+        if isinstance(markets, dict):
+            markets = markets[self._config.source]
+
+        self._log.debug(f"Loaded {len(markets)} markets.")
+
+        return markets
+
+    def _wait(self) -> None:
+        latency: LatencyConfig = self._config.latency
+        time.sleep(self._rng.lognormvariate(math.log(latency.median),
+                                            latency.sigma) / 1000)
+
+    def _tick(self, market: str) -> str:
+        # Moves the price by a random step and returns it like a ticker.
+        with self._lock:
+            price: float = self._prices[market] * \
+                math.exp(self._rng.gauss(0, self._config.volatility))
+            self._prices[market] = price
+
+        return f"{price:.8f}"
+
+    def _record(self, order: PaperOrder) -> None:
+        with self._lock:
+            self.orders.append(order)
+
+            if self._config.orders_file:
+                with open(self._config.orders_file, "a",
+                          encoding = "utf-8") as file:
+                    file.write(json.dumps(order._asdict()) + "\n")
+
+    def get_markets(self) -> List[Exchange.Market]:
+        return [Exchange.Market(
+                    m["name"],
+                    Exchange.Currency(m["base"], None, m["base_precision"]),
+                    Exchange.Currency(m["quote"], None, m["quote_precision"]),
+                    Decimal(m["step"]) if m["step"] else None)
+                for m in self._markets]
+
+    def get_prices(self) -> Dict[str, str]:
+        self._wait()
+
+        return {name: self._tick(name) for name in self._prices}
+
+    def prepare_order(self, market: Exchange.Market, plan: OrderPlan,
+                      budget: Optional[Decimal] = None) \
+            -> Optional[Exchange.Order]:
+        price: Optional[str] = \
+            g.prices.get(self.name, market.name) if g.prices else None
+
+        if not price:
+            with trace.span("price"):
+                self._wait()
+                price = self._tick(market.name)
+
+        order: Optional[Tuple[Decimal, Decimal, Decimal]] = \
+            plan.apply(Decimal(price), budget)
+
+        if not order:
+            self._log.error(f"The price {price} of {market.name} is too low or "
+                            "high to place an order.")
+            return None
+
+        return Exchange.Order(market, order[0], order[1])
+
+    def submit_order(self, order: Exchange.Order) -> bool:
+        market, price, quantity = order
+
+        with trace.span("order"):
+            self._wait()
+
+        roll: float = self._rng.random()
+
+        if roll < self._config.reject_rate:
+            self._record(PaperOrder(time.time(), market.name, str(price),
+                                    str(quantity), "0", "rejected"))
+            self._log.error(f"Order failed | {quantity} {market.base.symbol} @ "
+                            f"{price} {market.quote.symbol}: simulated "
+                            "rejection")
+            return False
+
+        filled: Decimal = quantity
+
+        if roll < self._config.reject_rate + self._config.partial_rate:
+            filled = (quantity * Decimal(self._rng.uniform(0.1, 1))) \
+                .quantize(market.step or quantity)
+
+        status: str = "filled" if filled == quantity else "partially filled"
+        self._record(PaperOrder(time.time(), market.name, str(price),
+                                str(quantity), str(filled), status))
+        self._log.info(f"Order {status} | {filled}/{quantity} "
+                       f"{market.base.symbol} @ {price} "
+                       f"{market.quote.symbol} for a total of "
+                       f"{filled * price} {market.quote.symbol}.")
+
+        return True
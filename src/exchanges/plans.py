@@ -0,0 +1,142 @@
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from exchanges.exchange import Exchange
+from utils.config import Config, OrderConfig
+
+# The finest precision either exchange accepts. Used for markets without a
+# known precision or step.
+DEFAULT_PRECISION: Decimal = Decimal("1e-8")
+
+class OrderPlan(NamedTuple):
+    """The constants needed to calculate an order on a market.
+
+    Plans are built ahead of time so that calculating an order from a price
+    takes a few operations on :class:`~decimal.Decimal` objects, rather than
+    reading and converting the configuration each time.
+
+    Attributes
+    ----------
+    precision: Decimal
+        The quantum to which the price is rounded.
+    step: Decimal
+        The quantum to which the quantity is rounded down.
+    budget: Decimal
+        The amount of the quote currency to spend.
+    multiplier: Decimal
+        The factor by which the price is multiplied.
+    """
+    precision: Decimal
+    step: Decimal
+    budget: Decimal
+    multiplier: Decimal
+
+    def apply(self, price: Decimal, budget: Optional[Decimal] = None) \
+            -> Optional[Tuple[Decimal, Decimal, Decimal]]:
+        """Calculates an order from the asking price.
+
+        Parameters
+        ----------
+        price: Decimal
+            The asking price.
+        budget: Decimal, optional
+            The amount of the quote currency to spend instead of the plan's.
+
+        Returns
+        -------
+        Tuple[Decimal, Decimal, Decimal] or None
+            The adjusted price, the quantity, and the total cost, or
+            :any:`None` if the price or quantity rounds to zero.
+        """
+        price = (price * self.multiplier).quantize(self.precision)
+
+        if not price:
+            return None
+
+        quantity: Decimal = \
+            ((budget or self.budget) / price).quantize(self.step,
+                                                       rounding = ROUND_DOWN)
+
+        if not quantity:
+            return None
+
+        return price, quantity, quantity * price
+
+def make_plan(exchange: str, market: Exchange.Market,
+              config: Config) -> OrderPlan:
+    """Builds the plan of a market from the configuration.
+
+    Parameters
+    ----------
+    exchange: str
+        The name of the exchange of the market.
+    market: Exchange.Market
+        The market.
+    config: Config
+        The configuration.
+
+    Returns
+    -------
+    OrderPlan
+        The plan.
+    """
+    p: Optional[int] = market.quote.precision
+    order: OrderConfig = config.order
+    multiplier: Decimal = order.multiplier \
+        if config.exchanges[exchange.lower()].use_multiplier else Decimal(0)
+
+    return OrderPlan(Decimal(10) ** -p if p else DEFAULT_PRECISION,
+                     market.step or DEFAULT_PRECISION,
+                     order.quote_currencies[market.quote.symbol.lower()],
+                     1 + multiplier)
+
+def build_plans(markets: Iterable[Tuple[str, Exchange.Market]],
+                config: Config) \
+        -> Dict[str, Dict[str, OrderPlan]]:
+    """Builds the plans of markets.
+
+    Parameters
+    ----------
+    markets: Iterable[Tuple[str, Exchange.Market]]
+        The markets and the names of their exchanges.
+    config: Config
+        The configuration.
+
+    Returns
+    -------
+    Dict[str, Dict[str, OrderPlan]]
+        The plans keyed by exchange name then market name.
+    """
+    plans: Dict[str, Dict[str, OrderPlan]] = {}
+
+    for exchange, market in markets:
+        plans.setdefault(exchange, {})[market.name] = \
+            make_plan(exchange, market, config)
+
+    return plans
+
+def get_plan(plans: Dict[str, Dict[str, OrderPlan]], exchange: str,
+             market: Exchange.Market, config: Config) -> OrderPlan:
+    """Retrieves the plan of a market, building it if it wasn't indexed.
+
+    Parameters
+    ----------
+    plans: Dict[str, Dict[str, OrderPlan]]
+        The plans keyed by exchange name then market name, e.g. those of a
+        :class:`~exchanges.snapshot.Snapshot`.
+    exchange: str
+        The name of the exchange of the market.
+    market: Exchange.Market
+        The market.
+    config: Config
+        The configuration from which the plan is built if it wasn't indexed,
+        e.g. that of the snapshot of the plans.
+
+    Returns
+    -------
+    OrderPlan
+        The plan.
+    """
+    plan: Optional[OrderPlan] = plans.get(exchange, {}).get(market.name)
+
+    return plan if plan is not None else make_plan(exchange, market, config)
@@ -0,0 +1,126 @@
+from functools import partial
+from threading import Event, Thread
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, \
+    Tuple
+import logging
+import time
+
+from exchanges import limits
+from exchanges.exchange import Exchange
+
+class PriceFeed:
+    """An in-memory cache of the latest prices of markets.
+
+    Each exchange's prices are streamed if the exchange supports it and
+    streaming is enabled; otherwise, all of its prices are polled at once on
+    an interval. Only the prices of the given markets are kept. Every price
+    records when it was received so stale prices are never returned.
+
+    Parameters
+    ----------
+    exchanges: List[Exchange]
+        The exchanges of which to cache prices.
+    markets: Callable[[], Mapping[str, FrozenSet[str]]]
+        Retrieves the names of the markets to cache for each exchange name.
+        Called for every update, so markets added later are picked up.
+    interval: float
+        Seconds between polls of an exchange's prices.
+    max_age: float
+        Seconds after which a price is stale.
+    stream: bool
+        :keyword:`True` to stream prices from exchanges which support it.
+    """
+    def __init__(self, exchanges: List[Exchange],
+                 markets: Callable[[], Mapping[str, FrozenSet[str]]],
+                 interval: float,
+                 max_age: float, stream: bool):
+        self._log: logging.Logger = logging.getLogger("bot.exchanges.PriceFeed")
+        self._exchanges: List[Exchange] = exchanges
+        self._markets: Callable[[], Mapping[str, FrozenSet[str]]] = markets
+        self._interval: float = interval
+        self._max_age: float = max_age
+        self._stream: bool = stream
+        self._stop: Event = Event()
+        self._prices: Dict[str, Dict[str, Tuple[Any, float]]] = \
+            {ex.name: {} for ex in exchanges}
+
+    def _update(self, exchange: str, prices: Dict[str, Any]) -> None:
+        received: float = time.monotonic()
+        markets: FrozenSet[str] = self._markets().get(exchange, frozenset())
+        entries: Dict[str, Tuple[Any, float]] = self._prices[exchange]
+
+        for market, price in prices.items():
+            if market in markets:
+                entries[market] = (price, received)
+
+    def _poll(self, exchange: Exchange) -> None:
+        while not self._stop.is_set():
+            start: float = time.monotonic()
+
+            # The thread keeps polling after an error; otherwise the cached
+            # prices would go stale until the bot restarts.
+            try:
+                with limits.priority(limits.PRICES):
+                    self._update(exchange.name, exchange.get_prices())
+            except Exception:
+                self._log.exception("Prices could not be retrieved from "
+                                    f"{exchange.name}.")
+
+            self._stop.wait(max(0.0, self._interval
+                                     - (time.monotonic() - start)))
+
+    def start(self) -> None:
+        """Starts receiving prices from every exchange.
+
+        Returns
+        -------
+        None
+        """
+        for ex in self._exchanges:
+            if self._stream and \
+                    ex.stream_prices(partial(self._update, ex.name)):
+                self._log.debug(f"Streaming prices from {ex.name}.")
+                continue
+
+            Thread(target = self._poll, args = (ex,),
+                   name = f"prices-{ex.name}", daemon = True).start()
+            self._log.debug(f"Polling prices from {ex.name} every "
+                            f"{self._interval} seconds.")
+
+    def get(self, exchange: str, market: str) -> Optional[Any]:
+        """Retrieves the latest price of a market if it is not stale.
+
+        Parameters
+        ----------
+        exchange: str
+            The name of the exchange.
+        market: str
+            The name of the market.
+
+        Returns
+        -------
+        Any or None
+            The price in the format the exchange returned it, or :any:`None`
+            if it is stale or was never received.
+        """
+        entry: Optional[Tuple[Any, float]] = \
+            self._prices.get(exchange, {}).get(market)
+
+        if entry is None:
+            return None
+
+        if time.monotonic() - entry[1] > self._max_age:
+            self._log.debug("The price of %s on %s is stale.", market,
+                            exchange)
+            return None
+
+        return entry[0]
+
+    def close(self) -> None:
+        """Stops polling prices.
+
+        Returns
+        -------
+        None
+        """
+        self._stop.set()
@@ -0,0 +1,16 @@
+from typing import Dict, NamedTuple
+
+from exchanges.index import MarketIndex
+from exchanges.plans import OrderPlan
+from utils.config import Config
+from utils.matcher import CurrencyMatcher
+
+# The configuration and the caches built from it and the database's tables. A
+# new snapshot replaces the old one in a single assignment, so readers never
+# see a mix of old and new settings and caches as long as they hold on to one
+# snapshot.
+Snapshot = NamedTuple("Snapshot", [
+    ("config", Config),
+    ("matcher", CurrencyMatcher),
+    ("markets", MarketIndex),
+    ("plans", Dict[str, Dict[str, OrderPlan]])])
@@ -0,0 +1,144 @@
+from threading import Event, Thread
+from typing import List, Optional, Tuple
+import logging
+
+from requests.adapters import HTTPAdapter
+import requests
+
+from exchanges import limits
+from exchanges.limits import RateLimiter
+
+class Transport:
+    """A connection pool shared by the exchanges' API clients.
+
+    Connections are reused across requests and clients instead of each client
+    opening its own. Optionally, every registered URL is requested on an
+    interval so connections to its host aren't closed for being idle, which
+    would otherwise add a new TCP and TLS handshake to the first order after a
+    quiet period.
+
+    Parameters
+    ----------
+    connections: int
+        The maximum amount of connections kept open to each host.
+    interval: float
+        Seconds between keep-alive requests; none are sent if ``0``.
+    timeout: float
+        Seconds to wait for a response before giving up.
+    """
+    def __init__(self, connections: int, interval: float, timeout: float):
+        self._log: logging.Logger = \
+            logging.getLogger("bot.exchanges.Transport")
+        self._interval: float = interval
+        self._urls: List[Tuple[str, Optional[RateLimiter]]] = []
+        self._stop: Event = Event()
+        self._thread: Optional[Thread] = None
+
+        self.timeout: float = timeout
+        self.adapter: HTTPAdapter = HTTPAdapter(pool_maxsize = connections)
+        self.session: requests.Session = requests.Session()
+        self.mount(self.session)
+
+    def _ping(self) -> None:
+        while not self._stop.wait(self._interval):
+            for url, limiter in self._urls:
+                try:
+                    if limiter:
+                        limiter.acquire(1, limits.REFRESH)
+
+                    response: requests.Response = \
+                        self.session.head(url, timeout = self.timeout)
+
+                    if limiter:
+                        limiter.observe(response)
+                except requests.RequestException as e:
+                    self._log.warning(f"Keep-alive request to {url} failed: "
+                                      f"{e}")
+
+    def mount(self, session: requests.Session) -> None:
+        """Makes a session use the shared connection pool.
+
+        Parameters
+        ----------
+        session: requests.Session
+            The session.
+
+        Returns
+        -------
+        None
+        """
+        session.mount("http://", self.adapter)
+        session.mount("https://", self.adapter)
+
+    def keep_alive(self, url: str,
+                   limiter: Optional[RateLimiter] = None) -> None:
+        """Keeps the connection to a URL's host open.
+
+        The URL is requested right away to open the connection, then on every
+        interval. The response is ignored, so a ``HEAD`` request to any cheap
+        endpoint will do.
+
+        Parameters
+        ----------
+        url: str
+            The URL to request.
+        limiter: RateLimiter, optional
+            The rate limiter of the URL's exchange.
+
+        Returns
+        -------
+        None
+        """
+        try:
+            self.session.head(url, timeout = self.timeout)
+        except requests.RequestException as e:
+            self._log.warning(f"Connection to {url} could not be opened: {e}")
+
+        if not self._interval:
+            return
+
+        self._urls.append((url, limiter))
+
+        if not self._thread:
+            self._thread = Thread(target = self._ping, name = "keep-alive",
+                                  daemon = True)
+            self._thread.start()
+
+    def dispatch(self, url: str, apisign: str,
+                 limiter: Optional[RateLimiter] = None) -> dict:
+        """Sends a signed Bittrex request through the shared pool.
+
+        Parameters
+        ----------
+        url: str
+            The URL of the request.
+        apisign: str
+            The request's signature.
+        limiter: RateLimiter, optional
+            The rate limiter through which to send the request.
+
+        Returns
+        -------
+        dict
+            The deserialised response.
+        """
+        if limiter:
+            limiter.acquire()
+
+        response: requests.Response = self.session.get(
+                url, headers = {"apisign": apisign}, timeout = self.timeout)
+
+        if limiter:
+            limiter.observe(response)
+
+        return response.json()
+
+    def close(self) -> None:
+        """Stops sending keep-alive requests and closes the connections.
+
+        Returns
+        -------
+        None
+        """
+        self._stop.set()
+        self.session.close()
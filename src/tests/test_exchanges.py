@@ -0,0 +1,98 @@
+"""Tests dispatching orders to the exchanges.
+
+Run from the ``src`` directory::
+
+    python -m unittest tests.test_exchanges
+"""
+from decimal import Decimal
+from typing import List, Optional
+import logging
+import unittest
+
+import requests
+
+from benchmarks.harness import FakeExchange, base_config
+from exchanges import exchanges
+from exchanges.exchange import Exchange
+from exchanges.index import Markets
+from exchanges.plans import OrderPlan, build_plans
+from exchanges.snapshot import Snapshot
+from utils import config
+import utils.globals as g
+
+class _Unreachable(FakeExchange):
+    # Fails to retrieve the price, like an exchange whose connection drops.
+    def prepare_order(self, market: Exchange.Market, plan: OrderPlan,
+                      budget: Optional[Decimal] = None) -> Exchange.Order:
+        raise requests.ConnectionError("Connection reset by peer.")
+
+class _Recording(FakeExchange):
+    # Records the plan of each order it prepares.
+    def __init__(self, name: str, latency: float):
+        super().__init__(name, latency)
+        self.plans: List[OrderPlan] = []
+
+    def prepare_order(self, market: Exchange.Market, plan: OrderPlan,
+                      budget: Optional[Decimal] = None) -> Exchange.Order:
+        self.plans.append(plan)
+
+        return super().prepare_order(market, plan, budget)
+
+class DispatchTest(unittest.TestCase):
+    def setUp(self):
+        g.log = logging.getLogger("bot")
+        g.log.setLevel(logging.CRITICAL)
+        self.preferred: FakeExchange = _Unreachable("Binance", 0)
+        self.fallback: _Recording = _Recording("Bittrex", 0)
+        g.exchanges = [self.preferred, self.fallback]
+
+    def _place(self, dispatch: str, indexed: bool = True,
+               reload: bool = False) -> bool:
+        document: dict = base_config()
+        document["order"]["dispatch"] = dispatch
+        g.config = config.parse(document)
+
+        data: Markets = {ex.name: tuple(ex.get_markets()[:1])
+                         for ex in g.exchanges}
+        self.snapshot: Snapshot = Snapshot(
+                g.config, None, None,
+                build_plans(((name, market) for name, markets in data.items()
+                             for market in markets), g.config)
+                if indexed else {})
+
+        # A reload while the order is placed. Sequential dispatch would raise
+        # the preferred exchange's error.
+        if reload:
+            document["order"]["dispatch"] = "sequential"
+            document["order"]["multiplier"] = 0.5
+            g.config = config.parse(document)
+
+        return exchanges.place_order(data, self.snapshot)
+
+    def test_priority_falls_back_when_preferred_exchange_raises(self):
+        self.assertTrue(self._place("priority"))
+        self.assertEqual(len(self.fallback.orders), 1)
+
+    def test_first_falls_back_when_preferred_exchange_raises(self):
+        self.assertTrue(self._place("first"))
+        self.assertEqual(len(self.fallback.orders), 1)
+
+    def test_orders_use_the_plans_of_their_snapshot(self):
+        # The database's current snapshot isn't read while placing the order.
+        g.db = None
+
+        self.assertTrue(self._place("priority"))
+        market: Exchange.Market = self.fallback.orders[0]
+        self.assertEqual(len(self.fallback.plans), 1)
+        self.assertIs(self.fallback.plans[0],
+                      self.snapshot.plans["Bittrex"][market.name])
+
+    def test_orders_use_the_settings_of_their_snapshot(self):
+        self.assertTrue(self._place("priority", indexed = False,
+                                    reload = True))
+        self.assertEqual(len(self.fallback.plans), 1)
+        self.assertEqual(self.fallback.plans[0].multiplier,
+                         1 + self.snapshot.config.order.multiplier)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Tests searching images through the OCR cache.
+
+Run from the ``src`` directory::
+
+    python -m unittest tests.test_image
+"""
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+from unittest import mock
+import unittest
+
+from PIL import Image, ImageDraw, ImageFont
+
+from benchmarks.harness import base_config
+from exchanges.exchange import Exchange
+from utils import config, image
+from utils.cache import OcrCache, dhash
+from utils.matcher import CurrencyMatcher
+import utils.globals as g
+
+NANO: Exchange.Currency = Exchange.Currency("NANO", "Nano", None)
+LRC: Exchange.Currency = Exchange.Currency("LRC", "Loopring", None)
+
+def _render(name: str) -> Image.Image:
+    # An announcement drawn from the same template as every other one; only
+    # the name of the currency differs.
+    img: Image.Image = Image.new("L", (240, 135), 40)
+    draw: ImageDraw.ImageDraw = ImageDraw.Draw(img)
+    font = ImageFont.load_default()
+    draw.text((20, 30), "Binance Will List", fill = 230, font = font)
+    draw.text((20, 60), name, fill = 230, font = font)
+
+    return img.resize((1200, 675)).convert("RGB")
+
+class SearchImageTest(unittest.TestCase):
+    def setUp(self):
+        g.config = config.parse(base_config())
+        g.db = SimpleNamespace(matcher = CurrencyMatcher([NANO, LRC], False))
+
+        self.names: Dict[str, str] = {"/nano.png": "Nano (NANO)",
+                                      "/nano-repost.png": "Nano (NANO)",
+                                      "/lrc.png": "Loopring (LRC)"}
+        self.recognised: List[str] = []
+
+        # Stands in for the download and Tesseract.
+        def get_image(url: str, cancel = None) -> Image.Image:
+            return _render(self.names[url])
+
+        def recognise(img: Image.Image, cancel = None, budget = None) \
+                -> Tuple[Optional[Exchange.Currency], str]:
+            text: str = "Binance Will List\n" + self.names[self.url]
+            self.recognised.append(text)
+
+            return image.parse_currency(text), text
+
+        cache: OcrCache = OcrCache(16, g.config.ocr.cache_distance)
+
+        for name, value in (("cache", cache),
+                            ("get_image", get_image),
+                            ("recognise", recognise)):
+            patcher = mock.patch.object(image, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _search(self, url: str) -> Optional[Exchange.Currency]:
+        self.url: str = url
+
+        return image.search_image(url)
+
+    def test_same_template_with_different_currencies_is_not_shared(self):
+        nano: int = dhash(_render("Nano (NANO)"))
+        lrc: int = dhash(_render("Loopring (LRC)"))
+        self.assertLessEqual(bin(nano ^ lrc).count("1"), 4)
+
+        self.assertEqual(self._search("/nano.png"), NANO)
+        self.assertEqual(self._search("/lrc.png"), LRC)
+        self.assertEqual(len(self.recognised), 2)
+
+    def test_reposted_image_skips_ocr(self):
+        self.assertEqual(self._search("/nano.png"), NANO)
+        self.assertEqual(self._search("/nano-repost.png"), NANO)
+        self.assertEqual(len(self.recognised), 1)
+
+    def test_hit_is_searched_with_the_current_currencies(self):
+        self.assertEqual(self._search("/nano.png"), NANO)
+
+        g.db = SimpleNamespace(matcher = CurrencyMatcher([LRC], False))
+        self.assertIsNone(self._search("/nano.png"))
+        self.assertEqual(len(self.recognised), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,343 @@
+from bisect import bisect_left
+from queue import Queue
+from threading import Thread
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional, Tuple
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+
+# Each file starts with a header of its magic bytes, the format's version, and
+# flags. The flags of the index are unused.
+_HEADER = struct.Struct("<4sBB")
+_DATA_MAGIC: bytes = b"TWAD"
+_INDEX_MAGIC: bytes = b"TWAI"
+VERSION: int = 1
+COMPRESSED: int = 1
+
+# Records in the data file are the length of the status followed by the status.
+_LENGTH = struct.Struct("<I")
+
+# Entries in the index are the status's ID, the time it was received, and the
+# offset of its record in the data file.
+_ENTRY = struct.Struct("<QdQ")
+
+Entry = NamedTuple("Entry", [
+    ("id", int),
+    ("time", float),
+    ("offset", int)])
+
+def _paths(path: str) -> Tuple[str, str]:
+    return path + ".dat", path + ".idx"
+
+def _check(header: bytes, magic: bytes, path: str) -> int:
+    # Returns the flags of a file if its header is valid.
+    if len(header) < _HEADER.size:
+        raise ValueError(f"'{path}' is not a tweet archive.")
+
+    magic_, version, flags = _HEADER.unpack_from(header)
+
+    if magic_ != magic:
+        raise ValueError(f"'{path}' is not a tweet archive.")
+
+    if version != VERSION:
+        raise ValueError(f"'{path}' has unsupported version {version}.")
+
+    return flags
+
+class ArchiveWriter:
+    """Appends raw statuses to an archive.
+
+    An archive is two files: ``<path>.dat`` holds the statuses as they were
+    received, each prefixed by its length, and ``<path>.idx`` holds an entry of
+    fixed size per status with its ID, the time it was received, and the
+    offset of its record. Statuses are optionally compressed individually.
+
+    Statuses are queued and written by a background thread, so archiving never
+    holds up handling a status. Writes are flushed whenever the queue empties.
+    Existing archives are appended to with their own compression. If the bot
+    stopped while writing, records which weren't indexed are discarded.
+
+    Parameters
+    ----------
+    path: str
+        The path of the archive without the extensions.
+    compress: bool
+        :keyword:`True` to compress statuses of a new archive.
+    """
+    def __init__(self, path: str, compress: bool):
+        self._log: logging.Logger = \
+            logging.getLogger("bot.twitter.ArchiveWriter")
+        self._queue: Queue = Queue()
+        files: Tuple[BinaryIO, BinaryIO, bool] = self._open(path, compress)
+        self._data: BinaryIO = files[0]
+        self._index: BinaryIO = files[1]
+        self._compress: bool = files[2]
+        self._thread: Thread = Thread(target = self._write, name = "archive",
+                                      daemon = True)
+        self._thread.start()
+
+    def _open(self, path: str, compress: bool) \
+            -> Tuple[BinaryIO, BinaryIO, bool]:
+        data_path, index_path = _paths(path)
+
+        if not os.path.exists(data_path) or not os.path.exists(index_path):
+            data = open(data_path, "wb")
+            index = open(index_path, "wb")
+            data.write(_HEADER.pack(_DATA_MAGIC, VERSION,
+                                    COMPRESSED if compress else 0))
+            index.write(_HEADER.pack(_INDEX_MAGIC, VERSION, 0))
+            self._log.info(f"Created the tweet archive '{path}'.")
+
+            return data, index, compress
+
+        data = open(data_path, "r+b")
+        index = open(index_path, "r+b")
+        flags: int = _check(data.read(_HEADER.size), _DATA_MAGIC, data_path)
+        _check(index.read(_HEADER.size), _INDEX_MAGIC, index_path)
+
+        # Drops a partially written entry, then entries whose records weren't
+        # completely written, then any records after the last entry's.
+        count: int = \
+            (os.path.getsize(index_path) - _HEADER.size) // _ENTRY.size
+        size: int = os.path.getsize(data_path)
+        end: int = _HEADER.size
+
+        while count:
+            index.seek(_HEADER.size + (count - 1) * _ENTRY.size)
+            offset: int = _ENTRY.unpack(index.read(_ENTRY.size))[2]
+
+            if offset + _LENGTH.size <= size:
+                data.seek(offset)
+                end = offset + _LENGTH.size + \
+                    _LENGTH.unpack(data.read(_LENGTH.size))[0]
+
+                if end <= size:
+                    break
+
+            end = _HEADER.size
+            count -= 1
+
+        index.truncate(_HEADER.size + count * _ENTRY.size)
+        data.truncate(end)
+        data.seek(end)
+        index.seek(0, os.SEEK_END)
+        self._log.info(f"Appending to the tweet archive '{path}' with {count} "
+                       "statuses.")
+
+        return data, index, bool(flags & COMPRESSED)
+
+    def _write(self) -> None:
+        while True:
+            item: Optional[Tuple[str, float]] = self._queue.get()
+
+            if item is None:
+                break
+
+            try:
+                self._append(*item)
+            except Exception as e:
+                self._log.error(f"A status could not be archived: {e}")
+
+            if self._queue.empty():
+                self._data.flush()
+                self._index.flush()
+
+        self._data.close()
+        self._index.close()
+
+    def _append(self, raw: str, received: float) -> None:
+        data: dict = json.loads(raw)
+
+        # Only statuses are archived, not deletions or other notices.
+        if "in_reply_to_status_id" not in data:
+            return
+
+        record: bytes = raw.encode("utf-8")
+
+        if self._compress:
+            record = zlib.compress(record, 1)
+
+        offset: int = self._data.tell()
+        self._data.write(_LENGTH.pack(len(record)))
+        self._data.write(record)
+        self._index.write(_ENTRY.pack(data["id"], received, offset))
+
+    def append(self, raw: str, received: float) -> None:
+        """Queues a raw message from the stream to be archived.
+
+        Parameters
+        ----------
+        raw: str
+            The message as it was received. It is ignored if it's not a status.
+        received: float
+            The time at which it was received, in seconds since the epoch.
+
+        Returns
+        -------
+        None
+        """
+        self._queue.put((raw, received))
+
+    def close(self) -> None:
+        """Writes the queued statuses and closes the archive.
+
+        Returns
+        -------
+        None
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+class _Times:
+    # A sequence of the times in the index, read from the index as needed so
+    # it can be bisected without reading every entry.
+    def __init__(self, index: mmap.mmap, count: int):
+        self._index: mmap.mmap = index
+        self._count: int = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> float:
+        return _ENTRY.unpack_from(self._index,
+                                  _HEADER.size + i * _ENTRY.size)[1]
+
+class ArchiveReader:
+    """Reads statuses from an archive written by :class:`ArchiveWriter`.
+
+    Both files are memory-mapped, so statuses are read straight from the page
+    cache without copying whole files into memory, and archives larger than
+    memory can be read.
+
+    Parameters
+    ----------
+    path: str
+        The path of the archive without the extensions.
+    """
+    def __init__(self, path: str):
+        data_path, index_path = _paths(path)
+
+        with open(data_path, "rb") as data, open(index_path, "rb") as index:
+            self._data: mmap.mmap = \
+                mmap.mmap(data.fileno(), 0, access = mmap.ACCESS_READ)
+            self._index: mmap.mmap = \
+                mmap.mmap(index.fileno(), 0, access = mmap.ACCESS_READ)
+
+        flags: int = _check(self._data, _DATA_MAGIC, data_path)
+        _check(self._index, _INDEX_MAGIC, index_path)
+
+        self._compressed: bool = bool(flags & COMPRESSED)
+        self._count: int = (len(self._index) - _HEADER.size) // _ENTRY.size
+        self._ids: Optional[Dict[int, int]] = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[bytes]:
+        return (status for _, status in self.read())
+
+    def _record(self, offset: int) -> bytes:
+        length: int = _LENGTH.unpack_from(self._data, offset)[0]
+        start: int = offset + _LENGTH.size
+        record: bytes = self._data[start:start + length]
+
+        return zlib.decompress(record) if self._compressed else record
+
+    def entry(self, i: int) -> Entry:
+        """Retrieves an entry of the index.
+
+        Parameters
+        ----------
+        i: int
+            The position of the entry; entries are in the order the statuses
+            were received.
+
+        Returns
+        -------
+        Entry
+            The entry.
+        """
+        if not 0 <= i < self._count:
+            raise IndexError("Entry index out of range.")
+
+        return Entry(*_ENTRY.unpack_from(self._index,
+                                         _HEADER.size + i * _ENTRY.size))
+
+    def read(self, start: int = 0, stop: Optional[int] = None) \
+            -> Iterator[Tuple[Entry, bytes]]:
+        """Reads statuses and their entries in the order they were received.
+
+        Parameters
+        ----------
+        start: int, optional
+            The position of the first status.
+        stop: int, optional
+            The position after the last status; defaults to the end.
+
+        Returns
+        -------
+        Iterator[Tuple[Entry, bytes]]
+            The entries and the statuses as they were received, encoded in
+            UTF-8.
+        """
+        stop = self._count if stop is None else min(stop, self._count)
+
+        for i in range(start, stop):
+            entry: Entry = self.entry(i)
+            yield entry, self._record(entry.offset)
+
+    def between(self, start: float, end: float) -> Tuple[int, int]:
+        """Finds the statuses received within a period of time.
+
+        Parameters
+        ----------
+        start: float
+            The start of the period, in seconds since the epoch.
+        end: float
+            The end of the period, exclusive.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The positions to pass to :meth:`read`.
+        """
+        times: _Times = _Times(self._index, self._count)
+
+        return bisect_left(times, start), bisect_left(times, end)
+
+    def get(self, status_id: int) -> Optional[bytes]:
+        """Retrieves a status by its ID.
+
+        The IDs are read from the index the first time this is called.
+
+        Parameters
+        ----------
+        status_id: int
+            The ID of the status.
+
+        Returns
+        -------
+        bytes or None
+            The status, or :any:`None` if it isn't in the archive.
+        """
+        if self._ids is None:
+            self._ids = {entry[0]: entry[2] for entry in _ENTRY.iter_unpack(
+                         self._index[_HEADER.size:
+                                     _HEADER.size + self._count * _ENTRY.size])}
+
+        offset: Optional[int] = self._ids.get(status_id)
+
+        return self._record(offset) if offset is not None else None
+
+    def close(self) -> None:
+        """Unmaps the files.
+
+        Returns
+        -------
+        None
+        """
+        self._data.close()
+        self._index.close()
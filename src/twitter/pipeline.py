@@ -0,0 +1,158 @@
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from typing import Callable, List, Optional
+import logging
+
+from tweepy.models import Status
+
+POLICIES = ("block", "newest", "oldest")
+
+class Pipeline:
+    """A bounded queue of statuses handled by a pool of worker threads.
+
+    The stream's thread only has to put statuses into the queue, so reading
+    from the stream is never held up by handling a status.
+
+    Parameters
+    ----------
+    handler: Callable[[Status], bool]
+        Handles a status. Returns :keyword:`False` if the stream should be
+        disconnected, after which no more statuses are handled.
+    workers: int
+        The amount of worker threads.
+    size: int
+        The maximum amount of statuses waiting in the queue.
+    policy: str
+        What to do with a status when the queue is full. ``"block"`` waits for
+        space, holding up the stream. ``"newest"`` drops the new status.
+        ``"oldest"`` drops the status which has waited the longest.
+    on_done: Callable[[], None]
+        Called once when a handler returns :keyword:`False`.
+
+    Raises
+    ------
+    ValueError
+        If the policy is not recognised.
+    """
+    def __init__(self, handler: Callable[[Status], bool], workers: int,
+                 size: int, policy: str, on_done: Callable[[], None]):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown drop policy '{policy}'; expected one of "
+                             f"{', '.join(POLICIES)}.")
+
+        self._log: logging.Logger = logging.getLogger("bot.twitter.Pipeline")
+        self._handler: Callable[[Status], bool] = handler
+        self._policy: str = policy
+        self._on_done: Callable[[], None] = on_done
+        self._queue: Queue = Queue(maxsize = size)
+        self._workers: List[Thread] = [
+            Thread(target = self._work, name = f"pipeline-{i}", daemon = True)
+            for i in range(workers)]
+
+        self._closing: Event = Event()
+
+        self.done: Event = Event()
+        self.dropped: int = 0
+
+        for worker in self._workers:
+            worker.start()
+
+    def _work(self) -> None:
+        while True:
+            status = self._queue.get()
+
+            try:
+                # None is the signal to stop.
+                if status is None:
+                    return
+
+                # Statuses still queued when the stream is done are skipped.
+                if self.done.is_set():
+                    continue
+
+                if not self._handler(status):
+                    self._finish()
+            except Exception:
+                self._log.exception(f"Status {status.id} could not be "
+                                    f"handled.")
+            finally:
+                self._queue.task_done()
+
+    def _finish(self) -> None:
+        if self.done.is_set():
+            return
+
+        self.done.set()
+        self._on_done()
+
+    def _drop(self, status: Status, reason: str = "The queue is full") -> None:
+        self.dropped += 1
+        self._log.warning(f"{reason}; dropped status {status.id}. "
+                          f"{self.dropped} statuses have been dropped.")
+
+    def put(self, status: Status) -> None:
+        """Queues a status to be handled, applying the drop policy if full.
+
+        Parameters
+        ----------
+        status: Status
+            The status to handle.
+
+        Returns
+        -------
+        None
+        """
+        if self._closing.is_set():
+            self._drop(status, "The pipeline is closing")
+            return
+
+        if self._policy == "block":
+            self._queue.put(status)
+            return
+
+        try:
+            self._queue.put_nowait(status)
+            return
+        except Full:
+            if self._policy == "newest":
+                self._drop(status)
+                return
+
+        # Makes room by dropping the oldest status. Another thread may fill the
+        # space first, in which case the new status is dropped instead.
+        try:
+            oldest: Optional[Status] = self._queue.get_nowait()
+        except Empty:
+            self._drop(status)
+            return
+
+        self._queue.task_done()
+
+        # The pipeline started closing since it was checked. A worker's signal
+        # to stop is put back rather than dropped.
+        if oldest is None:
+            self._queue.put(None)
+            self._drop(status, "The pipeline is closing")
+            return
+
+        self._drop(oldest)
+
+        try:
+            self._queue.put_nowait(status)
+        except Full:
+            self._drop(status)
+
+    def close(self) -> None:
+        """Waits for statuses being handled and stops the workers.
+
+        Returns
+        -------
+        None
+        """
+        self._closing.set()
+
+        for _ in self._workers:
+            self._queue.put(None)
+
+        for worker in self._workers:
+            worker.join()
@@ -0,0 +1,139 @@
+from decimal import Decimal
+from typing import Dict, Mapping, NamedTuple, Optional, Pattern, Sequence, \
+    Tuple, Union
+import re
+
+from utils.config import TwitterConfig, UserConfig
+import utils.globals as g
+
+class Rule(NamedTuple):
+    """How the tweets of one followed user are handled.
+
+    Rules are compiled once at startup so that handling a tweet takes a
+    dictionary lookup on its author's ID and at most one regular expression
+    search, however many users are followed.
+
+    Attributes
+    ----------
+    user: int
+        The ID of the user.
+    name: str
+        The screen name of the user.
+    terms: Pattern, optional
+        Matches any of the user's search terms, ignoring case, or
+        :any:`None` if every tweet is searched.
+    search_text: bool
+        :keyword:`True` if currencies are searched in the tweet's text.
+    search_image: bool
+        :keyword:`True` if currencies are searched in the tweet's image.
+    budgets: Mapping[str, Decimal], optional
+        The amounts of each quote currency to spend on an order instead of the
+        amounts in the order configuration, keyed by lower case symbol.
+    """
+    user: int
+    name: str
+    terms: Optional[Pattern]
+    search_text: bool
+    search_image: bool
+    budgets: Optional[Mapping[str, Decimal]]
+
+    def matches(self, text: str) -> bool:
+        """Checks if text contains any of the search terms.
+
+        Parameters
+        ----------
+        text: str
+            The text of the tweet.
+
+        Returns
+        -------
+        bool
+            :keyword:`True` if the text contains a term or there are no terms.
+        """
+        return self.terms is None or self.terms.search(text) is not None
+
+def get_users(config: Optional[TwitterConfig] = None) \
+        -> Tuple[UserConfig, ...]:
+    """Retrieves the configuration of each followed user.
+
+    Users listed in ``users`` are followed along with ``user``, if it's set.
+    Keys missing from a user's configuration were given the values of the
+    same keys in the Twitter section when the configuration was loaded.
+
+    Parameters
+    ----------
+    config: TwitterConfig, optional
+        The Twitter section; the global configuration's by default.
+
+    Returns
+    -------
+    Tuple[UserConfig, ...]
+        The configurations.
+    """
+    config = config or g.config.twitter
+
+    if not config.user:
+        return config.users
+
+    return (UserConfig(config.user, config.search_term, config.search_text,
+                       config.search_image, None),) + config.users
+
+def compile_terms(terms: Union[str, Sequence[str]]) -> Optional[Pattern]:
+    """Compiles search terms into a single case-insensitive expression.
+
+    Parameters
+    ----------
+    terms: Union[str, Sequence[str]]
+        A term or a sequence of terms. Empty terms are ignored.
+
+    Returns
+    -------
+    Pattern or None
+        The expression, or :any:`None` if there are no terms.
+    """
+    if isinstance(terms, str):
+        terms = [terms]
+
+    terms = [term for term in terms if term]
+
+    if not terms:
+        return None
+
+    # Longer terms first so a term which prefixes another doesn't shadow it.
+    return re.compile("|".join(map(re.escape, sorted(terms, key = len,
+                                                     reverse = True))),
+                      re.IGNORECASE)
+
+def compile_rules(ids: Dict[str, int],
+                  config: Optional[TwitterConfig] = None) -> Dict[int, Rule]:
+    """Compiles the rules of the followed users.
+
+    Parameters
+    ----------
+    ids: Dict[str, int]
+        The IDs of users keyed by lower case screen name. Users without an ID
+        are left out.
+    config: TwitterConfig, optional
+        The Twitter section; the global configuration's by default.
+
+    Returns
+    -------
+    Dict[int, Rule]
+        The rules keyed by user ID.
+    """
+    rules: Dict[int, Rule] = {}
+
+    for user in get_users(config):
+        uid: Optional[int] = ids.get(user.user.lower())
+
+        if uid is None:
+            continue
+
+        rules[uid] = Rule(uid,
+                          user.user,
+                          compile_terms(user.search_term),
+                          user.search_text,
+                          user.search_image,
+                          user.quote_currencies or None)
+
+    return rules
@@ -1,22 +1,72 @@
 from logging.handlers import TimedRotatingFileHandler
-from typing import Optional
+from threading import Lock
+from typing import Dict, List, Optional
 import logging
+import time
 
 import tweepy
 from tweepy.models import Status
 
+from twitter.archive import ArchiveWriter
+from twitter.pipeline import Pipeline
+from twitter.rules import Rule
+from utils import media, trace, utils
+from utils.config import ArchiveConfig, TwitterConfig
 import utils.globals as g
 
 class StreamListener(tweepy.StreamListener):
-    def __init__(self, user: int, callback):
+    def __init__(self, rules: Dict[int, Rule], callback):
         super().__init__()
 
         self._log: logging.Logger = logging.getLogger("bot.twitter.StreamListener")
         self._log_t: Optional[logging.Logger] = \
-            self._get_logger() if g.config["twitter"]["log_tweets"] else None
+            self._get_logger() if g.config.twitter.log_tweets else None
         self._callback = callback
+        self._pipeline: Optional[Pipeline] = self._get_pipeline()
+        self._archive: Optional[ArchiveWriter] = self._get_archive()
 
-        self.user: int = user
+        # Serialises handling statuses while only the first order may be
+        # placed. Set once a status has been found.
+        self._first_lock: Lock = Lock()
+        self._found: bool = False
+
+        self.rules: Dict[int, Rule] = rules
+        self.stream: Optional[tweepy.Stream] = None
+
+    def _get_pipeline(self) -> Optional[Pipeline]:
+        config: TwitterConfig = g.config.twitter
+
+        if not config.workers:
+            return None
+
+        return Pipeline(self._handle,
+                        config.workers,
+                        config.queue_size,
+                        config.drop_policy,
+                        self._disconnect)
+
+    @staticmethod
+    def _get_archive() -> Optional[ArchiveWriter]:
+        config: ArchiveConfig = g.config.twitter.archive
+
+        if not config.file:
+            return None
+
+        return ArchiveWriter(config.file, config.compress)
+
+    def _disconnect(self) -> None:
+        self._log.info("Disconnecting the stream.")
+
+        if self.stream:
+            self.stream.disconnect()
+
+    def close(self) -> None:
+        # Waits for queued statuses to be handled and archived.
+        if self._pipeline:
+            self._pipeline.close()
+
+        if self._archive:
+            self._archive.close()
 
     @staticmethod
     def _get_logger() -> logging.Logger:
@@ -25,89 +75,170 @@ class StreamListener(tweepy.StreamListener):
         formatter: logging.Formatter = logging.Formatter(
                 "%(asctime)s - %(message)s")
 
+        user: str = g.config.twitter.user
         handler: TimedRotatingFileHandler = TimedRotatingFileHandler(
-                filename = f"log-tweets-{g.config['twitter']['user']}.txt",
+                filename = f"log-tweets-{user}.txt" if user else
+                    "log-tweets.txt",
                 when = "midnight",
                 encoding = "utf-8")
         handler.setLevel(logging.INFO)
         handler.setFormatter(formatter)
         logger.addHandler(handler)
 
+        # Keeps writing the file off the stream's thread.
+        if g.config.queue_logs:
+            utils.queue_handlers(logger)
+
         return logger
 
     @staticmethod
-    def _get_photo(status: Status) -> Optional[str]:
+    def _get_photos(status: Status) -> List[str]:
         # Ignores statuses without entities.
         if not hasattr(status, "extended_entities"):
-            return None
+            return []
 
-        # Ignores statuses without a media entity.
-        media = status.extended_entities[
-            "media"] if "media" in status.extended_entities else None
-        if not media:
-            return None
+        # Finds the URLs of all photo media entities; a status has up to four.
+        min_width: int = g.config.media.min_width
 
-        # Tries to find the first occurrence of a photo media entity.
-        return next((o for o in media if o["type"] == "photo"), None)
+        return [media.select_url(o, min_width)
+                for o in status.extended_entities.get("media", [])
+                if o["type"] == "photo"]
 
     def _validate_status(self, status: Status) -> bool:
-        # Only parses statuses by the user.
-        if status.author.id != self.user:
+        # Only parses statuses by the followed users.
+        rule: Optional[Rule] = self.rules.get(status.author.id)
+
+        if not rule:
             return False
 
         # Logs each status if the option is enabled.
         if self._log_t:
-            self._log_t.info(status.text)
+            self._log_t.info("%s: %s", rule.name, status.text)
 
         # Ignores retweets if the option is enabled.
-        if g.config["twitter"]["ignore_retweets"] and \
+        if g.config.twitter.ignore_retweets and \
                 hasattr(status, "retweeted_status"):
             return False
 
-        # Ignores statuses which don't contain the search term.
-        term: str = g.config["twitter"]["search_term"]
-        if term and term.lower() not in status.text.lower():
-            return False
+        # Ignores statuses which don't contain any of the search terms.
+        return rule.matches(status.text)
 
-        return True
+    def on_data(self, raw_data: str):
+        if not self._archive:
+            return super().on_data(raw_data)
+
+        # Archived after being handled so archiving doesn't delay it.
+        received: float = time.time()
+        result = super().on_data(raw_data)
+        self._archive.append(raw_data, received)
+
+        return result
 
     def on_connect(self):
         self._log.info("Stream connected.")
 
+    def _on_status_concurrent(self, status: Status, rule: Rule) -> bool:
+        search_text: bool = rule.search_text
+        search_image: bool = rule.search_image
+
+        # The photos are passed along with the text so the image downloads
+        # can start without waiting for the text to be searched.
+        text: Optional[str] = status.text if search_text else None
+        photos: List[str] = self._get_photos(status) if search_image else []
+
+        if not text and not photos:
+            return True
+
+        result: bool = self._callback(text = text,
+                                      image_urls = photos or None,
+                                      budgets = rule.budgets)
+
+        # Keeps listening, like the sequential mode does, if an image was
+        # wanted but there wasn't one to fall back on.
+        if search_image and not photos and not result:
+            return True
+
+        self._log.info(f"{rule.name} tweeted | {status.text}")
+
+        return not g.config.twitter.disconnect_on_first
+
     def on_status(self, status: Status):
-        if not self._validate_status(status):
+        trace.begin(status.id)
+
+        with trace.span("receive"):
+            with trace.span("validate"):
+                valid: bool = self._validate_status(status)
+
+            if not valid:
+                return True
+
+            if self._pipeline:
+                self._pipeline.put(status)
+
+                return not self._pipeline.done.is_set()
+
+        return self._handle(status)
+
+    def _handle(self, status: Status) -> bool:
+        # Statuses may be handled on a pipeline worker's thread.
+        trace.begin(status.id)
+        rule: Optional[Rule] = self.rules.get(status.author.id)
+
+        # The user may have been removed from the configuration while the
+        # status was queued.
+        if not rule:
             return True
 
-        search_text: bool = g.config["twitter"]["search_text"]
-        search_image: bool = g.config["twitter"]["search_image"]
+        if not g.config.twitter.disconnect_on_first:
+            return self._handle_rule(status, rule)
+
+        # Workers would otherwise each place an order before the first of them
+        # disconnects the stream.
+        with self._first_lock:
+            if self._found:
+                return False
+
+            self._found = not self._handle_rule(status, rule)
+
+            return not self._found
+
+    def _handle_rule(self, status: Status, rule: Rule) -> bool:
+        if g.config.twitter.concurrent:
+            return self._on_status_concurrent(status, rule)
+
+        search_text: bool = rule.search_text
+        search_image: bool = rule.search_image
 
         if search_text:
-            result: bool = self._callback(text = status.text)
+            result: bool = self._callback(text = status.text,
+                                          budgets = rule.budgets)
 
             # Returns if successful or image parsing is disabled.
             if (search_image and result) or not search_image:
-                self._log.info(f"User tweeted | {status.text}")
+                self._log.info(f"{rule.name} tweeted | {status.text}")
 
-                return not g.config["twitter"]["disconnect_on_first"]
+                return not g.config.twitter.disconnect_on_first
 
         if search_image:
-            photo: Optional[str] = self._get_photo(status)
+            photos: List[str] = self._get_photos(status)
 
             # Ignores the status if it doesn't have a photo.
-            if not photo:
+            if not photos:
                 return True
 
-            self._log.info(f"User tweeted | {status.text}")
-            self._callback(image_url = photo["media_url"])
+            self._log.info(f"{rule.name} tweeted | {status.text}")
+            self._callback(image_urls = photos, budgets = rule.budgets)
 
-            return not g.config["twitter"]["disconnect_on_first"]
+            return not g.config.twitter.disconnect_on_first
 
         return True
 
     def on_error(self, status_code: int) -> bool:
         if status_code == 420:
-            # TODO: Handle rate limiting properly.
-            self._log.warning("The bot is being rate limited.")
+            # Tweepy waits at least a minute before reconnecting and doubles
+            # the wait on each consecutive error.
+            self._log.warning("The bot is being rate limited; reconnecting "
+                              "after backing off.")
             return True
 
         if status_code == 401:
@@ -1,16 +1,89 @@
+from typing import Dict, Iterable, List, Optional
 import logging
 
 import tweepy
 
+from twitter.rules import Rule, compile_rules, get_users
 from twitter.stream_listener import StreamListener
+from utils.config import ApiConfig, TwitterConfig
 import utils.globals as g
 
+# The most screen names Twitter looks up per request.
+LOOKUP_SIZE: int = 100
+
 class Twitter:
     def __init__(self, callback = None):
         self._log: logging.Logger = logging.getLogger("bot.twitter.Twitter")
         self._api: tweepy.API = self._get_api()
+        self._callback = callback
+
+        names: List[str] = [user.user for user in get_users()]
+        self._ids: Dict[str, int] = self.ids_from_names(names)
+
+        self.rules: Dict[int, Rule] = compile_rules(self._ids)
+        self.listener: Optional[StreamListener] = None
+        self.stream: Optional[tweepy.Stream] = None
+
+        if not self.rules:
+            raise RuntimeError("The IDs of the users could not be retrieved.")
+
+        self._log.info(f"Following {len(self.rules)} users.")
+
+    def start(self) -> None:
+        """
+        Starts streaming the users' tweets. Blocks until the stream
+        disconnects.
+
+        Returns
+        -------
+        None
+        """
+        self.stream = self._start_stream(self._callback)
+
+    def compile_rules(self, config: TwitterConfig) -> Dict[int, Rule]:
+        """
+        Compiles the rules of the followed users from a configuration without
+        using them yet; see :meth:`set_rules`.
+
+        The stream can't follow other users without reconnecting, so users who
+        weren't followed when the bot started are left out until it restarts.
+
+        Parameters
+        ----------
+        config: TwitterConfig
+            The Twitter section of the configuration.
+
+        Returns
+        -------
+        Dict[int, Rule]
+            The rules keyed by user ID.
+        """
+        for user in get_users(config):
+            if user.user.lower() not in self._ids:
+                self._log.warning(f"The user '{user.user}' will be followed "
+                                  "once the bot restarts.")
 
-        self.stream: tweepy.Stream = self._start_stream(callback)
+        return compile_rules(self._ids, config)
+
+    def set_rules(self, rules: Dict[int, Rule]) -> None:
+        """
+        Gives new rules to the stream's listener.
+
+        Parameters
+        ----------
+        rules: Dict[int, Rule]
+            The rules keyed by user ID.
+
+        Returns
+        -------
+        None
+        """
+        self.rules = rules
+
+        if self.listener:
+            self.listener.rules = rules
+
+        self._log.info(f"Recompiled the rules of {len(rules)} users.")
 
     def _get_api(self) -> tweepy.API:
         """
@@ -21,9 +94,9 @@ class Twitter:
         tweepy.API
             The API object.
         """
-        config = g.config["twitter"]["api"]
-        key: str = config["key"]
-        secret: str = config["secret"]
+        config: ApiConfig = g.config.twitter.api
+        key: str = config.key
+        secret: str = config.secret
 
         # TODO: Raise exceptions here, or better yet, when loading the config.
         if not key:
@@ -34,8 +107,8 @@ class Twitter:
 
         auth = tweepy.OAuthHandler(key, secret)
 
-        token: str = config["access_token"]
-        secret = config["access_secret"]
+        token: str = config.access_token
+        secret = config.access_secret
 
         if token and secret:
             auth.set_access_token(token, secret)
@@ -47,13 +120,14 @@ class Twitter:
     def _start_stream(self, callback) -> tweepy.Stream:
         """
         Creates and starts an asynchronous :class:`stream<tweepy.Stream>` of the
-        user's tweets which match the search term in the configuration.
+        followed users' tweets.
 
         Note
         -------
         Stream filter parameters behave like an OR rather than an AND.
         Therefore, the track parameter is not used. Instead, tweets are further
-        filtered in the :class:`StreamListener` using the search term.
+        filtered in the :class:`StreamListener` using the search terms of their
+        author's rule.
 
         Parameters
         ----------
@@ -65,35 +139,55 @@ class Twitter:
         tweepy.Stream
             The stream which is created.
         """
-        user: int = self.id_from_name(g.config["twitter"]["user"])
-
-        listener: StreamListener = StreamListener(user, callback)
+        listener: StreamListener = StreamListener(self.rules, callback)
         stream: tweepy.Stream = tweepy.Stream(auth = self._api.auth,
                                               listener = listener)
-        stream.filter(async = False, follow = [str(stream.listener.user)])
+        listener.stream = stream
+        self.listener = listener
+
+        try:
+            stream.filter(async = False, follow = list(map(str, self.rules)))
+        finally:
+            # Lets statuses which are still being handled finish.
+            listener.close()
 
         return stream
 
-    def id_from_name(self, name: str) -> int:
+    def ids_from_names(self, names: Iterable[str]) -> Dict[str, int]:
         """
-        Retrieves the ID of a user using the user's screen name
-        (twitter handle).
+        Retrieves the IDs of users using their screen names (Twitter handles).
+        Users are looked up in bulk rather than with a request per user.
 
         Parameters
         ----------
-        name
-            The screen name (Twitter handle) of the user.
+        names
+            The screen names (Twitter handles) of the users.
 
         Returns
         -------
-            The ID of the user.
+            The IDs of the users which were found, keyed by lower case screen
+            name.
         """
-        try:
-            return self._api.get_user(name).id
-        except tweepy.TweepError as e:
-            if e.api_code == 50:
-                self._log.error(f"The user '{name}' could not be found!")
-            if e.api_code == 63:
-                self._log.error(f"The user '{name}' has been suspended. It "
-                                f"won't possible to retrieve information.")
-            pass
+        names = list(dict.fromkeys(name.lower() for name in names))
+        ids: Dict[str, int] = {}
+
+        for i in range(0, len(names), LOOKUP_SIZE):
+            try:
+                users: List[tweepy.models.User] = self._api.lookup_users(
+                        screen_names = names[i:i + LOOKUP_SIZE])
+            except tweepy.TweepError as e:
+                # Raised if none of the users in the request were found.
+                if e.api_code != 17:
+                    raise
+
+                users = []
+
+            ids.update((user.screen_name.lower(), user.id) for user in users)
+
+        # Suspended users and users which don't exist are left out.
+        for name in names:
+            if name not in ids:
+                self._log.error(f"The user '{name}' could not be found or has "
+                                "been suspended.")
+
+        return ids
@@ -0,0 +1,205 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import NamedTuple, Optional
+import json
+import logging
+
+try:
+    import Image
+except ImportError:
+    from PIL import Image
+
+def dhash(img: Image.Image) -> int:
+    """Computes the difference hash of an image.
+
+    The image is shrunk to 9x8 grayscale pixels and each bit of the 64-bit hash
+    is whether a pixel is brighter than its right neighbour. Similar images
+    have hashes which differ by few bits.
+
+    Parameters
+    ----------
+    img: Image.Image
+        The image to hash.
+
+    Returns
+    -------
+    int
+        The 64-bit hash.
+    """
+    pixels = list(img.convert("L").resize((9, 8), Image.BILINEAR).getdata())
+    value: int = 0
+
+    for row in range(8):
+        for col in range(8):
+            i: int = row * 9 + col
+            value = (value << 1) | (pixels[i] > pixels[i + 1])
+
+    return value
+
+class OcrCache:
+    """A bounded cache of OCR results.
+
+    Entries are keyed by the image's :abbr:`URL (Uniform Resource Locator)`
+    and can also be found by the perceptual hash of the image, so
+    near-duplicate images posted under different URLs are hits too. The least
+    recently used entry is evicted when the cache is full.
+
+    Only the text is cached, not the currency found in it, so the text of a hit
+    is searched again with the current currencies and settings.
+
+    Parameters
+    ----------
+    size: int
+        The maximum amount of entries.
+    distance: int
+        The maximum amount of bits by which two hashes may differ for the images
+        to be considered the same. Announcements made from the same template
+        differ by only a few bits, so ``0`` requires the hashes to be equal.
+    path: str, optional
+        The file to which the cache is saved after every new entry and from
+        which it is loaded; the cache is not persisted if empty.
+    """
+    Entry = NamedTuple("Entry", [
+        ("hash", int),
+        ("text", str)])
+
+    def __init__(self, size: int, distance: int, path: str = ""):
+        self._log: logging.Logger = logging.getLogger("bot.utils.OcrCache")
+        self._entries: OrderedDict = OrderedDict()
+        self._lock: Lock = Lock()
+        self._size: int = size
+        self._distance: int = distance
+        self._path: str = path
+        self._writer: Optional[ThreadPoolExecutor] = \
+            ThreadPoolExecutor(max_workers = 1) if path else None
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+        if path:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self._path, "r", encoding = "utf-8") as file:
+                entries: list = json.load(file)
+        except FileNotFoundError:
+            return
+        except (EnvironmentError, ValueError) as e:
+            self._log.error(f"The cache could not be loaded from "
+                            f"'{self._path}': {e}")
+            return
+
+        # Files saved by earlier versions also have the currency; it's ignored.
+        for url, hash_, text, *_ in entries[-self._size:]:
+            self._entries[url] = self.Entry(hash_, text)
+
+        self._log.debug(f"Loaded {len(self._entries)} entries.")
+
+    def _save(self) -> None:
+        with self._lock:
+            entries: list = [[url, *entry]
+                             for url, entry in self._entries.items()]
+
+        try:
+            with open(self._path, "w", encoding = "utf-8") as file:
+                json.dump(entries, file)
+        except EnvironmentError as e:
+            self._log.error(f"The cache could not be saved to "
+                            f"'{self._path}': {e}")
+
+    def _count(self, entry: Optional[Entry], misses: bool = True) \
+            -> Optional[Entry]:
+        if entry:
+            self.hits += 1
+        elif misses:
+            self.misses += 1
+        else:
+            return None
+
+        self._log.debug(f"{'Hit' if entry else 'Miss'} | {self.hits} hits, "
+                        f"{self.misses} misses")
+
+        return entry
+
+    def get_url(self, url: str) -> Optional[Entry]:
+        """Finds an entry by its image's URL.
+
+        Parameters
+        ----------
+        url: str
+            The :abbr:`URL (Uniform Resource Locator)` of the image.
+
+        Returns
+        -------
+        OcrCache.Entry or None
+            The entry, or :any:`None` if it is not cached.
+
+        Notes
+        -----
+        Misses are not counted, as the image is expected to be looked up by
+        its hash next.
+        """
+        with self._lock:
+            entry: Optional[OcrCache.Entry] = self._entries.get(url)
+
+            if entry:
+                self._entries.move_to_end(url)
+
+            return self._count(entry, misses = False)
+
+    def get_hash(self, hash_: int) -> Optional[Entry]:
+        """Finds the entry of the most similar image.
+
+        Parameters
+        ----------
+        hash_: int
+            The perceptual hash of the image.
+
+        Returns
+        -------
+        OcrCache.Entry or None
+            The entry of the most similar image within the distance, or
+            :any:`None` if there are none.
+        """
+        with self._lock:
+            best = min(((bin(e.hash ^ hash_).count("1"), url)
+                        for url, e in self._entries.items()),
+                       default = None)
+
+            if best and best[0] <= self._distance:
+                self._entries.move_to_end(best[1])
+                entry: Optional[OcrCache.Entry] = self._entries[best[1]]
+            else:
+                entry = None
+
+            return self._count(entry)
+
+    def put(self, url: str, hash_: int, text: str) -> None:
+        """Adds an entry, evicting the least recently used one if full.
+
+        The cache is saved in the background if it is persisted.
+
+        Parameters
+        ----------
+        url: str
+            The :abbr:`URL (Uniform Resource Locator)` of the image.
+        hash_: int
+            The perceptual hash of the image.
+        text: str
+            The resulting text from OCR.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self._entries[url] = self.Entry(hash_, text)
+            self._entries.move_to_end(url)
+
+            while len(self._entries) > self._size:
+                self._entries.popitem(last = False)
+
+        if self._writer:
+            self._writer.submit(self._save)
@@ -0,0 +1,516 @@
+from decimal import Decimal
+from importlib import import_module
+from importlib.util import find_spec
+from threading import Event, Thread
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional, \
+    Tuple
+import json
+import logging
+import os
+import signal
+
+# Search terms are stored lower case; they are matched regardless of case.
+Terms = Tuple[str, ...]
+
+# Amounts of quote currencies to spend keyed by lower case symbol.
+Amounts = Mapping[str, Decimal]
+
+class ApiConfig(NamedTuple):
+    """Credentials of the Twitter API."""
+    key: str
+    secret: str
+    access_token: str
+    access_secret: str
+
+class ArchiveConfig(NamedTuple):
+    """Settings of the tweet archive."""
+    file: str
+    compress: bool
+
+class UserConfig(NamedTuple):
+    """Settings of a followed user, with defaults from the Twitter section."""
+    user: str
+    search_term: Terms
+    search_text: bool
+    search_image: bool
+    quote_currencies: Optional[Amounts]
+
+class TwitterConfig(NamedTuple):
+    """Settings of Twitter and the followed users."""
+    api: ApiConfig
+    user: str
+    search_term: Terms
+    users: Tuple[UserConfig, ...]
+    search_text: bool
+    search_image: bool
+    concurrent: bool
+    ignore_retweets: bool
+    disconnect_on_first: bool
+    log_tweets: bool
+    workers: int
+    queue_size: int
+    drop_policy: str
+    archive: ArchiveConfig
+
+class RateLimitConfig(NamedTuple):
+    """Settings of an exchange's rate limiter."""
+    weight: int
+    window: float
+    reserve: float
+
+# The section of an exchange. Its type is defined by the exchange's module;
+# every section has a priority and use_multiplier.
+ExchangeConfig = NamedTuple
+
+class DisabledConfig(NamedTuple):
+    """The section of an exchange with a priority of 0."""
+    priority: int
+    use_multiplier: bool
+
+class OrderConfig(NamedTuple):
+    """Settings of orders."""
+    quote_currencies: Amounts
+    multiplier: Decimal
+    dispatch: str
+
+class OcrConfig(NamedTuple):
+    """Settings of OCR."""
+    workers: int
+    max_width: int
+    threshold: int
+    tiles: int
+    overlap: float
+    cache_size: int
+    cache_distance: int
+    cache_file: str
+    cpu_budget: float
+
+class MediaConfig(NamedTuple):
+    """Settings of image downloads."""
+    host: str
+    connections: int
+    min_width: int
+    max_bytes: int
+    timeout: float
+
+class TimeoutsConfig(NamedTuple):
+    """Seconds to wait for each part of startup."""
+    exchanges: float
+    currencies: float
+    markets: float
+    twitter: float
+    ocr: float
+
+class StartupConfig(NamedTuple):
+    """Settings of startup."""
+    timeouts: TimeoutsConfig
+
+class DatabaseConfig(NamedTuple):
+    """Settings of the database."""
+    file: str
+    warm_start: bool
+    refresh_interval: float
+    refresh_jitter: float
+
+class TransportConfig(NamedTuple):
+    """Settings of the connections to the exchanges."""
+    connections: int
+    keep_alive: float
+    timeout: float
+
+class PricesConfig(NamedTuple):
+    """Settings of the price feed."""
+    enabled: bool
+    interval: float
+    max_age: float
+    stream: bool
+
+class TraceConfig(NamedTuple):
+    """Settings of tracing."""
+    enabled: bool
+    file: str
+
+class ReloadConfig(NamedTuple):
+    """Settings of reloading the configuration."""
+    signal: bool
+    interval: float
+
+class Config(NamedTuple):
+    """The configuration of the bot.
+
+    The configuration is immutable. Values are validated and converted when it
+    is loaded, e.g. amounts to :class:`~decimal.Decimal` objects and search
+    terms to lower case, so reading a value while handling a tweet is an
+    attribute lookup. The keys and values are documented in the README.
+
+    Objects are :class:`~types.MappingProxyType` views and lists are tuples.
+    Exchanges which aren't in the file aren't in :attr:`exchanges`; the
+    section of each enabled exchange is parsed by its module's
+    ``parse_config``.
+    """
+    twitter: TwitterConfig
+    exchanges: Mapping[str, ExchangeConfig]
+    order: OrderConfig
+    ocr: OcrConfig
+    media: MediaConfig
+    startup: StartupConfig
+    database: DatabaseConfig
+    transport: TransportConfig
+    prices: PricesConfig
+    trace: TraceConfig
+    reload: ReloadConfig
+    search_currency_name: bool
+    tessdata_dir: str
+    tesseract_cmd: str
+    verbose: bool
+    queue_logs: bool
+
+class Reader:
+    """Reads the values of a JSON object and checks their types.
+
+    Errors name the value by its dotted path from the root of the
+    configuration. Exchange modules use it to parse their own sections.
+    """
+    def __init__(self, data, path: str):
+        if not isinstance(data, dict):
+            raise ValueError(f"'{path}' must be an object.")
+
+        self._data: dict = data
+        self._path: str = path
+
+    def _name(self, key: str) -> str:
+        return f"{self._path}.{key}" if self._path else key
+
+    def _get(self, key: str, types: tuple, kind: str):
+        if key not in self._data:
+            raise ValueError(f"'{self._name(key)}' is missing.")
+
+        value = self._data[key]
+
+        # Booleans are integers, but aren't accepted as numbers.
+        if not isinstance(value, types) or \
+                (isinstance(value, bool) and bool not in types):
+            raise ValueError(f"'{self._name(key)}' must be {kind}.")
+
+        return value
+
+    def object(self, key: str) -> "Reader":
+        return Reader(self._get(key, (dict,), "an object"), self._name(key))
+
+    def flag(self, key: str) -> bool:
+        return self._get(key, (bool,), "true or false")
+
+    def text(self, key: str) -> str:
+        return self._get(key, (str,), "a string")
+
+    def integer(self, key: str) -> int:
+        value: int = self._get(key, (int,), "an integer")
+
+        if value < 0:
+            raise ValueError(f"'{self._name(key)}' must not be negative.")
+
+        return value
+
+    def number(self, key: str) -> float:
+        value: float = self._get(key, (int, float), "a number")
+
+        if value < 0:
+            raise ValueError(f"'{self._name(key)}' must not be negative.")
+
+        return value
+
+    def seed(self, key: str) -> Optional[int]:
+        return self._get(key, (int, type(None)), "an integer or null")
+
+    def decimal(self, key: str) -> Decimal:
+        # Converted from the text of the number so 0.1 is exactly 0.1.
+        return Decimal(str(self._get(key, (int, float), "a number")))
+
+    def terms(self, key: str) -> Terms:
+        terms = self._get(key, (str, list), "a string or a list of strings")
+
+        if isinstance(terms, str):
+            terms = [terms]
+
+        if not all(isinstance(term, str) for term in terms):
+            raise ValueError(f"'{self._name(key)}' must be a string or a list "
+                             "of strings.")
+
+        return tuple(term.lower() for term in terms if term)
+
+    def amounts(self, key: str) -> Amounts:
+        amounts: Reader = self.object(key)
+
+        return MappingProxyType({symbol.lower(): amounts.decimal(symbol)
+                                 for symbol in amounts.keys()})
+
+    def rate_limit(self, key: str) -> RateLimitConfig:
+        limit: Reader = self.object(key)
+
+        return RateLimitConfig(limit.integer("weight"), limit.number("window"),
+                               limit.number("reserve"))
+
+    def objects(self, key: str) -> List["Reader"]:
+        items: list = self._get(key, (list,), "a list")
+
+        return [Reader(item, f"{self._name(key)}[{i}]")
+                for i, item in enumerate(items)]
+
+    def has(self, key: str) -> bool:
+        return key in self._data
+
+    def keys(self) -> List[str]:
+        return list(self._data)
+
+def _user(r: Reader, twitter: Reader) -> UserConfig:
+    # Keys missing from a user's settings take the values of the same keys in
+    # the Twitter section.
+    def pick(key: str) -> Reader:
+        return r if r.has(key) else twitter
+
+    return UserConfig(r.text("user"),
+                      pick("search_term").terms("search_term"),
+                      pick("search_text").flag("search_text"),
+                      pick("search_image").flag("search_image"),
+                      r.amounts("quote_currencies")
+                      if r.has("quote_currencies") else None)
+
+def _twitter(r: Reader) -> TwitterConfig:
+    api: Reader = r.object("api")
+    archive: Reader = r.object("archive")
+
+    return TwitterConfig(
+            ApiConfig(api.text("key"), api.text("secret"),
+                      api.text("access_token"), api.text("access_secret")),
+            r.text("user"),
+            r.terms("search_term"),
+            tuple(_user(user, r) for user in r.objects("users")),
+            r.flag("search_text"),
+            r.flag("search_image"),
+            r.flag("concurrent"),
+            r.flag("ignore_retweets"),
+            r.flag("disconnect_on_first"),
+            r.flag("log_tweets"),
+            r.integer("workers"),
+            r.integer("queue_size"),
+            r.text("drop_policy"),
+            ArchiveConfig(archive.text("file"), archive.flag("compress")))
+
+def _exchange(name: str, r: Reader) -> ExchangeConfig:
+    # Sections are parsed by the parse_config function of the exchange's
+    # module. Modules of disabled exchanges are only looked up, not imported,
+    # so the libraries of their APIs don't need to be installed.
+    if not name.isidentifier() or not find_spec("." + name, "exchanges"):
+        raise ValueError(f"'exchanges.{name}' is not a known exchange.")
+
+    if not r.integer("priority"):
+        return DisabledConfig(0, False)
+
+    module = import_module("." + name, "exchanges")
+
+    if not hasattr(module, "parse_config"):
+        raise ValueError(f"'exchanges.{name}' is not a known exchange.")
+
+    return module.parse_config(r)
+
+def _exchanges(r: Reader) -> Mapping[str, ExchangeConfig]:
+    return MappingProxyType({name: _exchange(name, r.object(name))
+                             for name in r.keys()})
+
+def parse(data: dict) -> Config:
+    """Validates and converts a deserialised configuration.
+
+    Parameters
+    ----------
+    data: dict
+        The configuration as deserialised from JSON.
+
+    Returns
+    -------
+    Config
+        The configuration.
+
+    Raises
+    ------
+    ValueError
+        If a key is missing or a value has the wrong type.
+    """
+    r: Reader = Reader(data, "")
+    order: Reader = r.object("order")
+    ocr: Reader = r.object("ocr")
+    media: Reader = r.object("media")
+    timeouts: Reader = r.object("startup").object("timeouts")
+    database: Reader = r.object("database")
+    transport: Reader = r.object("transport")
+    prices: Reader = r.object("prices")
+    trace: Reader = r.object("trace")
+    reload: Reader = r.object("reload")
+
+    return Config(
+            _twitter(r.object("twitter")),
+            _exchanges(r.object("exchanges")),
+            OrderConfig(order.amounts("quote_currencies"),
+                        order.decimal("multiplier"),
+                        order.text("dispatch")),
+            OcrConfig(ocr.integer("workers"), ocr.integer("max_width"),
+                      ocr.integer("threshold"), ocr.integer("tiles"),
+                      ocr.number("overlap"), ocr.integer("cache_size"),
+                      ocr.integer("cache_distance"), ocr.text("cache_file"),
+                      ocr.number("cpu_budget")),
+            MediaConfig(media.text("host"), media.integer("connections"),
+                        media.integer("min_width"), media.integer("max_bytes"),
+                        media.number("timeout")),
+            StartupConfig(TimeoutsConfig(timeouts.number("exchanges"),
+                                         timeouts.number("currencies"),
+                                         timeouts.number("markets"),
+                                         timeouts.number("twitter"),
+                                         timeouts.number("ocr"))),
+            DatabaseConfig(database.text("file"), database.flag("warm_start"),
+                           database.number("refresh_interval"),
+                           database.number("refresh_jitter")),
+            TransportConfig(transport.integer("connections"),
+                            transport.number("keep_alive"),
+                            transport.number("timeout")),
+            PricesConfig(prices.flag("enabled"), prices.number("interval"),
+                         prices.number("max_age"), prices.flag("stream")),
+            TraceConfig(trace.flag("enabled"), trace.text("file")),
+            ReloadConfig(reload.flag("signal"), reload.number("interval")),
+            r.flag("search_currency_name"),
+            r.text("tessdata_dir"),
+            r.text("tesseract_cmd"),
+            r.flag("verbose"),
+            r.flag("queue_logs"))
+
+def load(path: str) -> Config:
+    """Loads a configuration from a JSON file.
+
+    Parameters
+    ----------
+    path: str
+        The path of the file.
+
+    Returns
+    -------
+    Config
+        The configuration.
+
+    Raises
+    ------
+    OSError
+        If the file can't be read.
+    ValueError
+        If the file isn't valid JSON or the configuration is invalid.
+    """
+    with open(path, "r", encoding = "utf-8") as file:
+        return parse(json.load(file))
+
+def changes(old: Config, new: Config) -> List[str]:
+    """Finds the sections and top-level keys which differ.
+
+    Parameters
+    ----------
+    old: Config
+        The previous configuration.
+    new: Config
+        The current configuration.
+
+    Returns
+    -------
+    List[str]
+        The names of the keys whose values differ.
+    """
+    return [name for name in Config._fields
+            if getattr(old, name) != getattr(new, name)]
+
+class ConfigWatcher:
+    """Reloads the configuration when its file changes or on a signal.
+
+    The file's modification time is checked every ``interval`` seconds. On
+    systems which have it, SIGHUP also reloads the file. A configuration
+    which fails to load is logged and ignored.
+
+    Parameters
+    ----------
+    path: str
+        The path of the file.
+    interval: float
+        Seconds between checking the file; it's not checked if ``0``.
+    use_signal: bool
+        :keyword:`True` to reload the file on SIGHUP.
+    callback: Callable[[Config], None]
+        Called with each configuration which is loaded, on the watcher's
+        thread.
+    """
+    def __init__(self, path: str, interval: float, use_signal: bool,
+                 callback: Callable[[Config], None]):
+        self._log: logging.Logger = logging.getLogger("bot.utils.ConfigWatcher")
+        self._path: str = path
+        self._interval: float = interval
+        self._callback: Callable[[Config], None] = callback
+        self._mtime: Optional[float] = self._get_mtime()
+        self._wake: Event = Event()
+        self._stop: Event = Event()
+
+        # Signal handlers run on the main thread, which may be handling a
+        # status, so the file is loaded on the watcher's thread instead.
+        if use_signal and hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda *args: self._wake.set())
+
+        self._thread: Thread = Thread(target = self._run, name = "config",
+                                      daemon = True)
+        self._thread.start()
+
+    def _get_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self._path).st_mtime
+        except OSError:
+            return None
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self._interval or None)
+
+            if self._stop.is_set():
+                return
+
+            signalled: bool = self._wake.is_set()
+            self._wake.clear()
+            mtime: Optional[float] = self._get_mtime()
+
+            if signalled or mtime != self._mtime:
+                self._mtime = mtime
+                self._reload()
+
+    def _reload(self) -> None:
+        try:
+            config: Config = load(self._path)
+        except (OSError, ValueError) as e:
+            self._log.error("The configuration could not be reloaded; keeping "
+                            f"the current one: {e}")
+            return
+
+        try:
+            self._callback(config)
+        except Exception as e:
+            self._log.error(f"The configuration could not be applied: {e}")
+
+    def reload(self) -> None:
+        """Reloads the file on the watcher's thread.
+
+        Returns
+        -------
+        None
+        """
+        self._wake.set()
+
+    def close(self) -> None:
+        """Stops watching the file.
+
+        Returns
+        -------
+        None
+        """
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
@@ -2,8 +2,11 @@ from typing import List
 import logging
 
 from exchanges.exchange import Exchange
+from utils.config import Config
 
-config: dict = {}
+config: Config = None
 log: logging.Logger = None
 exchanges: List[Exchange] = []
 db = None # TODO: Forward reference type-hinting.
+prices = None
+transport = None
@@ -1,18 +1,36 @@
-from typing import Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, \
+    as_completed, wait
+from itertools import islice
+from threading import Event
+from typing import Iterator, List, Optional, Set, Tuple
 import logging
-import re
+import time
 
 try:
     import Image
+    import ImageOps
 except ImportError:
-    from PIL import Image
+    from PIL import Image, ImageOps
 from pytesseract import pytesseract
-import requests
 
 from exchanges.exchange import Exchange
+from utils import trace
+from utils.cache import OcrCache, dhash
+from utils.config import MediaConfig, OcrConfig
+from utils.media import MediaFetcher
+from utils.ocr import CpuBudget, OcrPool
 import utils.globals as g
 
-def get_image(url: str) -> Image.Image:
+log: logging.Logger = logging.getLogger("bot.utils.image")
+cache: Optional[OcrCache] = None
+fetcher: Optional[MediaFetcher] = None
+pool: Optional[OcrPool] = None
+
+_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+        thread_name_prefix = "image")
+
+def get_image(url: str, cancel: Optional[Event] = None) \
+        -> Optional[Image.Image]:
     """Creates an Image object from a URL.
 
     Requests an image from :any:`url` and constructs an
@@ -20,24 +38,30 @@ def get_image(url: str) -> Image.Image:
 
     Notes
     -----
-    Requests the image using :abbr:`HTTP (Hypertext Transfer Protocol)` GET.
+    Requests the image using :abbr:`HTTP (Hypertext Transfer Protocol)` GET
+    over the :class:`~utils.media.MediaFetcher`'s pooled connections.
 
     Parameters
     ----------
     url: str
         The :abbr:`URL (Uniform Resource Locator)` from which to request the
         image.
+    cancel: threading.Event, optional
+        Abandons the download when set.
 
     Returns
     -------
-    PIL.Image.Image
+    PIL.Image.Image or None
         The :class:`~PIL.Image.Image` object created from the image at the given
-        :abbr:`URL (Uniform Resource Locator)`.
+        :abbr:`URL (Uniform Resource Locator)`, or :any:`None` if it could not
+        be downloaded within the configured budgets.
     """
     log.debug("Downloading the image.")
-    return Image.open(requests.get(url, stream = True).raw)
 
-def to_text(img: Image.Image) -> str:
+    with trace.span("download"):
+        return fetcher.fetch(url, cancel)
+
+def to_text(img: Image.Image, budget: Optional[CpuBudget] = None) -> str:
     """Performs OCR on an image.
 
     Performs :abbr:`OCR (optical character recognition)` on the
@@ -45,12 +69,17 @@ def to_text(img: Image.Image) -> str:
 
     Notes
     -----
-    OCR is performed using :mod:`pytesseract`.
+    OCR is performed by the :class:`~utils.ocr.OcrPool` if it was started;
+    otherwise, :mod:`pytesseract` is used.
 
     Parameters
     ----------
     img: Image.Image
         The image on which to perform OCR.
+    budget: CpuBudget, optional
+        The budget to which the OCR's CPU time is charged. Without the pool,
+        Tesseract runs in another process, so the time it takes is charged
+        instead.
 
     Returns
     -------
@@ -58,9 +87,18 @@ def to_text(img: Image.Image) -> str:
         The resulting text from OCR.
     """
     log.debug("Performing OCR.")
-    config = f'--tessdata-dir "{g.config["tessdata_dir"]}"' if g.config["tessdata_dir"] else None
 
-    return pytesseract.image_to_string(img, config = config)
+    if pool:
+        return pool.to_text(img, budget)
+
+    config = f'--tessdata-dir "{g.config.tessdata_dir}"' if g.config.tessdata_dir else None
+    start: float = time.perf_counter()
+
+    try:
+        return pytesseract.image_to_string(img, config = config)
+    finally:
+        if budget:
+            budget.charge(time.perf_counter() - start)
 
 def parse_currency(text: str) -> Optional[Exchange.Currency]:
     """Finds a currency in a string.
@@ -70,9 +108,9 @@ def parse_currency(text: str) -> Optional[Exchange.Currency]:
 
     Notes
     -----
-    Queries the database for all currencies and iterates them. Uses a regular
-    expression to find a match in the text and constructs a
-    :class:`~Exchange.Currency` from it.
+    Uses the database's :class:`~utils.matcher.CurrencyMatcher`, which scans
+    the text once regardless of the number of currencies. The matcher is
+    rebuilt by the database whenever the currencies change.
 
     Parameters
     ----------
@@ -86,28 +124,356 @@ def parse_currency(text: str) -> Optional[Exchange.Currency]:
         matches are found.
     """
     log.debug("Searching for a currency in the text.")
-    g.db.cursor.execute("select * from currencies")
 
-    return next((Exchange.Currency(symbol, name, precision)
-                 for symbol, name, precision in g.db.cursor.fetchall()
-                 if re.search((name if g.config["search_currency_name"] else "")
-                                  + r"\s*?[(\[{]+?\s*?" + symbol + r"\s*?[)\]}]",
-                              text,
-                              re.IGNORECASE)),
-                None)
+    with trace.span("parse_currency"):
+        return g.db.matcher.search(text)
+
+def preprocess(img: Image.Image) -> Image.Image:
+    """Prepares an image for OCR.
+
+    Converts the image to grayscale, downscales it so its width is at most the
+    configured ``max_width``, inverts it if it is mostly dark, and binarises
+    it using the configured ``threshold``. Scaling and binarisation are
+    skipped if their settings are ``0``.
+
+    Parameters
+    ----------
+    img: Image.Image
+        The image to prepare.
+
+    Returns
+    -------
+    PIL.Image.Image
+        The prepared image.
+    """
+    config: OcrConfig = g.config.ocr
+    img = img.convert("L")
+
+    max_width: int = config.max_width
+    if max_width and img.width > max_width:
+        height: int = round(img.height * max_width / img.width)
+        img = img.resize((max_width, height), Image.LANCZOS)
+
+    # Tesseract is more accurate with dark text on a light background, but
+    # announcement graphics are often the opposite.
+    histogram: List[int] = img.histogram()
+    if sum(histogram[:128]) > sum(histogram[128:]):
+        img = ImageOps.invert(img)
+
+    threshold: int = config.threshold
+    if threshold:
+        img = img.point(lambda p: 255 if p > threshold else 0)
+
+    return img
+
+def tile(img: Image.Image, count: int, overlap: float) -> List[Image.Image]:
+    """Splits an image into horizontal bands.
+
+    Adjacent bands overlap so a line of text cut by a boundary is still
+    wholly contained in one of the bands.
+
+    Parameters
+    ----------
+    img: Image.Image
+        The image to split.
+    count: int
+        The amount of bands.
+    overlap: float
+        The fraction of a band's height by which it extends into its
+        neighbours.
+
+    Returns
+    -------
+    List[PIL.Image.Image]
+        The bands ordered from the top of the image to the bottom.
+    """
+    if count <= 1:
+        return [img]
+
+    height: float = img.height / count
+    margin: int = round(height * overlap)
+
+    return [img.crop((0,
+                      max(0, round(i * height) - margin),
+                      img.width,
+                      min(img.height, round((i + 1) * height) + margin)))
+            for i in range(count)]
+
+def recognise(img: Image.Image, cancel: Optional[Event] = None,
+              budget: Optional[CpuBudget] = None) \
+        -> Tuple[Optional[Exchange.Currency], str]:
+    """Finds a currency in an image.
+
+    The image is preprocessed and split into tiles. Each tile's OCR result is
+    searched for a currency as soon as it is ready and the remaining tiles are
+    cancelled once a currency is found.
+
+    Notes
+    -----
+    Tiles are recognised concurrently if the :class:`~utils.ocr.OcrPool` was
+    started; otherwise, they are recognised one after the other.
+
+    Parameters
+    ----------
+    img: Image.Image
+        The image in which to search for a currency.
+    cancel: threading.Event, optional
+        Cancels the remaining tiles when set.
+    budget: CpuBudget, optional
+        The budget to which the OCR's CPU time is charged.
+
+    Returns
+    -------
+    Tuple[Exchange.Currency or None, str]
+        The first currency found, or :any:`None` if no matches are found or
+        the search was cancelled, and the text of the tiles which were
+        recognised.
+    """
+    with trace.span("ocr"):
+        return _recognise(img, cancel, budget)
+
+def _recognise(img: Image.Image, cancel: Optional[Event],
+               budget: Optional[CpuBudget]) \
+        -> Tuple[Optional[Exchange.Currency], str]:
+    config: OcrConfig = g.config.ocr
+    tiles: List[Image.Image] = tile(preprocess(img),
+                                    config.tiles,
+                                    config.overlap)
+    texts: List[str] = []
+    log.debug("Performing OCR on %d tiles.", len(tiles))
+
+    if not pool:
+        for t in tiles:
+            if cancel and cancel.is_set():
+                return None, "\n".join(texts)
+
+            text: str = to_text(t, budget)
+            texts.append(text)
+            log.debug("OCR Results | %s", text)
+            currency: Optional[Exchange.Currency] = parse_currency(text)
+
+            if currency:
+                return currency, "\n".join(texts)
+
+        return None, "\n".join(texts)
+
+    # Tiles are submitted as others finish so the image only uses its share
+    # of the workers. The tiles of a tweet's images are then interleaved,
+    # rather than one image's tiles waiting for all of another's.
+    limit: int = budget.share if budget and budget.share else len(tiles)
+    queued: Iterator[Image.Image] = iter(tiles)
+    pending: Set[Future] = \
+        {pool.submit(t, budget) for t in islice(queued, limit)}
+
+    try:
+        while pending:
+            done, pending = wait(pending, return_when = FIRST_COMPLETED)
+
+            # Tiles which were already recognised are searched even if the
+            # budget ran out meanwhile.
+            for future in done:
+                text: str = future.result()
+                texts.append(text)
+                log.debug("OCR Results | %s", text)
+                currency: Optional[Exchange.Currency] = parse_currency(text)
+
+                if currency:
+                    return currency, "\n".join(texts)
+
+            if cancel and cancel.is_set():
+                return None, "\n".join(texts)
+
+            pending |= {pool.submit(t, budget)
+                        for t in islice(queued, limit - len(pending))}
+    finally:
+        for future in pending:
+            future.cancel()
+
+    return None, "\n".join(texts)
+
+def find_currency(img: Image.Image, cancel: Optional[Event] = None) \
+        -> Optional[Exchange.Currency]:
+    """Finds a currency in an image.
+
+    See :func:`recognise`.
+
+    Parameters
+    ----------
+    img: Image.Image
+        The image in which to search for a currency.
+    cancel: threading.Event, optional
+        Cancels the remaining tiles when set.
+
+    Returns
+    -------
+    Exchange.Currency or None
+        The first currency found, or :any:`None` if no matches are found or
+        the search was cancelled.
+    """
+    return recognise(img, cancel)[0]
+
+def search_image(url: str, cancel: Optional[Event] = None,
+                 budget: Optional[CpuBudget] = None) \
+        -> Optional[Exchange.Currency]:
+    """Finds a currency in the image at a URL.
+
+    Notes
+    -----
+    If the :class:`~utils.cache.OcrCache` is enabled, it is checked for the URL
+    before downloading the image and for the image's perceptual hash before
+    performing OCR. A hit skips OCR; its cached text is searched for a
+    currency with :func:`parse_currency`, so the result reflects the current
+    currencies.
+
+    Parameters
+    ----------
+    url: str
+        The :abbr:`URL (Uniform Resource Locator)` of the image.
+    cancel: threading.Event, optional
+        Cancels the download and OCR when set.
+    budget: CpuBudget, optional
+        The budget to which the OCR's CPU time is charged.
+
+    Returns
+    -------
+    Exchange.Currency or None
+        The currency found, or :any:`None` if no matches are found or the
+        search was cancelled.
+    """
+    entry: Optional[OcrCache.Entry] = cache.get_url(url) if cache else None
+    if entry:
+        return parse_currency(entry.text)
+
+    img: Optional[Image.Image] = get_image(url, cancel)
+    if img is None:
+        return None
+
+    if not cache:
+        return recognise(img, cancel, budget)[0]
+
+    hash_: int = dhash(img)
+    entry = cache.get_hash(hash_)
+    if entry:
+        return parse_currency(entry.text)
+
+    currency, text = recognise(img, cancel, budget)
+
+    # Results of cancelled searches are incomplete.
+    if not (cancel and cancel.is_set()):
+        cache.put(url, hash_, text)
+
+    return currency
+
+def _search_first(urls: List[str], cancel: Event, budget: CpuBudget) \
+        -> Optional[Exchange.Currency]:
+    futures: List[Future] = \
+        [_executor.submit(trace.bind(search_image), url, cancel, budget)
+         for url in urls]
+
+    try:
+        for future in as_completed(futures):
+            currency: Optional[Exchange.Currency] = future.result()
+
+            if currency:
+                return currency
+    finally:
+        # Stops the other images once a currency is found.
+        cancel.set()
+
+        for future in futures:
+            future.cancel()
+
+    return None
+
+def search_images(urls: List[str], cancel: Optional[Event] = None) \
+        -> Optional[Exchange.Currency]:
+    """Finds a currency in any of several images.
+
+    The images are downloaded and searched at the same time. The first
+    currency found is returned and the search of the other images is
+    cancelled.
+
+    Notes
+    -----
+    The OCR of all the images shares one :class:`~utils.ocr.CpuBudget` of the
+    configured ``cpu_budget``, so searching several images doesn't take much
+    longer than searching one. The remaining OCR is cancelled once the budget
+    is spent. Each image gets an equal share of the
+    :class:`~utils.ocr.OcrPool`'s workers, so the top tiles of every image,
+    where announcements usually name the currency, are recognised first.
+
+    Parameters
+    ----------
+    urls: List[str]
+        The :abbr:`URLs (Uniform Resource Locators)` of the images.
+    cancel: threading.Event, optional
+        Cancels the downloads and OCR when set. It is also set once a currency
+        is found or the budget is spent.
+
+    Returns
+    -------
+    Exchange.Currency or None
+        The first currency found, or :any:`None` if no matches are found or
+        the search was cancelled.
+    """
+    cancel = cancel or Event()
+
+    # Each image gets an equal share of the pool's workers.
+    share: int = max(1, pool.workers // len(urls)) \
+        if pool and len(urls) > 1 else 0
+    budget: CpuBudget = \
+        CpuBudget(g.config.ocr.cpu_budget, cancel, share)
+    currency: Optional[Exchange.Currency] = \
+        search_image(urls[0], cancel, budget) if len(urls) == 1 else \
+        _search_first(urls, cancel, budget)
+
+    if budget.exhausted:
+        log.warning(f"OCR was stopped after {budget.spent:.2f} seconds of CPU "
+                    "time, which exceeds its budget.")
+
+    log.debug("OCR took %.2f seconds of CPU time.", budget.spent)
+
+    return currency
 
 def init() -> None:
     """Initialises the module.
 
-    Creates a global Logger and sets the
-    :attr:`path to Tesseract<pytesseract.pytesseract.tesseract_cmd>` if given.
+    Sets the
+    :attr:`path to Tesseract<pytesseract.pytesseract.tesseract_cmd>` if given,
+    and starts the :class:`~utils.ocr.OcrPool` if workers are configured. If
+    the pool cannot be started, OCR falls back to :mod:`pytesseract`. Also
+    creates the :class:`~utils.media.MediaFetcher` and opens a connection to
+    the media host, and creates the :class:`~utils.cache.OcrCache` if it is
+    enabled.
 
     Returns
     -------
     None
     """
-    global log
-    log = logging.getLogger("bot.utils.image")
+    global cache, fetcher, pool
+
+    media: MediaConfig = g.config.media
+    fetcher = MediaFetcher(media.host,
+                           media.connections,
+                           media.max_bytes,
+                           media.timeout)
+    fetcher.warm()
+
+    if g.config.tesseract_cmd:
+        pytesseract.tesseract_cmd = g.config.tesseract_cmd
+
+    config: OcrConfig = g.config.ocr
+
+    if config.cache_size:
+        cache = OcrCache(config.cache_size,
+                         config.cache_distance,
+                         config.cache_file)
+
+    workers: int = config.workers
 
-    if g.config["tesseract_cmd"]:
-        pytesseract.tesseract_cmd = g.config["tesseract_cmd"]
+    if workers:
+        try:
+            pool = OcrPool(workers, g.config.tessdata_dir)
+        except RuntimeError as e:
+            log.warning(f"Falling back to pytesseract; the OCR pool could not "
+                        f"be started: {e}")
@@ -0,0 +1,95 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import re
+
+from exchanges.exchange import Exchange
+
+# An opening bracket, the bracketed token, and a closing bracket. This is the
+# same shape the per-currency expressions used to look for, but the token is
+# captured instead of being spelled out for every currency.
+_TOKEN = re.compile(r"[(\[{]+\s*([^()\[\]{}]+?)\s*[)\]}]")
+
+class CurrencyMatcher:
+    """Finds currencies in text with a single scan.
+
+    Every bracketed token in the text is found with one compiled regular
+    expression and looked up in a table of currency symbols. If currency names
+    are searched, the text directly preceding the brackets must also end with
+    the currency's name.
+
+    Matches are ordered by the position of the currency in the iterable the
+    matcher was built from, which is the order of the currencies table (i.e.
+    CoinMarketCap's rank). The first match is therefore the same currency the
+    previous per-row search would have returned.
+
+    Parameters
+    ----------
+    currencies: Iterable[Exchange.Currency]
+        The currencies to search for, in order of priority.
+    search_name: bool
+        :keyword:`True` if a currency's name must precede its symbol;
+        :keyword:`False` to only search for symbols.
+    """
+    def __init__(self, currencies: Iterable[Exchange.Currency],
+                 search_name: bool):
+        self._search_name: bool = search_name
+        self._symbols: Dict[str, List[Tuple[int, Exchange.Currency, str]]] = {}
+
+        for rank, currency in enumerate(currencies):
+            self._symbols.setdefault(currency.symbol.casefold(), []).append(
+                (rank, currency, (currency.name or "").casefold()))
+
+        self.size: int = sum(len(c) for c in self._symbols.values())
+
+    def find_all(self, text: str) -> List[Exchange.Currency]:
+        """Finds all currencies in a string.
+
+        Parameters
+        ----------
+        text: str
+            The string in which to search for currencies.
+
+        Returns
+        -------
+        List[Exchange.Currency]
+            The currencies found in the string, ordered by priority. Each
+            currency appears at most once.
+        """
+        found: Dict[int, Exchange.Currency] = {}
+
+        for match in _TOKEN.finditer(text):
+            candidates = self._symbols.get(match.group(1).casefold())
+
+            if not candidates:
+                continue
+
+            prefix: Optional[str] = None
+
+            for rank, currency, name in candidates:
+                if self._search_name:
+                    if prefix is None:
+                        prefix = text[:match.start()].rstrip().casefold()
+
+                    if not name or not prefix.endswith(name):
+                        continue
+
+                found[rank] = currency
+
+        return [found[rank] for rank in sorted(found)]
+
+    def search(self, text: str) -> Optional[Exchange.Currency]:
+        """Finds the currency with the highest priority in a string.
+
+        Parameters
+        ----------
+        text: str
+            The string in which to search for a currency.
+
+        Returns
+        -------
+        Exchange.Currency or None
+            The matching currency with the highest priority, or :any:`None` if
+            no matches are found.
+        """
+        found: List[Exchange.Currency] = self.find_all(text)
+
+        return found[0] if found else None
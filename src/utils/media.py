@@ -0,0 +1,149 @@
+from threading import Event
+from typing import Optional
+import logging
+import time
+
+try:
+    import Image
+    import ImageFile
+except ImportError:
+    from PIL import Image, ImageFile
+from requests.adapters import HTTPAdapter
+import requests
+
+# Twitter's size variants from smallest to largest.
+SIZES = ("thumb", "small", "medium", "large")
+
+def select_url(media: dict, min_width: int) -> str:
+    """Selects the smallest size variant of a photo which is wide enough.
+
+    Parameters
+    ----------
+    media: dict
+        The photo's media entity.
+    min_width: int
+        The minimum width in pixels of the variant.
+
+    Returns
+    -------
+    str
+        The :abbr:`URL (Uniform Resource Locator)` of the smallest variant at
+        least :any:`min_width` pixels wide, or of the largest variant if none
+        are wide enough.
+    """
+    sizes: dict = media.get("sizes", {})
+    size: str = next((s for s in SIZES
+                      if s in sizes and sizes[s]["w"] >= min_width),
+                     "large")
+
+    return f"{media['media_url_https']}:{size}"
+
+class MediaFetcher:
+    """Downloads images over a pool of persistent connections.
+
+    Images are streamed into an incremental decoder as they arrive. A download
+    is abandoned if it exceeds the byte budget or the time budget.
+
+    Parameters
+    ----------
+    host: str
+        The :abbr:`URL (Uniform Resource Locator)` of the media host to which
+        connections are opened in advance.
+    connections: int
+        The maximum amount of connections kept open to each host.
+    max_bytes: int
+        The maximum size in bytes of an image.
+    timeout: float
+        The maximum amount of seconds a download may take.
+    """
+    def __init__(self, host: str, connections: int, max_bytes: int,
+                 timeout: float):
+        self._log: logging.Logger = logging.getLogger("bot.utils.MediaFetcher")
+        self._host: str = host
+        self._max_bytes: int = max_bytes
+        self._timeout: float = timeout
+
+        adapter: HTTPAdapter = HTTPAdapter(pool_connections = 1,
+                                           pool_maxsize = connections,
+                                           pool_block = False)
+        self._session: requests.Session = requests.Session()
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def warm(self) -> None:
+        """Opens a connection to the media host so it can be reused.
+
+        Returns
+        -------
+        None
+        """
+        try:
+            self._session.head(self._host, timeout = self._timeout)
+            self._log.debug(f"Opened a connection to {self._host}.")
+        except requests.RequestException as e:
+            self._log.warning(f"A connection to {self._host} could not be "
+                              f"opened: {e}")
+
+    def fetch(self, url: str, cancel: Optional[Event] = None) \
+            -> Optional[Image.Image]:
+        """Downloads and decodes an image.
+
+        Parameters
+        ----------
+        url: str
+            The :abbr:`URL (Uniform Resource Locator)` of the image.
+        cancel: threading.Event, optional
+            Abandons the download when set.
+
+        Returns
+        -------
+        PIL.Image.Image or None
+            The decoded image, or :any:`None` if it could not be downloaded or
+            decoded within the budgets or the download was cancelled.
+        """
+        deadline: float = time.monotonic() + self._timeout
+        parser: ImageFile.Parser = ImageFile.Parser()
+        size: int = 0
+
+        try:
+            with self._session.get(url, stream = True,
+                                   timeout = self._timeout) as response:
+                response.raise_for_status()
+
+                length: int = int(response.headers.get("Content-Length", 0))
+                if length > self._max_bytes:
+                    self._log.error(f"The image is {length} bytes, which "
+                                    f"exceeds the limit of {self._max_bytes}.")
+                    return None
+
+                for chunk in response.iter_content(chunk_size = 16384):
+                    if cancel and cancel.is_set():
+                        self._log.debug("The download was cancelled.")
+                        return None
+
+                    size += len(chunk)
+
+                    if size > self._max_bytes:
+                        self._log.error("The image exceeded the limit of "
+                                        f"{self._max_bytes} bytes.")
+                        return None
+
+                    if time.monotonic() > deadline:
+                        self._log.error("The image took longer than "
+                                        f"{self._timeout} seconds to download.")
+                        return None
+
+                    parser.feed(chunk)
+        except requests.RequestException as e:
+            self._log.error(f"The image could not be downloaded: {e}")
+            return None
+
+        try:
+            img: Image.Image = parser.close()
+        except OSError as e:
+            self._log.error(f"The image could not be decoded: {e}")
+            return None
+
+        self._log.debug("Downloaded %d bytes.", size)
+
+        return img
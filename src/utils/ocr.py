@@ -0,0 +1,174 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Queue
+from threading import Event, Lock
+from typing import Optional
+import logging
+
+try:
+    import Image
+except ImportError:
+    from PIL import Image
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+from utils.utils import thread_time
+
+class CpuBudget:
+    """Limits the CPU time spent on OCR for one tweet.
+
+    The CPU time taken to recognise each image or tile of the tweet is charged
+    to the budget. Once it is spent, the event is set, which cancels the OCR
+    still pending for the tweet.
+
+    Parameters
+    ----------
+    seconds: float
+        The CPU time in seconds; unlimited if ``0``.
+    cancel: threading.Event
+        The event to set once the budget is spent.
+    share: int, optional
+        The most tiles of each of the tweet's images recognised by the pool at
+        once; unlimited if ``0``.
+    """
+    def __init__(self, seconds: float, cancel: Event, share: int = 0):
+        self._lock: Lock = Lock()
+        self._seconds: float = seconds
+
+        self.cancel: Event = cancel
+        self.share: int = share
+        self.spent: float = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return bool(self._seconds) and self.spent >= self._seconds
+
+    def charge(self, seconds: float) -> None:
+        """Adds CPU time to the time spent.
+
+        Parameters
+        ----------
+        seconds: float
+            The CPU time in seconds.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self.spent += seconds
+
+        if self.exhausted:
+            self.cancel.set()
+
+class OcrPool:
+    """A pool of warm Tesseract engines.
+
+    Each worker owns a :class:`tesserocr.PyTessBaseAPI` which is initialised
+    once, so the language model is only loaded when the pool is created rather
+    than for every image. Images are passed to Tesseract in memory. Tesseract
+    releases the GIL while recognising, so the workers run concurrently in
+    threads.
+
+    Parameters
+    ----------
+    workers: int
+        The amount of engines and threads in the pool.
+    tessdata_dir: str
+        Path to Tesseract's tessdata folder; the default path is used if
+        empty.
+
+    Raises
+    ------
+    RuntimeError
+        If :mod:`tesserocr` is not installed or Tesseract fails to initialise.
+    """
+    def __init__(self, workers: int, tessdata_dir: str = ""):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed.")
+
+        self._log: logging.Logger = logging.getLogger("bot.utils.OcrPool")
+        self._apis: Queue = Queue()
+
+        for _ in range(workers):
+            api = tesserocr.PyTessBaseAPI(path = tessdata_dir, lang = "eng") \
+                if tessdata_dir else tesserocr.PyTessBaseAPI(lang = "eng")
+            self._apis.put(api)
+
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+                max_workers = workers,
+                thread_name_prefix = "ocr")
+        self.workers: int = workers
+
+        self._log.debug(f"Started {workers} Tesseract workers.")
+
+    def _recognise(self, img: Image.Image, budget: Optional[CpuBudget]) \
+            -> str:
+        # Skips images queued before the tweet's OCR was cancelled.
+        if budget and budget.cancel.is_set():
+            return ""
+
+        api = self._apis.get()
+        start: float = thread_time()
+
+        try:
+            api.SetImage(img)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+            self._apis.put(api)
+
+            # Tesseract runs on this thread, so its CPU time is the thread's.
+            if budget:
+                budget.charge(thread_time() - start)
+
+    def submit(self, img: Image.Image, budget: Optional[CpuBudget] = None) \
+            -> Future:
+        """Schedules OCR of an image on the pool.
+
+        Parameters
+        ----------
+        img: Image.Image
+            The image on which to perform OCR.
+        budget: CpuBudget, optional
+            The budget to which the OCR's CPU time is charged. The image is
+            skipped if the budget's event is set before OCR starts.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            A future which resolves to the resulting text from OCR.
+        """
+        return self._executor.submit(self._recognise, img, budget)
+
+    def to_text(self, img: Image.Image, budget: Optional[CpuBudget] = None) \
+            -> str:
+        """Performs OCR on an image and waits for the result.
+
+        Parameters
+        ----------
+        img: Image.Image
+            The image on which to perform OCR.
+        budget: CpuBudget, optional
+            The budget to which the OCR's CPU time is charged.
+
+        Returns
+        -------
+        str
+            The resulting text from OCR.
+        """
+        return self.submit(img, budget).result()
+
+    def close(self) -> None:
+        """Waits for pending work and ends all Tesseract engines.
+
+        Returns
+        -------
+        None
+        """
+        self._executor.shutdown(wait = True)
+
+        while not self._apis.empty():
+            self._apis.get().End()
@@ -0,0 +1,92 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import concurrent.futures
+import logging
+import time
+
+Task = NamedTuple("Task", [
+    ("name", str),
+    ("function", Callable[[], Any]),
+    ("timeout", Optional[float]),
+    ("required", bool)])
+
+def run(label: str, tasks: List[Task]) -> Dict[str, Any]:
+    """Runs tasks concurrently and waits for each to finish or time out.
+
+    A task which raises an exception or doesn't finish within its timeout is
+    logged and its result is :any:`None`. A task which timed out keeps running
+    in the background; its result is discarded. The time each task took is
+    logged once all have finished or timed out.
+
+    Parameters
+    ----------
+    label: str
+        What the tasks accomplish together; used in the log.
+    tasks: List[Task]
+        The tasks. Timeouts are in seconds from when the tasks are started;
+        a task with a timeout of :any:`None` is waited for indefinitely.
+
+    Raises
+    ------
+    RuntimeError
+        If a required task failed or timed out.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The result of each task by name.
+    """
+    log: logging.Logger = logging.getLogger("bot.utils.startup")
+    durations: Dict[str, float] = {}
+    start: float = time.perf_counter()
+
+    def timed(task: Task) -> Callable[[], Any]:
+        def wrapper():
+            task_start: float = time.perf_counter()
+
+            try:
+                return task.function()
+            finally:
+                durations[task.name] = time.perf_counter() - task_start
+
+        return wrapper
+
+    executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers = max(1, len(tasks)),
+            thread_name_prefix = "startup")
+    futures: List[Tuple[Task, Future]] = \
+        [(task, executor.submit(timed(task))) for task in tasks]
+    # Doesn't wait; tasks which time out are left to finish on their own.
+    executor.shutdown(wait = False)
+
+    results: Dict[str, Any] = {}
+    failed: List[str] = []
+
+    for task, future in futures:
+        remaining: Optional[float] = None if task.timeout is None else \
+            max(0.0, start + task.timeout - time.perf_counter())
+
+        try:
+            results[task.name] = future.result(remaining)
+            continue
+        except concurrent.futures.TimeoutError:
+            log.error(f"{task.name} timed out after {task.timeout:g} seconds.")
+        except Exception as e:
+            log.error(f"{task.name} failed: {type(e).__name__}: {e}")
+
+        results[task.name] = None
+
+        if task.required:
+            failed.append(task.name)
+
+    log.info(f"{label} took {time.perf_counter() - start:.2f} seconds | "
+             + ", ".join(f"{task.name}: {durations[task.name]:.2f}"
+                         if task.name in durations else
+                         f"{task.name}: timed out"
+                         for task in tasks))
+
+    if failed:
+        raise RuntimeError(f"{label} failed: {', '.join(failed)} could not "
+                           "be completed.")
+
+    return results
@@ -0,0 +1,190 @@
+from bisect import bisect_left
+from collections import defaultdict
+from queue import Queue
+from threading import Lock, Thread, local
+from typing import Callable, DefaultDict, Dict, List, Optional
+import functools
+import json
+import logging
+import time
+
+from utils.config import TraceConfig
+import utils.globals as g
+
+# Upper bounds in milliseconds of the histogram buckets. The last bucket has
+# no upper bound.
+BUCKETS: List[float] = [2 ** i for i in range(-3, 14)]
+
+_enabled: bool = False
+_local = local()
+_lock: Lock = Lock()
+_histograms: DefaultDict[str, List[int]] = \
+    defaultdict(lambda: [0] * (len(BUCKETS) + 1))
+_queue: Optional[Queue] = None
+_writer: Optional[Thread] = None
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_NULL: _NullSpan = _NullSpan()
+
+class _Span:
+    __slots__ = ("_stage", "_tweet", "_start", "_wall")
+
+    def __init__(self, stage: str):
+        self._stage: str = stage
+        self._tweet: Optional[int] = getattr(_local, "tweet", None)
+
+    def __enter__(self):
+        self._wall: float = time.time()
+        self._start: float = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *args):
+        duration: float = (time.perf_counter() - self._start) * 1000
+
+        with _lock:
+            _histograms[self._stage][bisect_left(BUCKETS, duration)] += 1
+
+        if _queue:
+            _queue.put({"tweet": self._tweet,
+                        "stage": self._stage,
+                        "start": self._wall,
+                        "duration_ms": round(duration, 3)})
+
+        return False
+
+def _write(path: str) -> None:
+    with open(path, "a", encoding = "utf-8") as file:
+        while True:
+            record: Optional[dict] = _queue.get()
+
+            if record is None:
+                return
+
+            file.write(json.dumps(record) + "\n")
+
+            if _queue.empty():
+                file.flush()
+
+def span(stage: str):
+    """Creates a span which times the body of a :keyword:`with` statement.
+
+    Parameters
+    ----------
+    stage: str
+        The name of the stage being timed.
+
+    Returns
+    -------
+    object
+        A context manager which records the span when it exits.
+    """
+    return _Span(stage) if _enabled else _NULL
+
+def begin(tweet: int) -> None:
+    """Ties spans subsequently created on this thread to a tweet.
+
+    Parameters
+    ----------
+    tweet: int
+        The ID of the tweet.
+
+    Returns
+    -------
+    None
+    """
+    if _enabled:
+        _local.tweet = tweet
+
+def bind(function: Callable) -> Callable:
+    """Ties spans created by a function on another thread to this thread's
+    tweet.
+
+    Parameters
+    ----------
+    function: Callable
+        The function which will be called on another thread.
+
+    Returns
+    -------
+    Callable
+        The wrapped function, or :any:`function` itself if tracing is
+        disabled.
+    """
+    if not _enabled:
+        return function
+
+    tweet: Optional[int] = getattr(_local, "tweet", None)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        _local.tweet = tweet
+        return function(*args, **kwargs)
+
+    return wrapper
+
+def histograms() -> Dict[str, List[int]]:
+    """Retrieves the histograms of span durations.
+
+    Returns
+    -------
+    Dict[str, List[int]]
+        The count of spans in each of the :data:`BUCKETS` for each stage. The
+        last count is of spans longer than the last bucket.
+    """
+    with _lock:
+        return {stage: list(counts) for stage, counts in _histograms.items()}
+
+def init() -> None:
+    """Initialises the module.
+
+    Enables tracing if it is enabled in the configuration and starts writing
+    spans to the configured file if one is set. Spans are written as JSON
+    lines by a background thread.
+
+    When tracing is disabled, :func:`span` returns a shared object which does
+    nothing, so spans can be left in the code at negligible cost.
+
+    Returns
+    -------
+    None
+    """
+    global _enabled, _queue, _writer
+    config: TraceConfig = g.config.trace
+    _enabled = config.enabled
+
+    if _enabled and config.file:
+        _queue = Queue()
+        _writer = Thread(target = _write, args = (config.file,),
+                         name = "trace", daemon = True)
+        _writer.start()
+
+def close() -> None:
+    """Logs the histograms and finishes writing spans to the file.
+
+    Returns
+    -------
+    None
+    """
+    if not _enabled:
+        return
+
+    log: logging.Logger = logging.getLogger("bot.utils.trace")
+    labels: List[str] = [f"<={b:g}ms" for b in BUCKETS] + \
+        [f">{BUCKETS[-1]:g}ms"]
+
+    for stage, counts in histograms().items():
+        log.info(f"{stage} | " + ", ".join(f"{label}: {count}"
+                                           for label, count in zip(labels,
+                                                                   counts)
+                                           if count))
+
+    if _writer:
+        _queue.put(None)
+        _writer.join()
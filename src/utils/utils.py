@@ -1,15 +1,51 @@
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from queue import Queue
+from typing import List
 import json
 import logging
+import time
 
+from utils import config
 import utils.globals as g
 
+# The configuration is read from the working directory.
+CONFIG_FILE: str = "config.json"
+
+_listeners: List[QueueListener] = []
+
+class _QueueHandler(QueueHandler):
+    # Records stay in this process, so they are queued as they are rather than
+    # having their messages formatted first. Formatting is left to the
+    # listener's thread. The arguments of a message are therefore formatted
+    # after the call which logged it, so they shouldn't be mutated afterwards.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def thread_time() -> float:
+    """Measures the CPU time of the calling thread.
+
+    :func:`time.thread_time` needs Python 3.7, so the clock it reads is read
+    directly. On systems without it, such as Windows, the CPU time of the
+    whole process is used instead, which also counts other threads.
+
+    Returns
+    -------
+    float
+        The CPU time in seconds. Only the difference between two calls is
+        meaningful.
+    """
+    if hasattr(time, "CLOCK_THREAD_CPUTIME_ID"):
+        return time.clock_gettime(time.CLOCK_THREAD_CPUTIME_ID)
+
+    return time.process_time()
+
 def load_config() -> bool:
     """Loads a configuration from a file.
 
-    Retrieves the configuration from :file:`Configuration.json`. The JSON is
-    deserialised into a :class:`dictionary<dict>` and set as the
-    :data:`global config<utils.globals.config>`.
+    Retrieves the configuration from :file:`config.json`. The JSON is
+    deserialised and validated into a :class:`~utils.config.Config` and set as
+    the :data:`global config<utils.globals.config>`.
 
     Returns
     -------
@@ -18,19 +54,21 @@ def load_config() -> bool:
         :keyword:`false` otherwise.
     """
     try:
-        with open("config.json", "r") as file:
-            g.config = json.load(file)
+        g.config = config.load(CONFIG_FILE)
 
         return True
     except EnvironmentError as e:
         g.log.error("An error occurred trying to load the configuration file "
-                    f"from '{Path('config.json').resolve().absolute()}'. Ensure"
+                    f"from '{Path(CONFIG_FILE).resolve().absolute()}'. Ensure"
                     " it exists and the bot has adequate permissions to access "
                     f"the file: {e}")
     except json.decoder.JSONDecodeError as e:
         g.log.error("A JSON syntax error was encountered while trying to parse "
                     f"the configuration: {e}")
         return False
+    except ValueError as e:
+        g.log.error(f"The configuration is invalid: {e}")
+        return False
 
 def get_logger(name: str, level: int = logging.INFO):
     """Creates the global Logger.
@@ -86,3 +124,46 @@ def get_logger(name: str, level: int = logging.INFO):
     logger.addHandler(file_handler_debug)
 
     g.log = logger
+
+def queue_handlers(logger: logging.Logger) -> None:
+    """Moves a Logger's handlers to a background thread.
+
+    The Logger's :class:`Handlers<logging.Handler>` are replaced by one which
+    puts records in a queue. A :class:`~logging.handlers.QueueListener` takes
+    them from the queue, then formats and writes them with the original
+    Handlers, which keep their levels. Logging therefore never waits for a
+    file or stream to be written.
+
+    Records below the Logger's level are still discarded before they are
+    created, so messages logged with arguments (i.e. ``%``-style) rather than
+    f-strings aren't formatted at all.
+
+    Parameters
+    ----------
+    logger: logging.Logger
+        The Logger.
+
+    Returns
+    -------
+    None
+    """
+    queue: Queue = Queue()
+    listener: QueueListener = QueueListener(queue, *logger.handlers,
+                                            respect_handler_level = True)
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    logger.addHandler(_QueueHandler(queue))
+    listener.start()
+    _listeners.append(listener)
+
+def stop_queues() -> None:
+    """Waits for queued records to be written and stops the listeners.
+
+    Returns
+    -------
+    None
+    """
+    while _listeners:
+        _listeners.pop().stop()